@@ -34,6 +34,9 @@ class Booking(models.Model):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['booking_date']),
+            # Keyset pagination: (created_at, id) newest first, for admins and per user
+            models.Index(fields=['-created_at', '-id'], name='bookings_created_id_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='bookings_user_created_idx'),
         ]
     
     def __str__(self):
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.sparse import SparseFieldsMixin
 from .models import Booking
 from properties.serializers import PropertyListSerializer
 from users.serializers import UserSerializer
@@ -25,7 +26,7 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         return booking
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Booking Detail Serializer"""
     user = UserSerializer(read_only=True)
     property = PropertyListSerializer(read_only=True)
@@ -36,9 +37,10 @@ class BookingSerializer(serializers.ModelSerializer):
         model = Booking
         fields = '__all__'
         read_only_fields = ['id', 'user', 'subtotal', 'total_amount', 'created_at', 'updated_at']
+        includes = {'property': PropertyListSerializer, 'user': UserSerializer}
 
 
-class BookingListSerializer(serializers.ModelSerializer):
+class BookingListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Booking List Serializer (lightweight)"""
     property_name = serializers.CharField(source='property.name', read_only=True)
     property_location = serializers.CharField(source='property.location', read_only=True)
@@ -46,4 +48,5 @@ class BookingListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ['id', 'property', 'property_name', 'property_location', 'status', 
-                  'total_amount', 'booking_date', 'visit_date', 'created_at']
\ No newline at end of file
+                  'total_amount', 'booking_date', 'visit_date', 'created_at']
+        includes = {'property': PropertyListSerializer}
\ No newline at end of file
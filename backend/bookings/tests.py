@@ -1,7 +1,12 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
 from properties.models import Category, Property
 from services.booking_service import BookingService
+from .models import Booking
 from decimal import Decimal
 from datetime import datetime
 
@@ -53,4 +58,63 @@ class BookingServiceTestCase(TestCase):
         self.assertEqual(booking.user, self.user)
         self.assertEqual(booking.property, self.property)
         self.assertEqual(booking.total_amount, Decimal('90000'))
-        self.assertEqual(booking.status, 'pending')
\ No newline at end of file
+        self.assertEqual(booking.status, 'pending')
+
+
+class BookingSparseFieldsTestCase(TestCase):
+    """Test ?fields= and ?include= on the booking endpoints"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password='test123')
+        category = Category.objects.create(name='Test')
+        self.villa = Property.objects.create(
+            name='Villa', description='Test', location='Dhaka', price=Decimal('100000'),
+            bedrooms=3, bathrooms=2, category=category
+        )
+        other = Property.objects.create(
+            name='Flat', description='Test', location='Dhaka', price=Decimal('50000'),
+            bedrooms=1, bathrooms=1, category=category
+        )
+        self.bookings = [
+            Booking.objects.create(user=self.user, property=prop, booking_date=timezone.now())
+            for prop in (self.villa, self.villa, other)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_sparse_fields_skip_joins(self):
+        """Test only the requested fields (and id) are returned, without joining property"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/', {'fields': 'status,total_amount'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({tuple(row) for row in response.data['results']}, {('id', 'status', 'total_amount')})
+        self.assertFalse(any('JOIN' in query['sql'] for query in queries.captured_queries))
+    
+    def test_include_sends_each_property_once(self):
+        """Test included properties are keyed by id and referenced from the bookings"""
+        response = self.client.get('/api/bookings/', {'include': 'property', 'fields[property]': 'name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(row['property'] for row in response.data['results']),
+            sorted(booking.property_id for booking in self.bookings)
+        )
+        included = response.data['included']['property']
+        self.assertEqual(len(included), 2)
+        self.assertEqual(included[str(self.villa.pk)], {'id': self.villa.pk, 'name': 'Villa'})
+    
+    def test_detail_include(self):
+        """Test the detail endpoint sideloads the user and the property"""
+        response = self.client.get(
+            f'/api/bookings/{self.bookings[0].pk}/', {'fields': 'property,user', 'include': 'property,user'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['property'], self.villa.pk)
+        self.assertEqual(response.data['user'], self.user.pk)
+        self.assertEqual(response.data['included']['user'][str(self.user.pk)]['username'], 'test')
+        self.assertEqual(response.data['included']['property'][str(self.villa.pk)]['category']['name'], 'Test')
+    
+    def test_unknown_names_rejected(self):
+        """Test misspelt fields and includes are a 400, not a silently different payload"""
+        self.assertEqual(self.client.get('/api/bookings/', {'fields': 'stauts'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/bookings/', {'include': 'owner'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/bookings/', {'fields[property]': 'nope'}).status_code, 400)
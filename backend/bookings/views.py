@@ -6,15 +6,18 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db import transaction
 from django.db.models import Q
+from core.pagination import KeysetOrPageNumberPagination
+from core.sparse import SparseFieldsViewMixin
 from .models import Booking
 from .serializers import BookingSerializer, BookingListSerializer, BookingCreateSerializer
 from properties.models import Property
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Booking.objects.all().select_related('property', 'user')
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetOrPageNumberPagination
 
     def get_queryset(self):
         """Filter bookings based on user role"""
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def _base83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - 1 - i)) % 83] for i in range(length))
+
+
+def _to_srgb(value):
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def encode_blurhash(pixels, x_components=4, y_components=3):
+    """
+    BlurHash (https://blurha.sh) of an RGB image given as a (height, width, 3)
+    uint8 array; pass a small thumbnail, the cost is per pixel and component
+
+    Returns:
+        str: 6 + 2 * (x_components * y_components - 1) characters
+    """
+    height, width, _ = pixels.shape
+    srgb = pixels.astype(np.float64) / 255
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+
+    # Separable cosine basis: one matrix product per axis instead of a loop per component
+    basis_x = np.cos(np.pi * np.outer(np.arange(x_components), np.arange(width)) / width)
+    basis_y = np.cos(np.pi * np.outer(np.arange(y_components), np.arange(height)) / height)
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, linear) / (width * height)
+    factors[1:, :] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(-1, 3)
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        maximum = 1.0
+        result += _base83(0, 1)
+
+    result += _base83((_to_srgb(dc[0]) << 16) + (_to_srgb(dc[1]) << 8) + _to_srgb(dc[2]), 4)
+    quantised = np.clip(np.floor(np.sign(ac) * np.abs(ac / maximum) ** 0.5 * 9 + 9.5), 0, 18).astype(int)
+    for r, g, b in quantised:
+        result += _base83(int(r) * 19 * 19 + int(g) * 19 + int(b), 2)
+    return result
@@ -0,0 +1,485 @@
+import asyncio
+import math
+import random
+import threading
+import time
+import uuid
+import weakref
+from contextlib import nullcontext
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from redis import asyncio as redis_asyncio
+from core.conditional import make_etag
+from core.db_router import use_primary
+from core.utils import bump_generation
+
+TAG_KEY = 'tag_gen:{tag}'
+# Wall-clock time of the last invalidate_tags(), to tell whether a replica
+# could still be missing the write behind it
+INVALIDATED_AT_KEY = 'tags_invalidated_at'
+
+
+class CacheStats:
+    """
+    Per-worker cache event counters, flushed to shared counters in batches
+    so recording an event does not cost a round trip on every request
+    """
+    EVENTS = ('local_hit', 'hit', 'miss', 'refresh', 'stale', 'lock_wait')
+    KEY = 'cache_stats:{name}:{event}'
+    FLUSH_EVERY = 100
+    FLUSH_INTERVAL = 10.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pending = Counter()
+        self.flushed_at = time.monotonic()
+
+    def _count(self, name, event):
+        """Count the event; True when the batch is due for a flush"""
+        with self._lock:
+            self.pending[(name, event)] += 1
+            return (
+                sum(self.pending.values()) >= self.FLUSH_EVERY
+                or time.monotonic() - self.flushed_at >= self.FLUSH_INTERVAL
+            )
+
+    def record(self, name, event):
+        if self._count(name, event):
+            self.flush()
+
+    async def arecord(self, name, event):
+        if self._count(name, event):
+            await sync_to_async(self.flush)()
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        for (name, event), count in pending.items():
+            key = self.KEY.format(name=name, event=event)
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                cache.set(key, count, None)
+
+    def snapshot(self, names):
+        """Shared totals per name and event (flushes this worker first)"""
+        self.flush()
+        keys = {
+            self.KEY.format(name=name, event=event): (name, event)
+            for name in names for event in self.EVENTS
+        }
+        values = cache.get_many(list(keys))
+        totals = {name: dict.fromkeys(self.EVENTS, 0) for name in names}
+        for key, (name, event) in keys.items():
+            totals[name][event] = values.get(key, 0)
+        return totals
+
+
+cache_stats = CacheStats()
+
+
+class LocalCache:
+    """
+    Per-worker LRU tier in front of the shared cache
+
+    Holds already-unpickled entries for a short TTL. Cross-worker
+    invalidation: every invalidate_tags() bumps one shared generation
+    counter, which each worker polls at most every CACHE_LOCAL_SYNC_INTERVAL
+    seconds and flushes its LRU when it moved. A local hit therefore
+    costs no round trip, and other workers lag a write by at most that interval
+    """
+    GENERATION_KEY = 'local_cache_generation'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generation = None
+        self.checked_at = 0.0
+
+    @property
+    def enabled(self):
+        return settings.CACHE_LOCAL_ENABLED
+
+    def _sync_due(self):
+        return time.monotonic() - self.checked_at >= settings.CACHE_LOCAL_SYNC_INTERVAL
+
+    def _apply_generation(self, generation):
+        with self._lock:
+            self.checked_at = time.monotonic()
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+
+    def sync(self):
+        if self._sync_due():
+            self._apply_generation(cache.get(self.GENERATION_KEY))
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        self.sync()
+        return self._lookup(key)
+
+    async def aget(self, key):
+        """get() for async views: the generation poll does not block the event loop"""
+        if not self.enabled:
+            return None
+        if self._sync_due():
+            self._apply_generation(await async_cache.get(self.GENERATION_KEY))
+        return self._lookup(key)
+
+    def _lookup(self, key):
+        with self._lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if time.monotonic() >= expires_at:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.entries[key] = (entry, time.monotonic() + settings.CACHE_LOCAL_TTL)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.CACHE_LOCAL_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache()
+
+
+class AsyncCache:
+    """
+    Non-blocking reads of the shared cache for async views
+
+    On django-redis: a redis.asyncio client per event loop, using the sync
+    client's key and value encoding. Other backends go through Django's
+    async cache API (a thread hop per call, fine for development and tests)
+    """
+
+    def __init__(self):
+        self._clients = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def backend():
+        """The django-redis client, or None for other backends"""
+        client = getattr(cache, 'client', None)
+        return client if client is not None and hasattr(client, 'get_client') else None
+
+    def redis(self):
+        """redis.asyncio client bound to the running event loop, or None without django-redis"""
+        if self.backend() is None:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            config = settings.CACHES['default']
+            location = config['LOCATION']
+            if not isinstance(location, str):
+                location = location[0]
+            client = redis_asyncio.Redis.from_url(location, password=config.get('OPTIONS', {}).get('PASSWORD'))
+            self._clients[loop] = client
+        return client
+
+    async def get_many(self, keys):
+        redis = self.redis()
+        if redis is None:
+            return await cache.aget_many(keys)
+        backend = self.backend()
+        values = await redis.mget([backend.make_key(key) for key in keys])
+        return {key: backend.decode(value) for key, value in zip(keys, values) if value is not None}
+
+    async def get(self, key, default=None):
+        return (await self.get_many([key])).get(key, default)
+
+
+async_cache = AsyncCache()
+
+
+def _tag_keys(tags):
+    return {TAG_KEY.format(tag=tag): tag for tag in tags}
+
+
+def get_tag_versions(tags):
+    """
+    Current generation of each tag, fetched in one get_many round trip
+    Missing tags are seeded with a timestamp (same rule as core.utils.get_generation)
+    """
+    keys = _tag_keys(tags)
+    found = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        seed = time.time_ns()
+        for key in missing:
+            cache.add(key, seed, None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def invalidate_tags(tags):
+    """
+    Bump the generation of every tag; entries written under the old
+    generations stop matching, with no key scanning
+    On django-redis all bumps go out in one pipelined round trip
+    The local tier generation is bumped with them so other workers flush their LRU
+    """
+    keys = list(_tag_keys(set(tags)))
+    if not keys:
+        return
+    keys.append(LocalCache.GENERATION_KEY)
+    local_cache.clear()
+
+    client = getattr(cache, 'client', None)
+    if client is not None and hasattr(client, 'get_client'):
+        seed = time.time_ns()
+        pipeline = client.get_client(write=True).pipeline(transaction=False)
+        for key in keys:
+            raw_key = client.make_key(key)
+            pipeline.set(raw_key, seed, nx=True)
+            pipeline.incr(raw_key)
+        pipeline.set(client.make_key(INVALIDATED_AT_KEY), client.encode(time.time()))
+        pipeline.execute()
+        return
+
+    for key in keys:
+        bump_generation(key)
+    cache.set(INVALIDATED_AT_KEY, time.time(), None)
+
+
+def write_generation():
+    """
+    Counter moved by every invalidate_tags() (the local tier's generation)
+    Read before computing a value and pass it to set_tagged(): a write that
+    commits while the value is computed is then never hidden behind the
+    tag generations read afterwards
+    """
+    return cache.get(LocalCache.GENERATION_KEY)
+
+
+def fill_reads():
+    """
+    Where a cache fill reads: the request's replica (within
+    REPLICA_MAX_LAG_SECONDS of the primary) unless a tag was invalidated
+    more recently than that, when the replica may not have the write yet
+    and the fill reads the primary instead
+    Writes during the fill itself are caught by write_generation()
+    """
+    invalidated_at = cache.get(INVALIDATED_AT_KEY)
+    if invalidated_at is not None and time.time() - invalidated_at <= settings.REPLICA_MAX_LAG_SECONDS:
+        return use_primary()
+    return nullcontext()
+
+
+def _store_entry(key, entry, timeout, since):
+    """
+    Cache the entry unless a tag was invalidated since `since` (entry['tags']
+    is read first, so a later bump only makes the stored entry stale)
+
+    Returns:
+        bool: whether the entry was stored
+    """
+    if cache.get(LocalCache.GENERATION_KEY) != since:
+        return False
+    cache.set(key, entry, timeout)
+    local_cache.set(key, entry)
+    return True
+
+
+def read_tagged(key):
+    """
+    Read a tagged entry from the shared cache
+
+    Returns:
+        tuple: (entry, is_fresh), or (None, False) when there is no entry.
+        A stale entry is still returned so callers can serve it while refreshing
+    """
+    entry = cache.get(key)
+    if not isinstance(entry, dict) or 'tags' not in entry:
+        return None, False
+    current = get_tag_versions(entry['tags'])
+    return entry, current == entry['tags']
+
+
+def get_tagged_entry(key, name='default'):
+    """Fresh tagged entry (value, tags, computed_at), or None"""
+    entry = local_cache.get(key)
+    if entry is not None:
+        cache_stats.record(name, 'local_hit')
+        return entry
+
+    entry, is_fresh = read_tagged(key)
+    if not is_fresh:
+        cache_stats.record(name, 'miss')
+        return None
+    cache_stats.record(name, 'hit')
+    local_cache.set(key, entry)
+    return entry
+
+
+async def aget_tagged_entry(key, name='default'):
+    """
+    get_tagged_entry() for async views, without blocking the event loop
+    Tags that were never seeded count as a miss; the sync path seeds them
+    """
+    entry = await local_cache.aget(key)
+    if entry is not None:
+        await cache_stats.arecord(name, 'local_hit')
+        return entry
+
+    entry = await async_cache.get(key)
+    if isinstance(entry, dict) and 'tags' in entry:
+        keys = _tag_keys(entry['tags'])
+        found = await async_cache.get_many(list(keys))
+        if {keys[key]: version for key, version in found.items()} == entry['tags']:
+            await cache_stats.arecord(name, 'hit')
+            local_cache.set(key, entry)
+            return entry
+    await cache_stats.arecord(name, 'miss')
+    return None
+
+
+def get_tagged(key, default=None, name='default'):
+    """Value of a tagged entry if none of its tags moved since it was written"""
+    entry = get_tagged_entry(key, name)
+    return default if entry is None else entry['value']
+
+
+def set_tagged(key, value, tags, since, timeout=None):
+    """
+    Store a value together with the current generation of each tag
+    since: write_generation() read before computing the value; when a tag
+    was invalidated in between, the value may predate that write and the
+    entry is returned without being stored
+    """
+    entry = {'value': value, 'tags': get_tag_versions(tags), 'computed_at': time.time()}
+    _store_entry(key, entry, timeout, since)
+    return entry
+
+
+def entry_validators(key, entry):
+    """
+    ETag and Last-Modified of a cached representation
+    The ETag hashes the tag generations it was computed under, so a recompute
+    with no intervening write yields the same ETag
+    """
+    etag = make_etag(key, sorted(entry['tags'].items()))
+    computed_at = entry.get('computed_at')
+    last_modified = datetime.fromtimestamp(computed_at, tz=dt_timezone.utc) if computed_at else None
+    return etag, last_modified
+
+
+def _release_lock(lock_key, token):
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _compute_and_store(key, compute, timeout):
+    since = write_generation()
+    started = time.monotonic()
+    with fill_reads():
+        value, tags = compute()
+    delta = time.monotonic() - started
+    now = time.time()
+    entry = {
+        'value': value,
+        'tags': get_tag_versions(tags),
+        'computed_at': now,
+        'expires_at': now + timeout,
+        'delta': delta,
+    }
+    _store_entry(key, entry, timeout + settings.CACHE_STALE_TTL, since)
+    return entry
+
+
+def _needs_refresh(entry, now):
+    """
+    Logical expiry with probabilistic early refresh (XFetch):
+    the closer to expiry and the more expensive the recompute,
+    the more likely one request refreshes ahead of time
+    """
+    expires_at = entry.get('expires_at')
+    if expires_at is None:
+        return False
+    delta = entry.get('delta', 0.0)
+    jitter = -delta * settings.CACHE_EARLY_REFRESH_BETA * math.log(1.0 - random.random())
+    return now + jitter >= expires_at
+
+
+def get_or_compute_tagged_entry(key, compute, timeout, name='default'):
+    """
+    Single-flight tagged cache read, returning the whole entry
+
+    compute() returns (value, tags). Only the worker holding the short lock
+    recomputes; the others serve the stale value while it does, or wait
+    briefly when there is nothing to serve yet
+    """
+    entry = local_cache.get(key)
+    if entry is not None:
+        cache_stats.record(name, 'local_hit')
+        return entry
+
+    entry, is_fresh = read_tagged(key)
+    has_value = entry is not None
+    if is_fresh and not _needs_refresh(entry, time.time()):
+        cache_stats.record(name, 'hit')
+        local_cache.set(key, entry)
+        return entry
+
+    lock_key = f'lock:{key}'
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, settings.CACHE_LOCK_TTL):
+        try:
+            cache_stats.record(name, 'refresh' if has_value else 'miss')
+            return _compute_and_store(key, compute, timeout)
+        finally:
+            _release_lock(lock_key, token)
+
+    if has_value:
+        cache_stats.record(name, 'stale')
+        return entry
+
+    # Nothing to serve and another worker is computing: wait for its result
+    cache_stats.record(name, 'lock_wait')
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if isinstance(entry, dict) and 'tags' in entry:
+            return entry
+
+    cache_stats.record(name, 'miss')
+    return _compute_and_store(key, compute, timeout)
+
+
+def get_or_compute_tagged(key, compute, timeout, name='default'):
+    """Value of get_or_compute_tagged_entry()"""
+    return get_or_compute_tagged_entry(key, compute, timeout, name)['value']
+
+
+def property_tag(property_id):
+    return f'property:{property_id}'
+
+
+def category_tag(category_id):
+    return f'category:{category_id}'
+
+
+def recommendations_tag(property_id):
+    return f'recommendations:{property_id}'
+
+
+PROPERTY_LIST_TAG = 'property-list'
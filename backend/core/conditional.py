@@ -0,0 +1,62 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Strong ETag from the validator parts (versions, timestamps, counts)"""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def representation_etag(etag, media_type):
+    """
+    ETag of one rendering (JSON, MessagePack, HTML) of a resource: the same
+    data in another format is another byte sequence, so a strong ETag
+    must not be shared between them
+    """
+    return make_etag(etag, media_type)
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for read-only viewset actions
+
+    An action calls not_modified() with validators that cost no query: the
+    tag generations of a cached entry (core.cache.entry_validators), the
+    property-list generation for uncached staff reads, or the category tree
+    version. A matching If-None-Match / If-Modified-Since returns 304 before
+    anything is serialized; otherwise the validators are added to the final
+    response. The ETag is made per negotiated format (representation_etag),
+    and responses carry Vary: Accept.
+    """
+
+    def not_modified(self, request, etag=None, last_modified=None):
+        """
+        Returns:
+            Response or None: 304 response when the client copy is current
+        """
+        if etag:
+            etag = representation_etag(etag, request.accepted_renderer.media_type)
+        self._validators = (etag, last_modified)
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            self._add_validators(response)
+        return response
+
+    def _add_validators(self, response):
+        etag, last_modified = getattr(self, '_validators', (None, None))
+        if etag and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code == 200:
+            self._add_validators(response)
+        patch_vary_headers(response, ['Accept'])
+        return response
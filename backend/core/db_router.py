@@ -0,0 +1,128 @@
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Replica alias the current request may read from (None: primary)
+_read_db = contextvars.ContextVar('read_db', default=None)
+
+
+class ReplicaLagMonitor:
+    """
+    Per-worker replication lag of each replica, measured at most once every
+    REPLICA_LAG_CHECK_INTERVAL seconds with one cheap query
+    A replica that cannot be reached, or is not streaming from the primary,
+    counts as infinitely behind
+    """
+    # NULL (infinitely behind) without a streaming WAL receiver: a replica
+    # cut off from the primary has replayed all it received and would
+    # otherwise look caught up. Zero when every received WAL record is
+    # replayed: an idle replica is caught up even though its last replayed
+    # transaction is old
+    LAG_SQL = {
+        'postgresql': (
+            "SELECT CASE "
+            "WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL "
+            "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        ),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lags = {}
+
+    def measure(self, alias):
+        connection = connections[alias]
+        sql = self.LAG_SQL.get(connection.vendor)
+        if sql is None:
+            # Test mirrors and backends without streaming replication
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+                lag = cursor.fetchone()[0]
+        except DatabaseError:
+            return float('inf')
+        return float('inf') if lag is None else float(lag)
+
+    def lag(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            measured = self.lags.get(alias)
+        if measured is not None and now - measured[1] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return measured[0]
+        lag = self.measure(alias)
+        with self._lock:
+            self.lags[alias] = (lag, now)
+        return lag
+
+    def healthy(self):
+        """Replicas within REPLICA_MAX_LAG_SECONDS of the primary"""
+        return [
+            alias for alias in settings.REPLICA_DATABASES
+            if self.lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+        ]
+
+    def pick(self):
+        healthy = self.healthy()
+        return random.choice(healthy) if healthy else None
+
+    async def apick(self):
+        """pick() for async requests; only a due measurement leaves the event loop"""
+        now = time.monotonic()
+        with self._lock:
+            due = any(
+                alias not in self.lags or now - self.lags[alias][1] >= settings.REPLICA_LAG_CHECK_INTERVAL
+                for alias in settings.REPLICA_DATABASES
+            )
+        return await sync_to_async(self.pick)() if due else self.pick()
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+@contextmanager
+def read_from(alias):
+    """Route this context's reads to a replica alias (None: the primary)"""
+    token = _read_db.set(alias)
+    try:
+        yield
+    finally:
+        _read_db.reset(token)
+
+
+def use_primary():
+    """Read from the primary inside this block, e.g. to fill a shared cache"""
+    return read_from(None)
+
+
+class ReplicaRouter:
+    """
+    Reads go to the replica the request middleware picked, everything else
+    to the primary: writes, reads inside a transaction (they may lock or
+    depend on rows just written), Celery tasks and management commands
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_db.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in settings.REPLICA_DATABASES
@@ -0,0 +1,48 @@
+import math
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+GEOHASH_PRECISION = 12
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of a point (interleaved longitude/latitude bits)"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = bits * 2 + 1
+                lng_range[0] = mid
+            else:
+                bits = bits * 2
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = bits * 2 + 1
+                lat_range[0] = mid
+            else:
+                bits = bits * 2
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
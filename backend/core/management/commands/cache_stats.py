@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from core.cache import CacheStats, cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show shared cache counters and hit ratios per tier (worker LRU, shared cache)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', default=['property_detail', 'recommendations', 'property_list', 'facets'])
+
+    def handle(self, *args, **options):
+        totals = cache_stats.snapshot(options['names'])
+        header = ''.join(f'{event:>11}' for event in CacheStats.EVENTS)
+        self.stdout.write(f"{'cache':<18}{header}{'local':>11}{'shared':>11}{'overall':>11}")
+        for name, counts in totals.items():
+            served = counts['hit'] + counts['stale']
+            shared_requests = served + counts['miss'] + counts['refresh'] + counts['lock_wait']
+            requests = counts['local_hit'] + shared_requests
+            local_ratio = counts['local_hit'] / requests if requests else 0.0
+            shared_ratio = served / shared_requests if shared_requests else 0.0
+            overall = (counts['local_hit'] + served) / requests if requests else 0.0
+            row = ''.join(f'{counts[event]:>11}' for event in CacheStats.EVENTS)
+            self.stdout.write(f'{name:<18}{row}{local_ratio:>11.1%}{shared_ratio:>11.1%}{overall:>11.1%}')
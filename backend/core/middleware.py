@@ -0,0 +1,95 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from core.cache import async_cache
+from core.db_router import lag_monitor, read_from
+
+PIN_KEY = 'db_pin:{client}'
+
+
+def token_user_id(request):
+    """User id in the request's access token, checked without a database query (None if absent or invalid)"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw = authentication.get_raw_token(header)
+        if raw is None:
+            return None
+        return authentication.get_validated_token(raw)[jwt_settings.USER_ID_CLAIM]
+    except (AuthenticationFailed, KeyError):
+        return None
+
+
+def client_key(request):
+    """
+    Who is asking, without a database query: the user id in a valid access
+    token, else the session cookie (Django admin), else None (anonymous)
+    """
+    user_id = token_user_id(request)
+    if user_id is not None:
+        return f'user:{user_id}'
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return f'session:{session}' if session else None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe reads of REPLICA_READ_PATHS from a read replica
+
+    A client that wrote something reads from the primary for the next
+    REPLICA_STICKY_SECONDS, so it always sees its own writes; replicas
+    lagging more than REPLICA_MAX_LAG_SECONDS are skipped, and with none
+    left the request reads from the primary
+    Runs natively under both WSGI and ASGI
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            client = client_key(request)
+            if client is not None and response.status_code < 400:
+                cache.set(PIN_KEY.format(client=client), 1, settings.REPLICA_STICKY_SECONDS)
+            return response
+
+        database = None
+        if self.replica_path(request):
+            client = client_key(request)
+            if client is None or not cache.get(PIN_KEY.format(client=client)):
+                database = lag_monitor.pick()
+        with read_from(database):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            client = client_key(request)
+            if client is not None and response.status_code < 400:
+                await cache.aset(PIN_KEY.format(client=client), 1, settings.REPLICA_STICKY_SECONDS)
+            return response
+
+        database = None
+        if self.replica_path(request):
+            client = client_key(request)
+            if client is None or not await async_cache.get(PIN_KEY.format(client=client)):
+                database = await lag_monitor.apick()
+        with read_from(database):
+            return await self.get_response(request)
+
+    @staticmethod
+    def replica_path(request):
+        return bool(settings.REPLICA_DATABASES) and request.path.startswith(tuple(settings.REPLICA_READ_PATHS))
@@ -0,0 +1,167 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on (created_at, id), newest first
+    Each page is an indexed range scan: no COUNT(*) and no OFFSET
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+    ordering_message = 'Cursor pagination only supports the default newest-first order'
+    # Explicit orderings a (created_at, id) cursor continues; anything else
+    # (search rank, distance, ?ordering=) would be silently replaced
+    keyset_orderings = {(), ('-created_at',), ('-created_at', '-pk'), ('-created_at', '-id')}
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Cursor = base64 of 'c=<created_at>&i=<id>&r=<reverse>'"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), strict_parsing=True)
+            created_at = parse_datetime(values['c'][0])
+            pk = int(values['i'][0])
+            reverse = values.get('r', ['0'])[0] == '1'
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk, reverse
+
+    @staticmethod
+    def row_key(row):
+        """(created_at, pk) of a model instance or a .values() row"""
+        if isinstance(row, dict):
+            return row['created_at'], row['id']
+        return row.created_at, row.pk
+
+    def encode_cursor(self, row, reverse):
+        created_at, pk = self.row_key(row)
+        querystring = parse.urlencode({
+            'c': created_at.isoformat(),
+            'i': pk,
+            'r': '1' if reverse else '0',
+        })
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def check_ordering(self, queryset):
+        """400 when the queryset is ordered some other way than the cursor"""
+        if tuple(queryset.query.order_by) not in self.keyset_orderings:
+            raise ValidationError({self.cursor_query_param: self.ordering_message})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.check_ordering(queryset)
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            created_at, pk, reverse = None, None, False
+            queryset = queryset.order_by('-created_at', '-pk')
+        else:
+            created_at, pk, reverse = cursor
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+                ).order_by('created_at', 'pk')
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+                ).order_by('-created_at', '-pk')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Moving backwards there is always a next page; moving forwards there is
+        # a previous page whenever we arrived through a cursor
+        self.has_next = has_more if not reverse else True
+        self.has_previous = cursor is not None if not reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetOrPageNumberPagination(BasePagination):
+    """
+    Page numbers by default (the UI needs ?page= and a total count);
+    keyset pagination when the client opts in with ?pagination=cursor or sends a ?cursor=
+    (newest first only: combined with search, ?near= or ?ordering= it is a 400)
+    """
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.page_number = PageNumberPagination()
+        self.keyset = KeysetPagination()
+        self.active = self.page_number
+
+    def paginate_queryset(self, queryset, request, view=None):
+        use_keyset = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset.cursor_query_param in request.query_params
+        )
+        self.active = self.keyset if use_keyset else self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.active.to_html() if self.active is self.page_number else ''
+
+    def get_schema_fields(self, view):
+        return self.page_number.get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_number.get_schema_operation_parameters(view)
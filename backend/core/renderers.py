@@ -0,0 +1,47 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: plain DRF JSON without it
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: application/msgpack is only offered when installed
+    msgpack = None
+
+# Types orjson and msgpack do not know natively (Decimal, lazy strings, UUID,
+# timedelta, querysets...) are converted the way DRF's JSON encoder does it
+_fallback = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson: same compact UTF-8 output, several times faster
+    on large pages. Indented output (the ?indent= / browsable API case) and
+    a missing orjson fall back to DRF's encoder
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_fallback, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        # Like DRF: keep U+2028/2029 escaped so the output is also valid JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack for clients that send Accept: application/msgpack (needs the msgpack package)"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_fallback, datetime=False)
@@ -0,0 +1,139 @@
+from decimal import ROUND_HALF_UP, Decimal
+from operator import itemgetter
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+
+def decimal_converter(field):
+    """DRF DecimalField output: fixed decimal places, as a string unless COERCE_DECIMAL_TO_STRING is off"""
+    quantum = Decimal(1).scaleb(-field.decimal_places)
+    as_string = api_settings.COERCE_DECIMAL_TO_STRING
+
+    def convert(value):
+        if value is None:
+            return None
+        value = value.quantize(quantum, rounding=ROUND_HALF_UP)
+        return f'{value:f}' if as_string else value
+    return convert
+
+
+def datetime_converter(field):
+    """DRF DateTimeField output: ISO 8601 in the current time zone, UTC as Z"""
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def convert(value):
+        if value is None:
+            return None
+        if tz is not None and timezone.is_aware(value):
+            value = value.astimezone(tz)
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def date_converter(field):
+    return lambda value: None if value is None else value.isoformat()
+
+
+def float_converter(field):
+    return lambda value: None if value is None else float(value)
+
+
+# Model field types whose DRF representation differs from the database value;
+# everything else (text, integers, booleans, JSON) is returned as read
+CONVERTERS = [
+    (models.DecimalField, decimal_converter),
+    (models.DateTimeField, datetime_converter),
+    (models.DateField, date_converter),
+    (models.FloatField, float_converter),
+]
+
+
+class ValuesRowSerializer:
+    """
+    Read-only serializer over .values() rows, for hot list endpoints
+
+    A ModelSerializer builds a model instance per row and dispatches through
+    every field's get_attribute / to_representation. Here the row is a dict
+    straight from the cursor and each output field has one getter compiled
+    per request: itemgetter for plain columns, a converter chosen from the
+    model field type where DRF would reformat the value, or a method for
+    computed fields. Subclasses list the output in the DRF serializer's order
+    and must produce exactly its output (tests compare the two).
+
+    fields: output names; a field with a get_<name>(row) method is computed,
+        any other is the model field's column of the same name
+    extra_columns: computed field -> the columns it reads
+    required_columns: read even when not output (e.g. keyset cursor columns)
+    includes: relations ?include= may send as ids (see core.sparse); the
+        field's column is then the foreign key itself
+
+    A core.sparse selection in the context narrows the output to the
+    top-level ?fields= (id is always kept) and applies ?include=
+    """
+    model = None
+    fields = ()
+    extra_columns = {}
+    required_columns = ()
+    includes = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.selection = self.context.get('selection')
+        wanted = self.selection.fields_at('') if self.selection else None
+        self.output = [name for name in self.fields if wanted is None or name in wanted or name == 'id']
+        self.included = set(self.includes) & self.selection.includes if self.selection else set()
+
+    def computed(self, name):
+        return getattr(self, f'get_{name}', None)
+
+    def columns(self):
+        columns = []
+        for name in self.output:
+            if name in self.included or not self.computed(name):
+                columns.append(name)
+            else:
+                columns += self.extra_columns.get(name, [])
+        return list(dict.fromkeys(columns + list(self.required_columns)))
+
+    def values(self, queryset):
+        """The queryset as .values() rows with every column this serializer reads"""
+        return queryset.values(*self.columns())
+
+    def compile(self):
+        """(name, getter) per output field"""
+        model_fields = {field.name: field for field in self.model._meta.concrete_fields}
+        plan = []
+        for name in self.output:
+            if name in self.included:
+                plan.append((name, self.included_getter(name)))
+                continue
+            if self.computed(name):
+                plan.append((name, self.computed(name)))
+                continue
+            field = model_fields[name]
+            getter = itemgetter(name)
+            for field_type, factory in CONVERTERS:
+                if isinstance(field, field_type):
+                    convert = factory(field)
+                    getter = lambda row, name=name, convert=convert: convert(row[name])  # noqa: E731
+                    break
+            plan.append((name, getter))
+        return plan
+
+    def included_getter(self, name):
+        """The foreign key id, collected for the response's included map"""
+        selection = self.selection
+
+        def get(row):
+            pk = row[name]
+            if pk is not None:
+                selection.collect(name, pk)
+            return pk
+        return get
+
+    def to_representation(self, rows):
+        plan = self.compile()
+        return [{name: get(row) for name, get in plan} for row in rows]
@@ -0,0 +1,268 @@
+import hashlib
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+# Sparse fieldsets and sideloaded includes for read endpoints
+#
+#   ?fields=id,status,property          top-level fields (id is always kept)
+#   ?fields[property]=name,price        fields of a nested or included object
+#   ?include=property,user              relations sent as ids; each object is
+#                                       serialized once into "included"
+#
+# Included objects are keyed by id: {"included": {"property": {"12": {...}}}}.
+# Without these parameters nothing changes.
+
+
+class FieldSelection:
+    """Parsed ?fields= / ?fields[path]= / ?include= of one request"""
+
+    def __init__(self, fields=None, includes=()):
+        self.fields = fields or {}  # path ('' = top level) -> set of field names
+        self.includes = set(includes)
+        self.pending = {}  # include name -> ids seen while serializing
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        fields = {}
+        for param, value in query_params.items():
+            if param == 'fields':
+                path = ''
+            elif param.startswith('fields[') and param.endswith(']'):
+                path = param[len('fields['):-1]
+            else:
+                continue
+            fields[path] = {name.strip() for name in value.split(',') if name.strip()}
+        includes = {name.strip() for name in query_params.get('include', '').split(',') if name.strip()}
+        return cls(fields, includes)
+
+    def __bool__(self):
+        return bool(self.fields or self.includes)
+
+    def key(self):
+        """Canonical form for cache keys ('' without a selection)"""
+        if not self:
+            return ''
+        parts = [f'{path}={",".join(sorted(names))}' for path, names in sorted(self.fields.items())]
+        parts.append(f'include={",".join(sorted(self.includes))}')
+        return hashlib.md5('&'.join(parts).encode()).hexdigest()
+
+    def fields_at(self, path):
+        """Field names asked for at `path`, or None for all of them"""
+        return self.fields.get(path)
+
+    def collect(self, include, pk):
+        self.pending.setdefault(include, set()).add(pk)
+
+    def check(self, serializer):
+        """
+        Raises ValidationError (400) for unknown includes and field names,
+        so a typo never silently returns a full or empty payload
+        """
+        includes = get_includes(serializer)
+        unknown = sorted(self.includes - set(includes))
+        if unknown:
+            raise ValidationError({'include': f"Unknown includes: {', '.join(unknown)}"})
+        for path, names in self.fields.items():
+            target = self.resolve(serializer, path, includes)
+            if not isinstance(target, SparseFieldsMixin):
+                raise ValidationError({f'fields[{path}]': 'Unknown or unsupported path'})
+            unknown = sorted(names - set(target.all_fields()))
+            if unknown:
+                label = f'fields[{path}]' if path else 'fields'
+                raise ValidationError({label: f"Unknown fields: {', '.join(unknown)}"})
+
+    def resolve(self, serializer, path, includes):
+        """The serializer that renders the objects at a dotted path"""
+        if not path:
+            return serializer
+        parts = path.split('.')
+        if parts[0] in self.includes:
+            serializer = includes[parts[0]]()
+            parts = parts[1:]
+        for name in parts:
+            if not isinstance(serializer, SparseFieldsMixin):
+                return None
+            field = serializer.all_fields().get(name)
+            if isinstance(field, serializers.ListSerializer):
+                field = field.child
+            if not isinstance(field, serializers.BaseSerializer):
+                return None
+            serializer = field
+        return serializer
+
+
+def get_includes(serializer):
+    """name -> serializer class of the relations a serializer can sideload (Meta.includes)"""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    return getattr(getattr(serializer, 'Meta', None), 'includes', {})
+
+
+class IncludedField(serializers.PrimaryKeyRelatedField):
+    """A relation sent as its id; the object itself goes into the included map"""
+
+    def __init__(self, include, **kwargs):
+        self.include = include
+        super().__init__(read_only=True, **kwargs)
+
+    def to_representation(self, value):
+        pk = super().to_representation(value)
+        self.context['selection'].collect(self.include, pk)
+        return pk
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer side: drops the fields not asked for and swaps included
+    relations for IncludedField. Serializers declare in Meta
+      includes: relation name -> serializer class for ?include=
+      sparse_sources: method field -> model columns it reads (for only())
+    """
+
+    def all_fields(self):
+        return super().get_fields()
+
+    def sparse_path(self):
+        names, serializer = [], self
+        while serializer.parent is not None:
+            if serializer.field_name:
+                names.append(serializer.field_name)
+            serializer = serializer.parent
+        root = self.context.get('sparse_path', '')
+        return '.'.join(([root] if root else []) + names[::-1])
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.context.get('selection')
+        if not selection:
+            return fields
+        path = self.sparse_path()
+        wanted = selection.fields_at(path)
+        if wanted is not None:
+            fields = {name: field for name, field in fields.items() if name in wanted or name == 'id'}
+        if path == '':
+            for name, field in fields.items():
+                if name in selection.includes:
+                    fields[name] = IncludedField(name, source=field.source)
+        return fields
+
+
+def field_lookups(serializer, prefix=''):
+    """
+    (only, select_related) lookups covering the fields a serializer outputs
+    only is None when some field reads something other than known model
+    columns (a method without sparse_sources, a property, a to-many relation)
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = serializer.Meta.model
+    sources = getattr(serializer.Meta, 'sparse_sources', {})
+    only, related = [], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in sources:
+                return None, related
+            only += [prefix + column for column in sources[name]]
+            continue
+        if field.source == '*' or isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+            return None, related
+        current, path = model, prefix
+        for attr in field.source_attrs[:-1]:
+            try:
+                relation = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None, related
+            if not relation.many_to_one and not relation.one_to_one:
+                return None, related
+            only.append(path + attr)
+            related.append(path + attr)
+            current, path = relation.related_model, f'{path}{attr}__'
+        try:
+            current._meta.get_field(field.source_attrs[-1])
+        except FieldDoesNotExist:
+            return None, related
+        only.append(path + field.source_attrs[-1])
+        if isinstance(field, serializers.BaseSerializer):
+            related.append(path + field.source_attrs[-1])
+            nested_only, nested_related = field_lookups(field, f'{path}{field.source_attrs[-1]}__')
+            related += nested_related
+            if nested_only is None:
+                return None, related
+            only += nested_only
+    return only, related
+
+
+class SparseFieldsViewMixin:
+    """
+    ViewSet side for list and retrieve: parses and checks the selection,
+    narrows the queryset to the columns and joins the output needs, and
+    adds the included map to the response
+    """
+    sparse_actions = ('list', 'retrieve')
+    # Read even when not asked for: keyset cursors are built from created_at
+    sparse_required_fields = ('created_at',)
+
+    def get_selection(self):
+        if not hasattr(self, '_selection'):
+            self._selection = (
+                FieldSelection.from_query_params(self.request.query_params)
+                if self.action in self.sparse_actions and self.request.method in ('GET', 'HEAD')
+                else FieldSelection()
+            )
+        return self._selection
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.get_selection():
+            self.get_selection().check(self.get_serializer())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['selection'] = self.get_selection()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.get_selection():
+            return queryset
+        only, related = field_lookups(self.get_serializer())
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        if only is not None:
+            queryset = queryset.only(*only, *self.sparse_required_fields)
+        return queryset
+
+    def get_included(self):
+        """The included map for the ids collected while serializing"""
+        selection = self.get_selection()
+        includes = get_includes(self.get_serializer())
+        included = {}
+        for name in sorted(selection.includes):
+            ids = selection.pending.get(name, set())
+            context = {**self.get_serializer_context(), 'sparse_path': name}
+            serializer = includes[name](context=context)
+            queryset = serializer.Meta.model._default_manager.filter(pk__in=ids)
+            only, related = field_lookups(serializer)
+            if related:
+                queryset = queryset.select_related(*related)
+            if only is not None:
+                queryset = queryset.only(*only)
+            data = includes[name](queryset, many=True, context=context).data
+            included[name] = {str(item['id']): item for item in data}
+        return included
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.get_selection().includes:
+            response.data['included'] = self.get_included()
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if self.get_selection().includes:
+            response.data['included'] = self.get_included()
+        return response
@@ -1,3 +1,263 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from core.cache import (
+    INVALIDATED_AT_KEY, LocalCache, _compute_and_store, cache_stats, fill_reads, get_or_compute_tagged,
+    invalidate_tags, local_cache,
+)
+from core.db_router import ReplicaLagMonitor, ReplicaRouter, lag_monitor, use_primary
+from core.middleware import ReplicaRoutingMiddleware
+from properties.models import Property
+from properties.views import PropertyViewSet
+from services.change_feed_service import ChangeFeedService
 
-# Create your tests here.
+
+@override_settings(CACHE_LOCAL_ENABLED=False)
+class SingleFlightCacheTestCase(TestCase):
+    """Test stampede protection on hot cache keys"""
+    
+    def setUp(self):
+        cache.clear()
+        cache_stats.pending.clear()
+        self.calls = 0
+    
+    def compute(self, value='fresh'):
+        def inner():
+            self.calls += 1
+            return value, ['property:1']
+        return inner
+    
+    def events(self):
+        return {event: count for (name, event), count in cache_stats.pending.items() if name == 'test'}
+    
+    def test_hit_after_first_compute(self):
+        """Test the second read is served from cache"""
+        get_or_compute_tagged('key', self.compute(), 60, name='test')
+        self.assertEqual(get_or_compute_tagged('key', self.compute(), 60, name='test'), 'fresh')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.events(), {'miss': 1, 'hit': 1})
+    
+    def test_stale_served_while_another_worker_refreshes(self):
+        """Test an invalidated entry is served stale when the lock is taken"""
+        get_or_compute_tagged('key', self.compute('old'), 60, name='test')
+        invalidate_tags(['property:1'])
+        cache.add('lock:key', 'other-worker', 10)
+        
+        self.assertEqual(get_or_compute_tagged('key', self.compute('new'), 60, name='test'), 'old')
+        self.assertEqual(self.events()['stale'], 1)
+        
+        cache.delete('lock:key')
+        self.assertEqual(get_or_compute_tagged('key', self.compute('new'), 60, name='test'), 'new')
+    
+    def test_waits_for_other_worker_on_cold_key(self):
+        """Test a cold miss waits for the lock holder instead of recomputing"""
+        cache.add('lock:key', 'other-worker', 10)
+        
+        def other_worker():
+            time.sleep(0.1)
+            _compute_and_store('key', self.compute('shared'), 60)
+        
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        value = get_or_compute_tagged('key', self.compute('duplicate'), 60, name='test')
+        thread.join()
+        
+        self.assertEqual(value, 'shared')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.events(), {'lock_wait': 1})
+    
+    def test_write_during_compute_is_not_hidden(self):
+        """Test a value computed across a tag bump is served once but not cached under the new generation"""
+        def racing():
+            self.calls += 1
+            invalidate_tags(['property:1'])
+            return 'old', ['property:1']
+        
+        self.assertEqual(get_or_compute_tagged('key', racing, 60, name='test'), 'old')
+        self.assertEqual(get_or_compute_tagged('key', self.compute('new'), 60, name='test'), 'new')
+        self.assertEqual(get_or_compute_tagged('key', self.compute('newer'), 60, name='test'), 'new')
+        self.assertEqual(self.calls, 2)
+    
+    @override_settings(CACHE_EARLY_REFRESH_BETA=1e9)
+    def test_probabilistic_early_refresh(self):
+        """Test an expensive entry is refreshed before its TTL runs out"""
+        def slow():
+            time.sleep(0.01)
+            return 'value', ['property:1']
+        
+        get_or_compute_tagged('key', slow, 60, name='test')
+        get_or_compute_tagged('key', slow, 60, name='test')
+        self.assertEqual(self.events(), {'miss': 1, 'refresh': 1})
+
+
+@override_settings(CACHE_LOCAL_SYNC_INTERVAL=0)
+class LocalCacheTestCase(TestCase):
+    """Test the per-worker LRU tier in front of the shared cache"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        cache_stats.pending.clear()
+        self.calls = 0
+    
+    def compute(self, value='fresh'):
+        def inner():
+            self.calls += 1
+            return value, ['property:1']
+        return inner
+    
+    def events(self):
+        return {event: count for (name, event), count in cache_stats.pending.items() if name == 'test'}
+    
+    def test_local_hit_skips_shared_cache(self):
+        """Test a repeated read is served from the worker LRU"""
+        get_or_compute_tagged('key', self.compute(), 60, name='test')
+        cache.delete('key')
+        self.assertEqual(get_or_compute_tagged('key', self.compute('other'), 60, name='test'), 'fresh')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.events(), {'miss': 1, 'local_hit': 1})
+    
+    def test_other_worker_invalidation_flushes_lru(self):
+        """Test a generation bump from another worker empties this worker's LRU"""
+        get_or_compute_tagged('key', self.compute('old'), 60, name='test')
+        # Another worker invalidates: the shared generation moves, this LRU is untouched
+        local_entries = dict(local_cache.entries)
+        invalidate_tags(['property:1'])
+        local_cache.entries.update(local_entries)
+        
+        self.assertEqual(get_or_compute_tagged('key', self.compute('new'), 60, name='test'), 'new')
+        self.assertNotIn('local_hit', self.events())
+    
+    @override_settings(CACHE_LOCAL_MAX_ENTRIES=2)
+    def test_lru_is_size_bounded(self):
+        """Test the least recently used entry is evicted first"""
+        lru = LocalCache()
+        lru.set('a', {'value': 1})
+        lru.set('b', {'value': 2})
+        lru.get('a')
+        lru.set('c', {'value': 3})
+        self.assertEqual(list(lru.entries), ['a', 'c'])
+    
+    @override_settings(CACHE_LOCAL_TTL=0)
+    def test_local_entries_expire(self):
+        """Test entries older than the local TTL fall through to the shared cache"""
+        get_or_compute_tagged('key', self.compute(), 60, name='test')
+        get_or_compute_tagged('key', self.compute(), 60, name='test')
+        self.assertEqual(self.events(), {'miss': 1, 'hit': 1})
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], REPLICA_LAG_CHECK_INTERVAL=60)
+class ReplicaRoutingTestCase(SimpleTestCase):
+    """Test read routing to replicas (no transaction: reads in one always use the primary)"""
+    
+    def setUp(self):
+        cache.clear()
+        lag_monitor.lags.clear()
+        self.addCleanup(lag_monitor.lags.clear)
+        measure = mock.patch.object(lag_monitor, 'measure', return_value=0.2)
+        self.measure = measure.start()
+        self.addCleanup(measure.stop)
+        self.factory = RequestFactory()
+        token = AccessToken.for_user(get_user_model()(id=7))
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+    
+    def read_database(self, method='get', path='/api/properties/', status=200, **extra):
+        """Database a model read inside the request would use"""
+        seen = []
+        
+        def view(request):
+            seen.append(ReplicaRouter().db_for_read(Property))
+            return HttpResponse(status=status)
+        
+        ReplicaRoutingMiddleware(view)(getattr(self.factory, method)(path, **extra))
+        return seen[0]
+    
+    def test_safe_catalog_reads_use_replica(self):
+        """Test GETs under the read paths go to a replica, other requests to the primary"""
+        self.assertEqual(self.read_database(), 'replica1')
+        self.assertEqual(self.read_database(path='/api/bookings/', **self.auth), 'replica1')
+        self.assertEqual(self.read_database(path='/api/payments/'), 'default')
+        self.assertEqual(self.read_database(method='post'), 'default')
+        self.assertEqual(ReplicaRouter().db_for_read(Property), 'default')
+    
+    def test_client_reads_its_own_writes(self):
+        """Test a successful write pins that client to the primary for a while"""
+        self.read_database(method='post', status=400, **self.auth)
+        self.assertEqual(self.read_database(**self.auth), 'replica1')
+        
+        self.read_database(method='post', status=201, **self.auth)
+        self.assertEqual(self.read_database(**self.auth), 'default')
+        self.assertEqual(self.read_database(), 'replica1')
+        
+        cache.clear()
+        self.assertEqual(self.read_database(**self.auth), 'replica1')
+    
+    def test_lagging_replica_falls_back_to_primary(self):
+        """Test a replica beyond the lag threshold is skipped until it catches up"""
+        self.measure.return_value = 30.0
+        self.assertEqual(self.read_database(), 'default')
+        self.assertEqual(self.read_database(), 'default')
+        self.assertEqual(self.measure.call_count, 1)
+        
+        self.measure.return_value = 0.0
+        with override_settings(REPLICA_LAG_CHECK_INTERVAL=0):
+            self.assertEqual(self.read_database(), 'replica1')
+    
+    def test_use_primary_ignores_replica(self):
+        """Test reads inside use_primary() ignore the request's replica"""
+        def view(request):
+            with use_primary():
+                return HttpResponse(ReplicaRouter().db_for_read(Property))
+        
+        response = ReplicaRoutingMiddleware(view)(self.factory.get('/api/properties/'))
+        self.assertEqual(response.content, b'default')
+    
+    def test_cache_fills_use_replica_unless_recently_invalidated(self):
+        """Test a fill reads the replica unless a write may not have replicated yet"""
+        def view(request):
+            with fill_reads():
+                return HttpResponse(ReplicaRouter().db_for_read(Property))
+        
+        fill = ReplicaRoutingMiddleware(view)
+        self.assertEqual(fill(self.factory.get('/api/properties/')).content, b'replica1')
+        invalidate_tags(['property:1'])
+        self.assertEqual(fill(self.factory.get('/api/properties/')).content, b'default')
+        cache.set(INVALIDATED_AT_KEY, time.time() - 60, None)
+        self.assertEqual(fill(self.factory.get('/api/properties/')).content, b'replica1')
+    
+    def test_change_feed_reads_primary(self):
+        """Test the change feed ignores the request's replica (its settle window is shorter than the allowed lag)"""
+        seen = []
+        
+        def get_changes(*args, **kwargs):
+            seen.append(ReplicaRouter().db_for_read(Property))
+            return {
+                'properties': [], 'categories': [], 'deleted_properties': [], 'deleted_categories': [],
+                'cursor': 0, 'has_more': False,
+            }
+        
+        view = PropertyViewSet.as_view({'get': 'changes'})
+        with mock.patch.object(ChangeFeedService, 'get_changes', side_effect=get_changes):
+            response = ReplicaRoutingMiddleware(view)(self.factory.get('/api/properties/changes/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(seen, ['default'])
+
+
+class ReplicaLagMonitorTestCase(TestCase):
+    """Test replication lag measurement"""
+    
+    def test_unknown_lag_counts_as_infinite(self):
+        """Test a NULL lag (no streaming WAL receiver) keeps the replica out of rotation"""
+        with mock.patch.dict(ReplicaLagMonitor.LAG_SQL, {connection.vendor: 'SELECT NULL'}):
+            self.assertEqual(ReplicaLagMonitor().measure('default'), float('inf'))
+    
+    @skipUnless(connection.vendor == 'postgresql', 'pg_stat_wal_receiver is PostgreSQL-only')
+    def test_server_without_wal_receiver_is_lagging(self):
+        """Test a server that is not streaming from a primary never reports as caught up"""
+        self.assertEqual(ReplicaLagMonitor().measure('default'), float('inf'))
@@ -0,0 +1,97 @@
+import time
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import Q
+
+# Bases looked up per slug query: each adds two terms to one OR, and SQLite
+# rejects expression trees deeper than 1000
+SLUG_LOOKUP_BATCH = 200
+
+
+def get_generation(key):
+    """
+    Current value of a cache generation counter
+    Seeded with a timestamp when missing, so an evicted counter never
+    falls back to a number that older cache entries were written under
+    """
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key):
+    """Move a generation counter forward, orphaning every entry keyed on the old value"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+        return cache.get(key)
+
+
+def allocate_unique_slugs(queryset, bases, field='slug', max_length=None):
+    """
+    Unique slugs for many new rows with one query per SLUG_LOOKUP_BATCH bases
+    Taken slugs (base, base-2, base-3, ...) are read by equality plus a
+    LIKE 'base-%' prefix match, which PostgreSQL serves from the
+    varchar_pattern_ops index Django adds to unique slug columns whatever
+    the collation; duplicates within `bases` get increasing suffixes
+
+    Returns:
+        list: one slug per base, in order
+    """
+    if not bases:
+        return []
+    if max_length:
+        # Leave room for a "-<n>" suffix
+        bases = [base[:max_length - 8] for base in bases]
+    bases = [base or 'item' for base in bases]
+
+    distinct = sorted(set(bases))
+    taken = set()
+    for start in range(0, len(distinct), SLUG_LOOKUP_BATCH):
+        condition = Q()
+        for base in distinct[start:start + SLUG_LOOKUP_BATCH]:
+            condition |= Q(**{field: base}) | Q(**{f'{field}__startswith': f'{base}-'})
+        taken.update(queryset.filter(condition).values_list(field, flat=True))
+
+    next_suffix = {}
+    slugs = []
+    for base in bases:
+        slug = base
+        if slug in taken:
+            suffix = next_suffix.get(base, 2)
+            while f'{base}-{suffix}' in taken:
+                suffix += 1
+            slug = f'{base}-{suffix}'
+            next_suffix[base] = suffix + 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def update_rows(instances, field_names):
+    """
+    Write these fields of many model instances by primary key, with one
+    parameterised UPDATE run through executemany
+    bulk_update() compiles a CASE per column over the whole batch, which
+    costs far more than the writes themselves
+    """
+    if not instances:
+        return
+    model = type(instances[0])
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in field_names]
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(model._meta.db_table),
+        ', '.join(f'{quote(field.column)} = %s' for field in fields),
+        quote(model._meta.pk.column),
+    )
+    params = [
+        [field.get_db_prep_save(getattr(instance, field.attname), connection) for field in fields] + [instance.pk]
+        for instance in instances
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
@@ -13,4 +13,74 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'luxury_real_estate.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed  # noqa: E402
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+from django.core.handlers.exception import convert_exception_to_response  # noqa: E402
+from django.utils.module_loading import import_string  # noqa: E402
+
+
+class ReadPathASGIHandler(ASGIHandler):
+    """
+    Handler for the async read path (ASYNC_READ_PATH_PREFIX) with only the
+    middleware a public JSON read needs. Django 4.2 runs every sync-style
+    middleware hook in a thread, which would cost the async views more
+    than the Redis round trips they save
+    """
+    def load_middleware(self, is_async=False):
+        """
+        BaseHandler.load_middleware over ASYNC_READ_MIDDLEWARE: Django's loop
+        only reads settings.MIDDLEWARE, and the global settings are never
+        swapped, even briefly
+        """
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = convert_exception_to_response(self._get_response_async if is_async else self._get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(settings.ASYNC_READ_MIDDLEWARE):
+            middleware = import_string(middleware_path)
+            can_sync = getattr(middleware, 'sync_capable', True)
+            can_async = getattr(middleware, 'async_capable', False)
+            if not can_sync and not can_async:
+                raise RuntimeError(
+                    f'Middleware {middleware_path} must have at least one of sync_capable/async_capable set to True.'
+                )
+            middleware_is_async = False if not handler_is_async and can_sync else can_async
+            try:
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async, handler, handler_is_async,
+                    debug=settings.DEBUG, name=f'middleware {middleware_path}',
+                )
+                instance = middleware(adapted_handler)
+            except MiddlewareNotUsed:
+                continue
+            if instance is None:
+                raise ImproperlyConfigured(f'Middleware factory {middleware_path} returned None.')
+
+            if hasattr(instance, 'process_view'):
+                self._view_middleware.insert(0, self.adapt_method_mode(is_async, instance.process_view))
+            if hasattr(instance, 'process_template_response'):
+                self._template_response_middleware.append(
+                    self.adapt_method_mode(is_async, instance.process_template_response)
+                )
+            if hasattr(instance, 'process_exception'):
+                # Exception hooks always run sync, as in Django
+                self._exception_middleware.append(self.adapt_method_mode(False, instance.process_exception))
+
+            handler = convert_exception_to_response(instance)
+            handler_is_async = middleware_is_async
+
+        self._middleware_chain = self.adapt_method_mode(is_async, handler, handler_is_async)
+
+
+read_path_application = ReadPathASGIHandler()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'].startswith(settings.ASYNC_READ_PATH_PREFIX):
+        return await read_path_application(scope, receive, send)
+    return await django_application(scope, receive, send)
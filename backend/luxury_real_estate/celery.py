@@ -0,0 +1,16 @@
+"""
+Celery app for luxury_real_estate project.
+
+Workers are started with:
+    celery -A luxury_real_estate worker -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'luxury_real_estate.settings')
+
+app = Celery('luxury_real_estate')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
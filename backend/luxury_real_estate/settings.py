@@ -4,7 +4,8 @@ Final Production-Ready Configuration (2025)
 """
 
 from pathlib import Path
-from decouple import config
+from importlib.util import find_spec
+from decouple import Csv, config
 import os
 from datetime import timedelta
 
@@ -53,10 +54,20 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# The async read path (api/async/, served by asgi.py) skips sessions, CSRF and
+# messages: its endpoints are JWT-authenticated GETs
+ASYNC_READ_PATH_PREFIX = '/api/async/'
+ASYNC_READ_MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+]
+
 ROOT_URLCONF = 'luxury_real_estate.urls'
 
 TEMPLATES = [
@@ -89,6 +100,20 @@ DATABASES = {
     }
 }
 
+# Read replicas (DB_REPLICA_HOSTS=host1,host2): same credentials as the primary
+REPLICA_DATABASES = []
+for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Safe requests under these paths read from a replica (catalog and booking history)
+REPLICA_READ_PATHS = ['/api/properties/', '/api/async/properties/', '/api/bookings/']
+REPLICA_STICKY_SECONDS = 15          # a client reads the primary this long after its own write
+REPLICA_MAX_LAG_SECONDS = 5          # replicas further behind are skipped
+REPLICA_LAG_CHECK_INTERVAL = 5       # seconds between lag measurements per worker
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
@@ -125,6 +150,13 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # orjson-backed JSON first (the default for clients that send no Accept);
+    # MessagePack on Accept: application/msgpack when the package is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        *(['core.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     # ✅ PAGINATION SETTINGS - Shows 12 items per page
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 12,  # Change this if you want more/less items per page
@@ -170,6 +202,59 @@ CACHES = {
 # Cache TTL
 CACHE_TTL = 60 * 15  # 15 minutes
 
+# Stampede protection for hot keys
+CACHE_STALE_TTL = 60 * 5          # how long an expired entry may still be served while refreshing
+CACHE_LOCK_TTL = 10               # single-flight recompute lock
+CACHE_LOCK_WAIT = 2.0             # max seconds a worker waits for another's recompute
+CACHE_EARLY_REFRESH_BETA = 1.0    # >1 refreshes earlier, 0 disables early refresh
+
+# Per-worker LRU tier in front of Redis
+CACHE_LOCAL_ENABLED = config('CACHE_LOCAL_ENABLED', default=True, cast=bool)
+CACHE_LOCAL_TTL = 5                  # seconds an entry may be served without touching Redis
+CACHE_LOCAL_MAX_ENTRIES = 1000       # LRU bound per worker
+CACHE_LOCAL_SYNC_INTERVAL = 0.5      # how often a worker polls the shared local-tier generation
+
+# Celery (background jobs)
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://127.0.0.1:6379/0')
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+# Run tasks inline in development/tests; production runs real workers
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=DEBUG, cast=bool)
+
+# Periodic tasks (celery -A luxury_real_estate beat)
+CELERY_BEAT_SCHEDULE = {
+    'flush-view-counts': {'task': 'properties.tasks.flush_view_counts', 'schedule': 60.0},
+}
+
+# Recommendations
+RECOMMENDATION_LIMIT = 8
+
+# View counters and trending: hourly buckets of views, weighted by age
+TRENDING_BUCKET_SECONDS = 3600
+TRENDING_WINDOW_BUCKETS = 24         # buckets folded into the ranking
+TRENDING_HALF_LIFE = 6 * 3600        # seconds for a view's weight to halve
+TRENDING_SIZE = 1000                 # properties kept in the ranked set
+
+# Change feed: entries younger than this are held back until concurrent writes commit
+CHANGE_FEED_SETTLE_SECONDS = 2
+CHANGE_FEED_PAGE_SIZE = 500
+CHANGE_FEED_MAX_PAGE_SIZE = 1000
+
+# Property photos: list cards get the smallest variant at least this wide (px),
+# the detail page the largest; the raw upload (EXIF/GPS included) is never served
+PROPERTY_CARD_IMAGE_WIDTH = 640
+PROPERTY_DETAIL_IMAGE_WIDTH = 1280
+
+# Comparables (k-NN) index: seconds between incremental syncs per worker
+COMPARABLES_SYNC_INTERVAL = 30
+# Each incremental sync re-reads rows this much older than the last one seen:
+# updated_at is set before commit, so a slow transaction (bulk import/update)
+# can commit a row stamped earlier than rows already synced
+COMPARABLES_SYNC_OVERLAP_SECONDS = 300
+
+# Facets: lower edges of the price buckets (last bucket is open-ended)
+FACET_PRICE_BUCKETS = [0, 10_000_000, 25_000_000, 50_000_000, 100_000_000]
+
 # Swagger Settings
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
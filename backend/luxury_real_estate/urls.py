@@ -33,6 +33,9 @@ urlpatterns = [
     path('api/properties/', include('properties.urls')),
     path('api/bookings/', include('bookings.urls')),
     path('api/payments/', include('payments.urls')),
+
+    # Async read path for the hot catalog endpoints (ASGI)
+    path('api/async/', include('properties.async_urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,14 @@
+from django.urls import path
+from . import async_views
+
+# Served under /api/async/ (see async_views.py); run under ASGI to benefit
+urlpatterns = [
+    path('properties/', async_views.property_list, name='async-property-list'),
+    path('properties/categories/tree/', async_views.category_tree, name='async-category-tree'),
+    path('properties/<slug:slug>/', async_views.property_detail, name='async-property-detail'),
+    path(
+        'properties/<slug:slug>/recommendations/',
+        async_views.property_recommendations,
+        name='async-property-recommendations',
+    ),
+]
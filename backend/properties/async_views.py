@@ -0,0 +1,125 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from core.cache import aget_tagged_entry, async_cache, entry_validators
+from core.conditional import make_etag, representation_etag
+from core.middleware import token_user_id
+from core.renderers import FastJSONRenderer
+from services.category_tree_service import CategoryTreeService
+from services.view_counter_service import ViewCounterService
+from .views import CategoryViewSet, PropertyViewSet
+
+# Async (ASGI) versions of the hot read endpoints
+#
+# A hit is served from the shared cache over redis.asyncio, so a worker
+# waiting on Redis or a slow client keeps serving other requests. Anything
+# else (a miss, staff, an invalid token) runs the DRF view in a thread: it
+# owns the single-flight recompute and writes the entry the next hit reads.
+# Responses match the DRF endpoints, ETags included.
+
+property_list_view = PropertyViewSet.as_view({'get': 'list'}, basename='property', detail=False)
+property_detail_view = PropertyViewSet.as_view({'get': 'retrieve'}, basename='property', detail=True)
+recommendations_view = PropertyViewSet.as_view({'get': 'recommendations'}, basename='property', detail=True)
+category_tree_view = CategoryViewSet.as_view({'get': 'tree'}, basename='category', detail=False)
+
+
+@sync_to_async
+def run_sync_view(view, request, **kwargs):
+    response = view(request, **kwargs)
+    response.render()
+    return response
+
+
+async def reads_public_cache(request):
+    """
+    Whether the shared (public) cache may answer: anonymous callers and
+    non-staff users. The token is checked offline; is_staff is one
+    primary-key lookup through the async ORM
+    """
+    if 'HTTP_AUTHORIZATION' not in request.META:
+        return True
+    user_id = token_user_id(request)
+    if user_id is None:
+        # Let DRF reject the token
+        return False
+    is_staff = await get_user_model().objects.filter(
+        pk=user_id, is_active=True
+    ).values_list('is_staff', flat=True).afirst()
+    return is_staff is False
+
+
+def json_response(request, data, etag, last_modified=None):
+    """304 when the client copy is current, else the JSON DRF would render"""
+    etag = representation_etag(etag, FastJSONRenderer.media_type)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = HttpResponse(FastJSONRenderer().render(data), content_type='application/json')
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # A miss runs the DRF view, which negotiates the format
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+async def cached_read(request, cache_key, name, view, **kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if await reads_public_cache(request):
+        entry = await aget_tagged_entry(cache_key, name=name)
+        if entry is not None:
+            return json_response(request, entry['value'], *entry_validators(cache_key, entry))
+    return await run_sync_view(view, request, **kwargs)
+
+
+async def property_list(request):
+    """
+    Public property list pages (same filters and pages as /api/properties/)
+    URL: /api/async/properties/
+    """
+    cache_key = PropertyViewSet.list_cache_key(request.GET)
+    return await cached_read(request, cache_key, 'property_list', property_list_view)
+
+
+async def property_detail(request, slug):
+    """
+    Single property; public hits and 304s count towards view_count and trending
+    URL: /api/async/properties/{slug}/
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    cache_key = PropertyViewSet.detail_cache_key(slug, request.GET)
+    if await reads_public_cache(request):
+        entry = await aget_tagged_entry(cache_key, name='property_detail')
+        if entry is not None:
+            await ViewCounterService.arecord_view(entry['value']['id'])
+            return json_response(request, entry['value'], *entry_validators(cache_key, entry))
+    return await run_sync_view(property_detail_view, request, slug=slug)
+
+
+async def property_recommendations(request, slug):
+    """
+    Recommended properties
+    URL: /api/async/properties/{slug}/recommendations/
+    """
+    cache_key = PropertyViewSet.recommendations_cache_key(slug)
+    return await cached_read(request, cache_key, 'recommendations', recommendations_view, slug=slug)
+
+
+async def category_tree(request):
+    """
+    Full category tree, served from the versioned tree cache
+    URL: /api/async/properties/categories/tree/
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    version = await async_cache.get(CategoryTreeService.VERSION_KEY)
+    if version is not None:
+        tree = await async_cache.get(CategoryTreeService.TREE_KEY.format(version=version))
+        if tree is not None:
+            etag = make_etag('categories', request.get_full_path(), version)
+            return json_response(request, tree['roots'], etag, tree.get('built_at'))
+    return await run_sync_view(category_tree_view, request)
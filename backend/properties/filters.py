@@ -0,0 +1,94 @@
+import django_filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+from services.amenity_service import AmenityService
+from services.geo_service import GeoService
+from services.search_service import SearchService
+from .models import Property
+
+
+class PropertyFilterSet(django_filters.FilterSet):
+    """
+    Query-string filters for the property list and facets
+    ?category= matches the category and all of its subcategories
+    ?amenities=Pool,Gym matches properties with all of them (?amenities_match=any for any)
+    """
+    category = django_filters.NumberFilter(method='filter_category')
+    amenities = django_filters.CharFilter(method='filter_amenities')
+    amenities_match = django_filters.ChoiceFilter(
+        choices=[('all', 'all'), ('any', 'any')], method='filter_noop'
+    )
+
+    class Meta:
+        model = Property
+        fields = {
+            'price': ['gte', 'lte'],
+            'bedrooms': ['exact', 'gte'],
+            'bathrooms': ['exact', 'gte'],
+            'status': ['exact'],
+            'featured': ['exact'],
+        }
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(category__ancestor_links__ancestor_id=value)
+
+    def filter_amenities(self, queryset, name, value):
+        match_all = self.data.get('amenities_match', 'all') != 'any'
+        return AmenityService.filter(queryset, AmenityService.parse(value), match_all=match_all)
+
+    def filter_noop(self, queryset, name, value):
+        # Read by filter_amenities
+        return queryset
+
+
+class PropertySearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search on ?search= (name, location, description)
+    Replaces DRF's SearchFilter, which would fall back to icontains scans
+    Runs after the other filters; with ?near= results stay nearest first
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '')
+        return SearchService.search(queryset, term, rank='near' not in request.query_params)
+
+
+def parse_floats(request, param, count):
+    """
+    Comma-separated numbers from the query string
+    Returns None when the parameter is absent; raises ValidationError when malformed
+    """
+    raw = request.query_params.get(param)
+    if not raw:
+        return None
+    try:
+        values = [float(part) for part in raw.split(',')]
+    except ValueError:
+        values = []
+    if len(values) != count:
+        raise ValidationError({param: f'Expected {count} comma-separated numbers'})
+    return values
+
+
+class PropertyGeoFilter(BaseFilterBackend):
+    """
+    Geo filters on the property list
+    ?near=<lat>,<lng>&radius=<km>   within radius (default 5 km), nearest first
+    ?bbox=<south>,<west>,<north>,<east>   inside a map viewport
+    """
+    default_radius_km = 5
+
+    def filter_queryset(self, request, queryset, view):
+        bbox = parse_floats(request, 'bbox', 4)
+        if bbox:
+            queryset = GeoService.within_bbox(queryset, *bbox)
+
+        near = parse_floats(request, 'near', 2)
+        if near:
+            radius = parse_floats(request, 'radius', 1) or [self.default_radius_km]
+            if radius[0] <= 0:
+                raise ValidationError({'radius': 'Must be positive'})
+            queryset = GeoService.within_radius(queryset, near[0], near[1], radius[0])
+        return queryset
@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+from properties.models import Property
+from services.image_service import ImageService
+
+
+def process_image(property_id):
+    """Worker entry point (module level, so the pool can pickle it)"""
+    try:
+        return property_id, ImageService.process(property_id) is not None, None
+    except Exception as e:
+        # One unreadable upload must not stop the backfill
+        return property_id, False, f'{type(e).__name__}: {e}'
+
+
+class Command(BaseCommand):
+    help = 'Build variants, dimensions and placeholders for existing property images in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Worker processes (default: one per CPU; 1 runs inline)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=8, help='Properties handed to a worker at a time')
+        parser.add_argument('--force', action='store_true', help='Also reprocess images that already have a placeholder')
+
+    def handle(self, *args, **options):
+        queryset = Property.objects.exclude(Q(image='') | Q(image__isnull=True))
+        if not options['force']:
+            queryset = queryset.filter(image_placeholder='')
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        if not ids:
+            self.stdout.write('Nothing to backfill')
+            return
+
+        workers = max(1, min(options['workers'], len(ids)))
+        self.stdout.write(f'Processing {len(ids):,} images with {workers} worker(s)...')
+        started = time.perf_counter()
+        processed, failed = 0, 0
+
+        if workers == 1:
+            results = map(process_image, ids)
+        else:
+            # Decoding and encoding are CPU bound, so processes rather than threads;
+            # forked workers must open their own database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(process_image, ids, chunksize=max(1, options['chunk_size']))
+
+        try:
+            for done, (property_id, ok, error) in enumerate(results, start=1):
+                processed += ok
+                if error:
+                    failed += 1
+                    self.stderr.write(f'  property {property_id}: {error}')
+                if done % 100 == 0:
+                    rate = done / (time.perf_counter() - started)
+                    self.stdout.write(f'  {done:,}/{len(ids):,} | {rate:.1f} images/s')
+        finally:
+            if workers > 1:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Processed {processed:,} images in {elapsed:.2f}s '
+            f'({len(ids) / max(elapsed, 1e-9):.1f} images/s, {failed} failed)'
+        ))
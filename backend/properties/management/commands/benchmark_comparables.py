@@ -0,0 +1,65 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from services.comparables_service import ComparablesIndex
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the k-NN comparables index on synthetic listings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--batch', type=int, default=1000)
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    @staticmethod
+    def synthetic(rng, size):
+        ids = np.arange(1, size + 1, dtype=np.int64)
+        categories = rng.integers(1, 40, size)
+        bedrooms = rng.integers(0, 8, size)
+        raw = np.column_stack([
+            rng.lognormal(mean=15.5, sigma=0.8, size=size),
+            bedrooms,
+            np.maximum(bedrooms - rng.integers(0, 2, size), 1),
+            np.where(rng.random(size) < 0.1, np.nan, 500 + bedrooms * 600 + rng.normal(0, 300, size)),
+        ])
+        return ids, categories, raw
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        k = options['k']
+
+        for size in options['sizes']:
+            ids, categories, raw = self.synthetic(rng, size)
+            index = ComparablesIndex()
+
+            started = time.perf_counter()
+            index.build(ids, categories, raw)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            picks = rng.integers(0, size, options['queries'])
+            timings = []
+            for row in picks:
+                started = time.perf_counter()
+                index.nearest(raw[row:row + 1], categories[row], k=k, exclude_id=ids[row])
+                timings.append((time.perf_counter() - started) * 1000)
+            timings = np.asarray(timings)
+
+            batch_ids = ids[rng.integers(0, size, options['batch'])]
+            started = time.perf_counter()
+            index.nearest_batch(batch_ids, k=k)
+            batch_ms = (time.perf_counter() - started) * 1000
+
+            updates = rng.integers(0, size, 1000)
+            started = time.perf_counter()
+            index.upsert(ids[updates], categories[updates], raw[updates])
+            upsert_ms = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(
+                f'{size:>9,} listings | build {build_ms:8.1f} ms | '
+                f'single p50 {np.percentile(timings, 50):6.2f} ms p95 {np.percentile(timings, 95):6.2f} ms | '
+                f'batch {len(batch_ids)} in {batch_ms:8.1f} ms ({batch_ms / len(batch_ids):.2f} ms/query) | '
+                f'upsert 1000 rows {upsert_ms:6.1f} ms'
+            )
@@ -0,0 +1,132 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection
+from core.geo import encode_geohash
+from properties.models import Category, Property
+from services.geo_service import GeoService
+
+# Synthetic listings are spread over Bangladesh, denser around the big cities
+BOUNDS = (20.6, 88.0, 26.6, 92.7)
+CITIES = [(23.7925, 90.4078), (22.3569, 91.7832), (24.8949, 91.8687), (22.8456, 89.5403)]
+RADIUS_QUERIES = [(23.7925, 90.4078, 1), (23.7925, 90.4078, 5), (22.3569, 91.7832, 25), (24.0, 90.0, 50)]
+BBOX_QUERIES = [(23.70, 90.33, 23.88, 90.47), (22.20, 91.70, 22.50, 91.90), (21.0, 88.5, 24.0, 91.0)]
+SLUG_PREFIX = 'bench-geo-'
+PAGE = 12
+
+
+class Command(BaseCommand):
+    help = 'Measure radius and bounding-box search latency, optionally seeding synthetic rows first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic rows to insert with --seed')
+        parser.add_argument('--seed', action='store_true', help='Insert synthetic rows before measuring')
+        parser.add_argument('--cleanup', action='store_true', help='Delete synthetic rows afterwards')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--baseline', action='store_true', help='Also time the same queries without the geohash cells')
+
+    def seed(self, rows, batch_size):
+        rng = np.random.default_rng(11)
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        south, west, north, east = BOUNDS
+
+        # Half the points cluster around cities (~10 km spread), half are uniform
+        clustered = rows // 2
+        centers = np.array(CITIES)[rng.integers(0, len(CITIES), clustered)]
+        points = np.vstack([
+            centers + rng.normal(0, 0.1, (clustered, 2)),
+            np.column_stack([rng.uniform(south, north, rows - clustered), rng.uniform(west, east, rows - clustered)]),
+        ])
+        points[:, 0] = np.clip(points[:, 0], south, north)
+        points[:, 1] = np.clip(points[:, 1], west, east)
+
+        started = time.perf_counter()
+        for start in range(0, rows, batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, rows)):
+                latitude, longitude = float(points[i, 0]), float(points[i, 1])
+                batch.append(Property(
+                    name=f'Benchmark Home {i}',
+                    slug=f'{SLUG_PREFIX}{i}',
+                    description='Synthetic listing',
+                    location='Bangladesh',
+                    price=int(rng.integers(1_000_000, 90_000_000)),
+                    bedrooms=int(rng.integers(0, 8)),
+                    bathrooms=int(rng.integers(1, 6)),
+                    category=category,
+                    latitude=latitude,
+                    longitude=longitude,
+                    # bulk_create skips save(), so the geohash is set here
+                    geohash=encode_geohash(latitude, longitude),
+                ))
+            Property.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            # Fresh planner statistics, otherwise the status index looks as selective as the geohash one
+            cursor.execute('ANALYZE properties' if connection.vendor == 'postgresql' else 'ANALYZE')
+        self.stdout.write(f'Seeded {rows:,} rows in {time.perf_counter() - started:.1f}s')
+
+    def cleanup(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM property_recommendations WHERE property_id IN '
+                '(SELECT id FROM properties WHERE slug LIKE %s)', [SLUG_PREFIX + '%']
+            )
+            cursor.execute('DELETE FROM properties WHERE slug LIKE %s', [SLUG_PREFIX + '%'])
+        self.stdout.write('Removed synthetic rows')
+
+    def measure(self, run, repeat):
+        run()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, np.percentile(timings, 50), np.percentile(timings, 95)
+
+    def report(self, label, result, p50, p95):
+        total, page = result
+        self.stdout.write(
+            f'{label:>34} | {total:>7,} matches, {page:>2} on page | p50 {p50:8.2f} ms  p95 {p95:8.2f} ms'
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['rows'], options['batch_size'])
+
+        total = Property.objects.exclude(geohash='').count()
+        self.stdout.write(f'Geo search over {total:,} located properties on {connection.vendor}')
+        queryset = Property.objects.filter(status='active').defer('search_vector')
+        repeat = options['repeat']
+
+        for latitude, longitude, radius in RADIUS_QUERIES:
+            def run(latitude=latitude, longitude=longitude, radius=radius):
+                results = GeoService.within_radius(queryset, latitude, longitude, radius)
+                return results.count(), len(results[:PAGE])
+            self.report(f'{radius} km around {latitude},{longitude}', *self.measure(run, repeat))
+
+            if options['baseline']:
+                def baseline(latitude=latitude, longitude=longitude, radius=radius):
+                    results = queryset.annotate(
+                        distance=GeoService.distance_expression(latitude, longitude)
+                    ).filter(distance__lte=radius).order_by('distance')
+                    return results.count(), len(results[:PAGE])
+                self.report('  without geohash cells', *self.measure(baseline, max(repeat // 4, 1)))
+
+        for bbox in BBOX_QUERIES:
+            def run(bbox=bbox):
+                results = GeoService.within_bbox(queryset, *bbox)
+                return results.count(), len(results[:PAGE])
+            self.report(f'bbox {bbox}', *self.measure(run, repeat))
+
+            if options['baseline']:
+                def baseline(bbox=bbox):
+                    south, west, north, east = bbox
+                    results = queryset.filter(
+                        latitude__range=(south, north), longitude__range=(west, east)
+                    )
+                    return results.count(), len(results[:PAGE])
+                self.report('  without geohash cells', *self.measure(baseline, max(repeat // 4, 1)))
+
+        if options['cleanup']:
+            self.cleanup()
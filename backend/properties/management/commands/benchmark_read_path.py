@@ -0,0 +1,151 @@
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from properties.models import Property
+
+
+def current_rss_mb():
+    """Resident set size of this process (Linux), or None elsewhere"""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return pages * 4096 / 2 ** 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the sync (WSGI, thread pool) and async (ASGI, one event loop) read paths '
+        'in this process: requests/s and latency percentiles per endpoint. '
+        'Run with the production cache and database settings and DEBUG=False'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and path')
+        parser.add_argument('--concurrency', type=int, default=64, help='Clients with a request in flight')
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Sync worker threads (a gthread worker; the async path gets one event loop in the same process)',
+        )
+
+    def endpoints(self):
+        prop = Property.objects.filter(status='active').order_by('pk').first()
+        if prop is None:
+            raise CommandError('Needs at least one active property (see seed_data)')
+        return [
+            ('list', '/api/properties/', '/api/async/properties/'),
+            ('detail', f'/api/properties/{prop.slug}/', f'/api/async/properties/{prop.slug}/'),
+            (
+                'recommendations',
+                f'/api/properties/{prop.slug}/recommendations/',
+                f'/api/async/properties/{prop.slug}/recommendations/',
+            ),
+            ('category tree', '/api/properties/categories/tree/', '/api/async/properties/categories/tree/'),
+        ]
+
+    # ---- one request through each handler ----
+
+    @staticmethod
+    def call_wsgi(handler, path):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+            'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status = []
+        body = handler(environ, lambda code, headers, exc_info=None: status.append(code))
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return int(status[0].split()[0])
+
+    @staticmethod
+    async def call_asgi(application, path):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'root_path': '', 'headers': [(b'host', b'localhost')],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        status = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await application(scope, receive, send)
+        return status[0]
+
+    # ---- load ----
+
+    async def load(self, call, total, concurrency):
+        """`concurrency` clients issuing `total` requests back to back; returns (elapsed, latencies, errors)"""
+        latencies, errors, remaining = [], [0], [total]
+
+        async def client():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                started = time.perf_counter()
+                status = await call()
+                latencies.append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors[0] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies, errors[0]
+
+    def report(self, label, elapsed, latencies, errors):
+        self.stdout.write(
+            f'  {label:<6} | {len(latencies) / elapsed:9.1f} req/s | '
+            f'p50 {np.percentile(latencies, 50):8.2f} ms  p99 {np.percentile(latencies, 99):8.2f} ms | '
+            f'{errors} errors | rss {current_rss_mb() or 0:.0f} MB'
+        )
+
+    def handle(self, *args, **options):
+        total, concurrency = options['requests'], options['concurrency']
+        # The deployed ASGI entry point, which routes api/async/ to the lean handler
+        from luxury_real_estate.asgi import application as asgi
+        wsgi = WSGIHandler()
+        pool = ThreadPoolExecutor(max_workers=options['threads'])
+        self.stdout.write(
+            f'{total:,} requests per path, {concurrency} concurrent clients, '
+            f'sync: {options["threads"]} threads, async: 1 event loop'
+        )
+
+        endpoints = self.endpoints()
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            for name, sync_path, async_path in endpoints:
+                # Warm the shared cache (and this worker's LRU) once per path
+                await loop.run_in_executor(pool, self.call_wsgi, wsgi, sync_path)
+                await self.call_asgi(asgi, async_path)
+
+                self.stdout.write(name)
+                self.report('sync', *await self.load(
+                    lambda: loop.run_in_executor(pool, self.call_wsgi, wsgi, sync_path), total, concurrency
+                ))
+                self.report('async', *await self.load(
+                    lambda: self.call_asgi(asgi, async_path), total, concurrency
+                ))
+
+        try:
+            asyncio.run(run())
+        finally:
+            pool.shutdown()
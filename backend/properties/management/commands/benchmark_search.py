@@ -0,0 +1,81 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection
+from properties.models import Category, Property
+from services.search_service import SearchService
+
+VOCABULARY = (
+    'luxury modern villa penthouse apartment ocean view garden pool gym rooftop terrace '
+    'spacious elegant quiet family downtown riverside lake mountain beach private secure '
+    'parking balcony renovated classic marble kitchen fireplace studio duplex loft '
+    'office retail commercial corner bright sunny heritage smart concierge'
+).split()
+CITIES = ['Gulshan', 'Banani', 'Dhanmondi', 'Uttara', 'Chittagong', 'Sylhet', "Cox's Bazar", 'Khulna']
+QUERIES = ['ocean view', 'luxury penthouse', 'pool gym', 'Gulshan', 'quiet family garden', 'marble kitchen fireplace']
+SLUG_PREFIX = 'bench-search-'
+
+
+class Command(BaseCommand):
+    help = 'Measure property search latency, optionally seeding synthetic rows first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic rows to insert with --seed')
+        parser.add_argument('--seed', action='store_true', help='Insert synthetic rows before measuring')
+        parser.add_argument('--cleanup', action='store_true', help='Delete synthetic rows afterwards')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def seed(self, rows, batch_size):
+        rng = np.random.default_rng(7)
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        started = time.perf_counter()
+        for start in range(0, rows, batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, rows)):
+                words = rng.choice(VOCABULARY, size=40)
+                batch.append(Property(
+                    name=' '.join(words[:3]).title(),
+                    slug=f'{SLUG_PREFIX}{i}',
+                    description=' '.join(words[3:]),
+                    location=f'{CITIES[i % len(CITIES)]}, Bangladesh',
+                    price=int(rng.integers(1_000_000, 90_000_000)),
+                    bedrooms=int(rng.integers(0, 8)),
+                    bathrooms=int(rng.integers(1, 6)),
+                    category=category,
+                ))
+            Property.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {rows:,} rows in {time.perf_counter() - started:.1f}s')
+
+    def cleanup(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM property_recommendations WHERE property_id IN '
+                '(SELECT id FROM properties WHERE slug LIKE %s)', [SLUG_PREFIX + '%']
+            )
+            cursor.execute('DELETE FROM properties WHERE slug LIKE %s', [SLUG_PREFIX + '%'])
+        self.stdout.write('Removed synthetic rows')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['rows'], options['batch_size'])
+
+        total = Property.objects.count()
+        self.stdout.write(f'Searching {total:,} properties on {connection.vendor}')
+        queryset = Property.objects.filter(status='active').defer('search_vector')
+
+        for term in QUERIES:
+            # First call warms caches (and builds the fallback index off PostgreSQL)
+            list(SearchService.search(queryset, term)[:12])
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                page = list(SearchService.search(queryset, term)[:12])
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{term!r:>28} | {len(page):>2} hits on page | '
+                f'p50 {np.percentile(timings, 50):8.2f} ms  p95 {np.percentile(timings, 95):8.2f} ms'
+            )
+
+        if options['cleanup']:
+            self.cleanup()
@@ -0,0 +1,64 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from core.renderers import FastJSONRenderer, msgpack
+from properties.models import Property
+from properties.serializers import PropertyListRowSerializer, PropertyListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Per-row cost of the property list payload: ModelSerializer + json vs .values() rows + orjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per page being serialized')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def measure(self, stages, repeat, rows):
+        """Median microseconds per row of each stage, run in sequence"""
+        timings = {name: [] for name, _ in stages}
+        for _ in range(repeat):
+            value = None
+            for name, stage in stages:
+                started = time.perf_counter()
+                value = stage(value)
+                timings[name].append((time.perf_counter() - started) * 1e6 / rows)
+        return {name: float(np.median(values)) for name, values in timings.items()}
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get('/api/properties/')
+        queryset = Property.objects.filter(status='active').select_related('category').defer(
+            'search_vector'
+        ).order_by('-created_at', '-pk')[:options['rows']]
+        rows = len(queryset.values_list('pk', flat=True))
+        if not rows:
+            raise CommandError('No active properties to serialize (see seed_data)')
+        fast = PropertyListRowSerializer(context={'request': request})
+
+        paths = {
+            'before': [
+                # .all(): a fresh queryset, so every run hits the database
+                ('fetch', lambda _: list(queryset.all())),
+                ('serialize', lambda page: PropertyListSerializer(page, many=True, context={'request': request}).data),
+                ('render', lambda data: JSONRenderer().render({'results': data})),
+            ],
+            'after': [
+                ('fetch', lambda _: list(fast.values(queryset))),
+                ('serialize', fast.to_representation),
+                ('render', lambda data: FastJSONRenderer().render({'results': data})),
+            ],
+        }
+        if msgpack is not None:
+            paths['after (msgpack)'] = paths['after'][:2] + [
+                ('render', lambda data: msgpack.packb({'results': data})),
+            ]
+
+        self.stdout.write(f'{rows:,} rows per page, median of {options["repeat"]} runs, µs per row')
+        self.stdout.write(f'  {"path":<16} {"fetch":>8} {"serialize":>10} {"render":>8} {"total":>8}')
+        for label, stages in paths.items():
+            cost = self.measure(stages, options['repeat'], rows)
+            self.stdout.write(
+                f'  {label:<16} {cost["fetch"]:8.2f} {cost["serialize"]:10.2f} '
+                f'{cost["render"]:8.2f} {sum(cost.values()):8.2f}'
+            )
@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from services.cluster_service import ClusterService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed map cluster table'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = ClusterService.rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Rebuilt {count} map clusters in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from services.recommendation_service import RecommendationService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed property recommendation table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = RecommendationService.rebuild_all(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Rebuilt recommendations for {count} properties in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.import_service import ImportService
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or JSONL listing feed into the property table in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=ImportService.FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--upsert', action='store_true', help='Update listings whose external_id already exists')
+
+    def report(self, summary):
+        self.stdout.write(
+            f"{summary['processed']:>10,} rows | {summary['created']:,} created | "
+            f"{summary['updated']:,} updated | {summary['failed']:,} failed | "
+            f"{summary['rows_per_second']:,} rows/s"
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ImportService.detect_format(options['path'])
+        try:
+            stream = open(options['path'], encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        with stream:
+            summary = ImportService.run(
+                ImportService.read_rows(stream, fmt),
+                batch_size=options['batch_size'],
+                upsert=options['upsert'],
+                progress=self.report,
+            )
+
+        for error in summary['errors'][:20]:
+            self.stdout.write(self.style.WARNING(f"row {error['row']}: {error['errors']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {summary['created']:,} new and {summary['updated']:,} updated properties "
+            f"({summary['failed']:,} failed) in {summary['elapsed']:.2f}s"
+        ))
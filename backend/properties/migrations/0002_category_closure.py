@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_closure(apps, schema_editor):
+    """Backfill closure rows for the categories that already exist"""
+    Category = apps.get_model('properties', 'Category')
+    CategoryClosure = apps.get_model('properties', 'CategoryClosure')
+    
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    links = []
+    for category_id in parents:
+        node_id, depth, seen = category_id, 0, set()
+        while node_id is not None and node_id not in seen:
+            seen.add(node_id)
+            links.append(CategoryClosure(ancestor_id=node_id, descendant_id=category_id, depth=depth))
+            node_id, depth = parents.get(node_id), depth + 1
+    CategoryClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='properties.category')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='properties.category')),
+            ],
+            options={
+                'verbose_name': 'Category Closure',
+                'verbose_name_plural': 'Category Closures',
+                'db_table': 'category_closure',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='category_cl_desc_depth_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='categoryclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='category_closure_pair_uniq'),
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
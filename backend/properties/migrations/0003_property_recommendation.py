@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_category_closure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyRecommendation',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendation', serialize=False, to='properties.property')),
+                ('recommended_ids', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Property Recommendation',
+                'verbose_name_plural': 'Property Recommendations',
+                'db_table': 'property_recommendations',
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:27
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}location, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'C')
+"""
+
+FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION properties_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := %s;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """ % SEARCH_VECTOR_SQL.format(row='NEW.'),
+    """
+    CREATE TRIGGER properties_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, location, description ON properties
+    FOR EACH ROW EXECUTE FUNCTION properties_search_vector_update();
+    """,
+    "UPDATE properties SET search_vector = %s;" % SEARCH_VECTOR_SQL.format(row=''),
+    "CREATE INDEX properties_search_gin ON properties USING GIN (search_vector);",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS properties_search_gin;",
+    "DROP TRIGGER IF EXISTS properties_search_vector_trigger ON properties;",
+    "DROP FUNCTION IF EXISTS properties_search_vector_update();",
+]
+
+
+def run_postgres_sql(statements):
+    """Trigger and GIN index only exist on PostgreSQL; SQLite uses the in-process index"""
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_property_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_postgres_sql(FORWARD_SQL), run_postgres_sql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0004_property_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['-created_at', '-id'], name='properties_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='properties_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_property_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyCluster',
+            fields=[
+                ('cell', models.CharField(max_length=12, primary_key=True, serialize=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+                ('price_min', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('price_max', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Property Cluster',
+                'verbose_name_plural': 'Property Clusters',
+                'db_table': 'property_clusters',
+            },
+        ),
+    ]
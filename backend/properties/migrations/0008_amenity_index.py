@@ -0,0 +1,82 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_amenity_index(apps, schema_editor):
+    """
+    Backfill the amenity index from the existing JSON lists
+    Names and keys are cut to the column length like Amenity.clean_name /
+    make_key, and links are written in batches as the rows stream by
+    """
+    Property = apps.get_model('properties', 'Property')
+    Amenity = apps.get_model('properties', 'Amenity')
+    PropertyAmenity = apps.get_model('properties', 'PropertyAmenity')
+    max_length = 100
+    batch_size = 1000
+    
+    def clean_name(name):
+        return ' '.join(str(name).split())[:max_length]
+    
+    def make_key(name):
+        return ' '.join(str(name).split()).casefold()[:max_length]
+    
+    amenity_ids = {}
+    links = []
+    for property_id, amenities in Property.objects.values_list('id', 'amenities').iterator():
+        keys = {}
+        for name in amenities if isinstance(amenities, list) else []:
+            key = make_key(name)
+            if key:
+                keys.setdefault(key, name)
+        for key, name in keys.items():
+            if key not in amenity_ids:
+                amenity_ids[key] = Amenity.objects.create(key=key, name=clean_name(name)).id
+            links.append(PropertyAmenity(amenity_id=amenity_ids[key], property_id=property_id))
+        if len(links) >= batch_size:
+            PropertyAmenity.objects.bulk_create(links)
+            links = []
+    PropertyAmenity.objects.bulk_create(links)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_property_cluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Amenity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Amenity',
+                'verbose_name_plural': 'Amenities',
+                'db_table': 'amenities',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PropertyAmenity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amenity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='property_links', to='properties.amenity')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='amenity_links', to='properties.property')),
+            ],
+            options={
+                'verbose_name': 'Property Amenity',
+                'verbose_name_plural': 'Property Amenities',
+                'db_table': 'property_amenities',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='propertyamenity',
+            constraint=models.UniqueConstraint(fields=('amenity', 'property'), name='property_amenity_pair_uniq'),
+        ),
+        migrations.RunPython(build_amenity_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_amenity_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+def fill_precision(apps, schema_editor):
+    PropertyCluster = apps.get_model('properties', 'PropertyCluster')
+    PropertyCluster.objects.update(precision=Length('cell'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_property_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertycluster',
+            name='precision',
+            field=models.PositiveSmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_precision, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='propertycluster',
+            index=models.Index(fields=['precision', 'cell'], name='property_cl_precision_idx'),
+        ),
+    ]
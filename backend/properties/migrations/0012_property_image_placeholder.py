@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_property_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='image_color',
+            field=models.CharField(blank=True, default='', editable=False, max_length=7),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='image_placeholder',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_property_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='view_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:43
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    """
+    One entry per existing category then property, so a client starting
+    without a cursor receives the whole catalog from the feed
+    Done in SQL: a Python loop over every listing would take minutes
+    """
+    quote = schema_editor.connection.ops.quote_name
+    for kind, table in (('category', 'categories'), ('property', 'properties')):
+        schema_editor.execute(
+            f"INSERT INTO {quote('catalog_changes')} "
+            f"({quote('kind')}, {quote('object_id')}, {quote('deleted')}, {quote('changed_at')}) "
+            f"SELECT %s, {quote('id')}, %s, {quote('updated_at')} FROM {quote(table)} ORDER BY {quote('id')}",
+            [kind, False],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0013_property_view_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('property', 'Property'), ('category', 'Category')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Catalog Change',
+                'verbose_name_plural': 'Catalog Changes',
+                'db_table': 'catalog_changes',
+                'indexes': [
+                    models.Index(fields=['kind', 'object_id'], name='catalog_change_object_idx'),
+                    models.Index(fields=['changed_at'], name='catalog_change_time_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:40
+
+from django.db import migrations
+
+# Geohash prefix scans are written as ranges: cell <= geohash < cell || '~'.
+# That needs bytewise order; a locale collation (en_US.UTF-8) ignores '~'
+# at the first level and would sort 'u4pruzz' after 'u4pr~'. SQLite
+# compares bytewise already.
+FORWARD_SQL = [
+    'ALTER TABLE properties ALTER COLUMN geohash TYPE varchar(12) COLLATE "C";',
+    'ALTER TABLE property_clusters ALTER COLUMN cell TYPE varchar(12) COLLATE "C";',
+]
+
+REVERSE_SQL = [
+    'ALTER TABLE properties ALTER COLUMN geohash TYPE varchar(12) COLLATE "default";',
+    'ALTER TABLE property_clusters ALTER COLUMN cell TYPE varchar(12) COLLATE "default";',
+]
+
+
+def run_postgres_sql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_catalog_change'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgres_sql(FORWARD_SQL), run_postgres_sql(REVERSE_SQL)),
+    ]
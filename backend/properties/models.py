@@ -1,5 +1,9 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, transaction
 from django.utils.text import slugify
+from core.geo import encode_geohash
+from core.utils import allocate_unique_slugs
 
 
 class Category(models.Model):
@@ -29,14 +33,142 @@ class Category(models.Model):
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored parent so save() can detect a reparent
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        
+        is_new = self._state.adding
+        old_parent_id = getattr(self, '_loaded_parent_id', None)
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # Keep the closure table in sync with the parent pointer
+            if is_new:
+                CategoryClosure.objects.insert_node(self)
+            elif old_parent_id != self.parent_id:
+                CategoryClosure.objects.move_subtree(self)
+        
+        self._loaded_parent_id = self.parent_id
     
     def get_all_children(self):
         """Get all descendant categories (DFS will be used in service)"""
         return Category.objects.filter(parent=self)
+    
+    def get_descendants(self, include_self=True):
+        """Get the whole subtree below this category with one indexed query"""
+        queryset = Category.objects.filter(ancestor_links__ancestor=self)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+    
+    def get_ancestors(self, include_self=False):
+        """Get the path from the root down to this category"""
+        queryset = Category.objects.filter(descendant_links__descendant=self)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset.order_by('-descendant_links__depth')
+
+
+class CategoryClosureManager(models.Manager):
+    """
+    Maintains the closure table rows for Category writes
+    Every mutation is a fixed number of bulk statements, independent of subtree size
+    """
+    
+    def insert_node(self, category):
+        """Link a freshly created leaf to itself and to every ancestor of its parent"""
+        links = [self.model(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+        if category.parent_id:
+            links.extend(
+                self.model(ancestor_id=ancestor_id, descendant_id=category.pk, depth=depth + 1)
+                for ancestor_id, depth in self.filter(
+                    descendant_id=category.parent_id
+                ).values_list('ancestor_id', 'depth')
+            )
+        self.bulk_create(links)
+    
+    def move_subtree(self, category):
+        """
+        Reparent a whole branch in bulk:
+        drop the links from old outside ancestors, then cross-join the
+        new parent's ancestors with every node of the branch
+        """
+        subtree = list(
+            self.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth')
+        )
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        
+        if category.parent_id in subtree_ids:
+            raise ValueError("A category cannot be moved under itself or its own descendant")
+        
+        self.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        
+        if category.parent_id:
+            new_ancestors = self.filter(
+                descendant_id=category.parent_id
+            ).values_list('ancestor_id', 'depth')
+            self.bulk_create(
+                [
+                    self.model(
+                        ancestor_id=ancestor_id,
+                        descendant_id=descendant_id,
+                        depth=ancestor_depth + descendant_depth + 1,
+                    )
+                    for ancestor_id, ancestor_depth in new_ancestors
+                    for descendant_id, descendant_depth in subtree
+                ],
+                batch_size=1000,
+            )
+    
+    def rebuild(self):
+        """Recompute every link from the parent pointers (used for backfills and repairs)"""
+        parents = dict(Category.objects.values_list('id', 'parent_id'))
+        links = []
+        for category_id in parents:
+            node_id, depth, seen = category_id, 0, set()
+            while node_id is not None and node_id not in seen:
+                seen.add(node_id)
+                links.append(self.model(ancestor_id=node_id, descendant_id=category_id, depth=depth))
+                node_id, depth = parents.get(node_id), depth + 1
+        
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(links, batch_size=1000)
+
+
+class CategoryClosure(models.Model):
+    """
+    Closure table for the Category tree
+    Stores one row per (ancestor, descendant) pair, including each node paired with itself,
+    so "everything under X" is a single indexed join instead of a recursive walk
+    """
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+    
+    objects = CategoryClosureManager()
+    
+    class Meta:
+        db_table = 'category_closure'
+        verbose_name = 'Category Closure'
+        verbose_name_plural = 'Category Closures'
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='category_closure_pair_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='category_cl_desc_depth_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
 
 
 class Property(models.Model):
@@ -51,6 +183,8 @@ class Property(models.Model):
     
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=280, unique=True, blank=True)
+    # Listing id in the source feed; imports upsert on it
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     description = models.TextField()
     location = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=12, decimal_places=2)
@@ -61,7 +195,28 @@ class Property(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='properties')
     image = models.ImageField(upload_to='properties/', null=True, blank=True)
+    # Filled in by the background image task: size of the upright original,
+    # placeholder colour / BlurHash and {name: {width, height, webp, jpeg}}
+    # storage paths of the resized variants
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_color = models.CharField(max_length=7, blank=True, default='', editable=False)
+    image_placeholder = models.CharField(max_length=64, blank=True, default='', editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     featured = models.BooleanField(default=False)
+    # Detail views buffered in Redis and added in batches by the flush_view_counts task
+    view_count = models.PositiveBigIntegerField(default=0, editable=False)
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Geohash of (latitude, longitude); radius and bounding-box search scan index ranges on it
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
+    # Maintained by a database trigger on PostgreSQL (name A, location B, description C);
+    # the GIN index on it is created in migration 0004
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -74,12 +229,220 @@ class Property(models.Model):
             models.Index(fields=['slug']),
             models.Index(fields=['status']),
             models.Index(fields=['price']),
+            # Keyset pagination: (created_at, id) newest first, globally and for active listings
+            models.Index(fields=['-created_at', '-id'], name='properties_created_id_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='properties_status_created_idx'),
+            # Covering: cell range scans check the exact box without reading the row
+            models.Index(fields=['geohash', 'latitude', 'longitude'], name='properties_geohash_idx'),
         ]
     
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored category so signal handlers can see a move
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        # ... and the stored map marker, so map clusters can be updated incrementally
+        instance._loaded_cluster_state = instance.cluster_state()
+        # ... and the stored amenities, so the amenity index is only rewritten on change
+        instance._loaded_amenities = instance.__dict__.get('amenities')
+        # ... and the stored image, so variants are only rebuilt for a new upload
+        instance._loaded_image = instance.image_name()
+        return instance
+    
+    def cluster_state(self):
+        """
+        What this property contributes to map clusters:
+        [geohash, price, latitude, longitude], or None when it is not on the map
+        """
+        return Property.cluster_state_of(self.__dict__)
+    
+    @staticmethod
+    def cluster_state_of(values):
+        """cluster_state() of a .values() row (status, geohash, price, latitude, longitude)"""
+        if values.get('status') != 'active' or not values.get('geohash') or values.get('price') is None:
+            return None
+        return [values['geohash'], str(values['price']), values['latitude'], values['longitude']]
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._loaded_cluster_state = self.locked_cluster_state()
+            return super().delete(*args, **kwargs)
+    
+    def locked_cluster_state(self):
+        """
+        cluster_state() of the stored row, locked until the write commits
+        The load-time state is stale when another write committed since;
+        a concurrent writer now waits here and reads this write's result
+        """
+        row = Property.objects.select_for_update().filter(pk=self.pk).values(
+            'status', 'geohash', 'price', 'latitude', 'longitude'
+        ).first()
+        return Property.cluster_state_of(row) if row else None
+    
+    def image_name(self):
+        """Storage name of the image ('' when there is none or the field is deferred)"""
+        value = self.__dict__.get('image')
+        return getattr(value, 'name', value) or ''
+    
+    def compute_geohash(self):
+        """Geohash for the current coordinates ('' when they are not set)"""
+        if self.latitude is None or self.longitude is None:
+            return ''
+        return encode_geohash(self.latitude, self.longitude)
+    
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
\ No newline at end of file
+            self.slug = allocate_unique_slugs(
+                Property.objects.exclude(pk=self.pk), [slugify(self.name)], max_length=280
+            )[0]
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        with transaction.atomic():
+            if not self._state.adding:
+                self._loaded_cluster_state = self.locked_cluster_state()
+            super().save(*args, **kwargs)
+        self._loaded_category_id = self.category_id
+        self._loaded_cluster_state = self.cluster_state()
+        self._loaded_amenities = self.amenities
+        self._loaded_image = self.image_name()
+
+
+class Amenity(models.Model):
+    """
+    Normalized amenity - one row per distinct amenity name
+    `key` is the case- and space-insensitive form used for matching
+    """
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+    
+    class Meta:
+        db_table = 'amenities'
+        verbose_name = 'Amenity'
+        verbose_name_plural = 'Amenities'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+    
+    @staticmethod
+    def clean_name(name):
+        """Display name: whitespace collapsed, cut to the column length (the JSON lists are not length-checked)"""
+        return ' '.join(str(name).split())[:Amenity._meta.get_field('name').max_length]
+    
+    @staticmethod
+    def make_key(name):
+        return ' '.join(str(name).split()).casefold()[:Amenity._meta.get_field('key').max_length]
+
+
+class PropertyAmenity(models.Model):
+    """
+    Amenity index - (amenity, property) pairs mirroring Property.amenities
+    Kept in sync by AmenityService; amenity filters read it instead of the JSON
+    """
+    amenity = models.ForeignKey(Amenity, on_delete=models.CASCADE, related_name='property_links')
+    property = models.ForeignKey('Property', on_delete=models.CASCADE, related_name='amenity_links')
+    
+    class Meta:
+        db_table = 'property_amenities'
+        verbose_name = 'Property Amenity'
+        verbose_name_plural = 'Property Amenities'
+        constraints = [
+            # Leading amenity_id: "properties having amenity X" is an index-only range scan
+            models.UniqueConstraint(fields=['amenity', 'property'], name='property_amenity_pair_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property_id} has {self.amenity_id}"
+
+
+class PropertyRecommendation(models.Model):
+    """
+    Precomputed recommendations - ranked property ids per property
+    Rebuilt in the background so the endpoint is a primary-key lookup
+    """
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recommendation'
+    )
+    recommended_ids = models.JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'property_recommendations'
+        verbose_name = 'Property Recommendation'
+        verbose_name_plural = 'Property Recommendations'
+    
+    def __str__(self):
+        return f"Recommendations for {self.property_id}"
+
+
+class PropertyCluster(models.Model):
+    """
+    Precomputed map cluster - active properties per geohash cell
+    Kept for every cell of precision 1..MAX_PRECISION (one row per cell
+    prefix) and updated incrementally on property writes
+    """
+    MAX_PRECISION = 7
+    
+    cell = models.CharField(max_length=12, primary_key=True)
+    precision = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    # Sums rather than a centroid, so adding and removing a marker are plain increments
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+    price_min = models.DecimalField(max_digits=12, decimal_places=2)
+    price_max = models.DecimalField(max_digits=12, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'property_clusters'
+        verbose_name = 'Property Cluster'
+        verbose_name_plural = 'Property Clusters'
+        indexes = [
+            # Children of a cell: precision + 1 and the cell as prefix
+            models.Index(fields=['precision', 'cell'], name='property_cl_precision_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cell} ({self.count})"
+
+
+class CatalogChange(models.Model):
+    """
+    Change log behind the catalog sync feed - one row per changed object
+    A write deletes the object's row and inserts a new one, so the log
+    holds the latest change of every object in id order and a client
+    resumes with id > cursor. Deleted objects stay as tombstones.
+    """
+    KIND_PROPERTY = 'property'
+    KIND_CATEGORY = 'category'
+    KIND_CHOICES = [
+        (KIND_PROPERTY, 'Property'),
+        (KIND_CATEGORY, 'Category'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'catalog_changes'
+        verbose_name = 'Catalog Change'
+        verbose_name_plural = 'Catalog Changes'
+        indexes = [
+            models.Index(fields=['kind', 'object_id'], name='catalog_change_object_idx'),
+            # Finds the few entries still inside the settle window
+            models.Index(fields=['changed_at'], name='catalog_change_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id}{' (deleted)' if self.deleted else ''}"
@@ -1,8 +1,15 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from core.row_serializers import ValuesRowSerializer
+from core.sparse import SparseFieldsMixin
+from services.category_tree_service import CategoryTreeService
+from services.image_service import ImageService
+from .filters import PropertyFilterSet
 from .models import Category, Property
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Category Serializer with children (Fixed - prevents infinite recursion)"""
     children = serializers.SerializerMethodField()
     
@@ -10,57 +17,184 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name', 'slug', 'parent', 'description', 'children', 'created_at']
         read_only_fields = ['id', 'slug', 'created_at']
+        sparse_sources = {'children': ['id']}
     
     def get_children(self, obj):
         """
         Get child categories - Uses depth parameter to limit recursion
+        Children come from the cached in-memory tree, so no per-node queries
         """
-        # Check if we're already at max depth to prevent infinite recursion
-        request = self.context.get('request')
         depth = self.context.get('depth', 0)
         
         # Limit recursion to 3 levels deep
         if depth >= 3:
             return []
         
-        if obj.children.exists():
-            # Pass increased depth to child serializer
-            serializer = CategorySerializer(
-                obj.children.all(), 
-                many=True,
-                context={
-                    **self.context,
-                    'depth': depth + 1
-                }
-            )
-            return serializer.data
-        return []
-
-
-class PropertyListSerializer(serializers.ModelSerializer):
-    """Property List Serializer (lightweight)"""
-    category = CategorySerializer(read_only=True)
+        return CategoryTreeService.get_children(obj.id, depth=3 - depth)
+
+
+class CategoryBriefSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Flat Category Serializer - no children
+    Reads only columns from the select_related join; the nested tree
+    is available separately from /api/properties/categories/tree/
+    """
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug']
+        read_only_fields = fields
+
+
+class CategorySyncSerializer(serializers.ModelSerializer):
+    """Flat Category Serializer for the change feed (parent as an id, no tree walk)"""
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug', 'parent', 'description', 'updated_at']
+        read_only_fields = fields
+
+
+def variant_url(variants, width, request=None):
+    """
+    Absolute URL of the variant ImageService.pick() chooses, or None until
+    the background task has built the metadata-free variants
+    """
+    path = ImageService.pick(variants, width)
+    if not path:
+        return None
+    url = default_storage.url(path)
+    return request.build_absolute_uri(url) if request else url
+
+
+class PropertyListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Property List Serializer (lightweight, constant queries per page)"""
+    category = CategoryBriefSerializer(read_only=True)
+    image = serializers.SerializerMethodField()
     
     class Meta:
         model = Property
-        fields = ['id', 'name', 'slug', 'location', 'price', 'bedrooms', 'bathrooms', 
-                  'status', 'category', 'image', 'featured', 'created_at']
+        # image_* let cards reserve their box and paint a placeholder before the photo loads
+        fields = ['id', 'name', 'slug', 'location', 'latitude', 'longitude', 'price', 'bedrooms',
+                  'bathrooms', 'status', 'category', 'image', 'image_width', 'image_height',
+                  'image_color', 'image_placeholder', 'featured', 'created_at']
+        includes = {'category': CategoryBriefSerializer}
+        sparse_sources = {'image': ['image_variants']}
+    
+    def get_image(self, obj):
+        """Card-sized WebP variant (None while it is being built)"""
+        return variant_url(obj.image_variants, settings.PROPERTY_CARD_IMAGE_WIDTH, self.context.get('request'))
+
 
+class PropertyListRowSerializer(ValuesRowSerializer):
+    """PropertyListSerializer output built from .values() rows (the list endpoint's hot path)"""
+    model = Property
+    fields = PropertyListSerializer.Meta.fields
+    extra_columns = {
+        'category': ['category__id', 'category__name', 'category__slug'],
+        'image': ['image_variants'],
+    }
+    required_columns = ['id', 'created_at']
+    includes = list(PropertyListSerializer.Meta.includes)
 
-class PropertyDetailSerializer(serializers.ModelSerializer):
+    def compile(self):
+        self._request = self.context.get('request')
+        return super().compile()
+
+    def get_category(self, row):
+        if row['category__id'] is None:
+            return None
+        return {'id': row['category__id'], 'name': row['category__name'], 'slug': row['category__slug']}
+
+    def get_image(self, row):
+        """Same choice as PropertyListSerializer.get_image"""
+        return variant_url(row['image_variants'], settings.PROPERTY_CARD_IMAGE_WIDTH, self._request)
+
+
+class PropertyDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Property Detail Serializer (complete data)"""
     category = CategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
+    image = serializers.SerializerMethodField()
     
     class Meta:
         model = Property
-        fields = '__all__'
+        exclude = ['search_vector', 'geohash', 'image_variants']
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
+        includes = {'category': CategorySerializer}
+        sparse_sources = {'image': ['image_variants']}
+    
+    def get_image(self, obj):
+        """Largest variant, not the upload: that keeps its EXIF/GPS metadata"""
+        return variant_url(obj.image_variants, settings.PROPERTY_DETAIL_IMAGE_WIDTH, self.context.get('request'))
 
 
 class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
     """Property Create/Update Serializer"""
     class Meta:
         model = Property
-        fields = ['name', 'description', 'location', 'price', 'bedrooms', 'bathrooms', 
-                  'square_feet', 'amenities', 'status', 'category', 'image', 'featured']
\ No newline at end of file
+        fields = ['name', 'description', 'location', 'latitude', 'longitude', 'price', 'bedrooms',
+                  'bathrooms', 'square_feet', 'amenities', 'status', 'category', 'image', 'featured']
+
+
+class AmenityListField(serializers.ListField):
+    """Amenity list from JSON, or a 'Pool; Gym' / 'Pool|Gym' string from CSV"""
+    child = serializers.CharField(max_length=100)
+    
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [part.strip() for part in data.replace('|', ';').split(';') if part.strip()]
+        return super().to_internal_value(data)
+
+
+class PropertyImportRowSerializer(serializers.Serializer):
+    """
+    One row of a listing feed (CSV or JSONL)
+    `category` is a category id, slug or name; it is resolved by ImportService
+    """
+    external_id = serializers.CharField(max_length=100, required=False, allow_null=True)
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    location = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    bedrooms = serializers.IntegerField(min_value=0)
+    bathrooms = serializers.IntegerField(min_value=0)
+    square_feet = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    amenities = AmenityListField(required=False, default=list)
+    status = serializers.ChoiceField(choices=Property.STATUS_CHOICES, default='active')
+    category = serializers.CharField(max_length=120)
+    featured = serializers.BooleanField(default=False)
+    latitude = serializers.FloatField(min_value=-90, max_value=90, required=False, allow_null=True)
+    longitude = serializers.FloatField(min_value=-180, max_value=180, required=False, allow_null=True)
+
+
+class PropertyBulkUpdateSerializer(serializers.Serializer):
+    """
+    Bulk edit: the properties (an id list or property-list filters, e.g.
+    {"category": 4} for a whole subtree) and the changes to apply.
+    price sets one price; price_percent scales each price (5 = +5%, at most doubling)
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=10000
+    )
+    filters = serializers.DictField(required=False, allow_empty=False)
+    status = serializers.ChoiceField(choices=Property.STATUS_CHOICES, required=False)
+    featured = serializers.BooleanField(required=False)
+    price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, required=False)
+    price_percent = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=-90, max_value=100, required=False
+    )
+    
+    def validate_filters(self, value):
+        # A misspelt filter would otherwise be ignored and match every listing
+        unknown = sorted(set(value) - set(PropertyFilterSet.base_filters))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filters: {', '.join(unknown)}")
+        return value
+    
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filters' in attrs):
+            raise serializers.ValidationError('Give either ids or filters')
+        if 'price' in attrs and 'price_percent' in attrs:
+            raise serializers.ValidationError('Give either price or price_percent')
+        if not any(field in attrs for field in ('status', 'featured', 'price', 'price_percent')):
+            raise serializers.ValidationError('Nothing to change')
+        return attrs
@@ -0,0 +1,125 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from core.cache import PROPERTY_LIST_TAG, category_tag, invalidate_tags, property_tag
+from services.amenity_service import AmenityService
+from services.category_tree_service import CategoryTreeService
+from services.change_feed_service import ChangeFeedService
+from services.comparables_service import ComparablesIndex
+from .models import CatalogChange, Category, CategoryClosure, Property
+from .tasks import process_property_image, refresh_recommendations_for_change, update_clusters
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, **kwargs):
+    """
+    Any Category write invalidates the cached tree, once it commits: a bump
+    inside the transaction lets a concurrent reader cache the old tree
+    under the new version
+    """
+    transaction.on_commit(CategoryTreeService.bump_version)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def schedule_recommendation_refresh(sender, instance, **kwargs):
+    """Queue an incremental recommendation refresh once the write commits"""
+    category_ids = sorted({
+        category_id
+        for category_id in (getattr(instance, '_loaded_category_id', None), instance.category_id)
+        if category_id
+    })
+    property_id = instance.pk
+    transaction.on_commit(
+        lambda: refresh_recommendations_for_change.delay(property_id, category_ids)
+    )
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def schedule_cluster_update(sender, instance, **kwargs):
+    """Queue a map cluster update when the marker moved, appeared or disappeared"""
+    old_state = getattr(instance, '_loaded_cluster_state', None)
+    new_state = None if kwargs.get('signal') is post_delete else instance.cluster_state()
+    if old_state != new_state:
+        transaction.on_commit(lambda: update_clusters.delay(old_state, new_state))
+
+
+@receiver(post_save, sender=Property)
+def sync_amenity_index(sender, instance, created, **kwargs):
+    """Mirror a changed amenities list into the amenity index (same transaction)"""
+    previous = [] if created else getattr(instance, '_loaded_amenities', None)
+    if previous != instance.amenities:
+        AmenityService.sync([instance])
+
+
+@receiver(post_save, sender=Property)
+def schedule_image_processing(sender, instance, **kwargs):
+    """Queue variant generation once a new or removed image commits (never inline)"""
+    image_name = instance.image_name()
+    if image_name != getattr(instance, '_loaded_image', ''):
+        property_id = instance.pk
+        transaction.on_commit(lambda: process_property_image.delay(property_id, image_name))
+
+
+@receiver(post_delete, sender=Property)
+def invalidate_comparables_index(sender, **kwargs):
+    """Deleted rows leave no updated_at trace, so force a full index rebuild"""
+    ComparablesIndex.mark_deleted()
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_caches(sender, instance, **kwargs):
+    """
+    Drop every cached view of this property in one tag bump:
+    detail, recommendation lists that show it, list pages and facets
+    (once committed, for the same reason as the category tree)
+    """
+    tags = [property_tag(instance.pk), PROPERTY_LIST_TAG]
+    transaction.on_commit(lambda: invalidate_tags(tags))
+
+
+def category_path_ids(category):
+    ancestor_ids = set(
+        CategoryClosure.objects.filter(descendant_id=category.pk).values_list('ancestor_id', flat=True)
+    )
+    return ancestor_ids | ({category.pk, category.parent_id} - {None})
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_path(sender, instance, **kwargs):
+    """Closure rows are cascaded away before post_delete, so capture the path first"""
+    instance._path_ids = category_path_ids(instance)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_caches(sender, instance, **kwargs):
+    """
+    A category shows up embedded in list rows and details, and its children
+    are nested under each ancestor, so the whole ancestor path is bumped
+    (read now, bumped once committed)
+    """
+    path_ids = getattr(instance, '_path_ids', None) or category_path_ids(instance)
+    tags = [category_tag(category_id) for category_id in path_ids]
+    transaction.on_commit(lambda: invalidate_tags(tags))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def record_property_change(sender, instance, **kwargs):
+    """Move the property to the tail of the sync feed's change log (once committed)"""
+    ChangeFeedService.record(
+        CatalogChange.KIND_PROPERTY, [instance.pk], deleted=kwargs.get('signal') is post_delete
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def record_category_change(sender, instance, **kwargs):
+    """Same for categories; a deleted category's cascaded listings log their own deletion"""
+    ChangeFeedService.record(
+        CatalogChange.KIND_CATEGORY, [instance.pk], deleted=kwargs.get('signal') is post_delete
+    )
@@ -0,0 +1,76 @@
+from celery import shared_task
+from services.cluster_service import ClusterService
+from services.image_service import ImageService
+from services.view_counter_service import ViewCounterService
+from services.recommendation_service import RecommendationService
+
+
+@shared_task
+def refresh_recommendations(property_ids):
+    """Recompute the precomputed recommendation entries for these properties"""
+    return RecommendationService.refresh(property_ids)
+
+
+@shared_task
+def refresh_recommendations_for_change(property_id, category_ids):
+    """
+    Recompute the entries affected by a property write:
+    the property itself plus every property whose candidate scope
+    contains its old or new category
+    """
+    affected = set(RecommendationService.affected_property_ids(category_ids))
+    affected.add(property_id)
+    return RecommendationService.refresh(sorted(affected))
+
+
+@shared_task
+def rebuild_recommendations():
+    """Full rebuild of the recommendation table"""
+    return RecommendationService.rebuild_all()
+
+
+# Bulk writes queue refreshes in tasks of this many property ids ...
+REFRESH_BATCH_SIZE = 500
+# ... or, past this many affected properties, one full rebuild
+REBUILD_THRESHOLD = 10000
+
+
+def queue_recommendation_refresh(property_ids, category_ids):
+    """
+    What the per-row signal does, for bulk writes that skip it: refresh the
+    written properties and every property whose scope holds one of the categories
+    """
+    affected = sorted(set(RecommendationService.affected_property_ids(sorted(category_ids))) | set(property_ids))
+    if len(affected) > REBUILD_THRESHOLD:
+        rebuild_recommendations.delay()
+        return
+    for start in range(0, len(affected), REFRESH_BATCH_SIZE):
+        refresh_recommendations.delay(affected[start:start + REFRESH_BATCH_SIZE])
+
+
+@shared_task
+def update_clusters(old_state, new_state):
+    """
+    Recount the clusters one property's map marker left and entered
+    (see Property.cluster_state); tasks may run in any order
+    """
+    ClusterService.recount([state[0] for state in (old_state, new_state) if state])
+
+
+@shared_task
+def rebuild_clusters():
+    """Full rebuild of the map cluster table"""
+    return ClusterService.rebuild()
+
+
+@shared_task
+def process_property_image(property_id, image_name):
+    """Build the resized variants of a newly uploaded (or removed) image"""
+    variants = ImageService.process(property_id, image_name)
+    return sorted(variants) if variants is not None else None
+
+
+@shared_task
+def flush_view_counts():
+    """Periodic (celery beat): buffered views to the database, then re-rank trending"""
+    return ViewCounterService.flush()
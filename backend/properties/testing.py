@@ -0,0 +1,10 @@
+from .models import Property
+
+
+def create_property(name, category, **fields):
+    """Test listing: placeholder values for every required field, `fields` override them"""
+    values = {
+        'description': 'Test', 'location': 'Test', 'price': 1000000, 'bedrooms': 3, 'bathrooms': 2,
+        **fields,
+    }
+    return Property.objects.create(name=name, category=category, **values)
@@ -1,7 +1,27 @@
-from django.test import TestCase
+from importlib import import_module
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth import get_user_model
-from properties.models import Category, Property
+from core.cache import local_cache
+from core.renderers import FastJSONRenderer, msgpack
+from services.view_counter_service import local_view_store
+from properties.management.commands.benchmark_read_path import Command
+from properties.testing import create_property
+from properties.models import Amenity, Category, CategoryClosure, Property, PropertyAmenity
+from properties.serializers import PropertyListRowSerializer, PropertyListSerializer
 from services.property_service import PropertyService
+from services.search_service import SearchService
+from services.category_tree_service import CategoryTreeService
 
 User = get_user_model()
 
@@ -43,4 +63,730 @@ class PropertyServiceTestCase(TestCase):
         
         # Should find the property in Luxury subcategory
         self.assertEqual(properties.count(), 1)
-        self.assertEqual(properties.first().name, 'Test Villa')
\ No newline at end of file
+        self.assertEqual(properties.first().name, 'Test Villa')
+
+
+class CategoryClosureTestCase(TestCase):
+    """Test the materialized category tree stays correct on writes"""
+    
+    def setUp(self):
+        self.residential = Category.objects.create(name='Residential')
+        self.commercial = Category.objects.create(name='Commercial')
+        self.apartments = Category.objects.create(name='Apartments', parent=self.residential)
+        self.luxury = Category.objects.create(name='Luxury', parent=self.apartments)
+    
+    def subtree(self, category):
+        return set(PropertyService.get_subtree_category_ids(category.id))
+    
+    def test_create_links_all_ancestors(self):
+        """Test a new leaf is linked to every ancestor with the right depth"""
+        depths = dict(
+            CategoryClosure.objects.filter(
+                descendant=self.luxury
+            ).values_list('ancestor_id', 'depth')
+        )
+        self.assertEqual(depths, {self.luxury.id: 0, self.apartments.id: 1, self.residential.id: 2})
+    
+    def test_reparent_moves_whole_branch(self):
+        """Test moving a branch updates links for every node below it"""
+        self.apartments.parent = self.commercial
+        self.apartments.save()
+        
+        self.assertEqual(self.subtree(self.residential), {self.residential.id})
+        self.assertEqual(
+            self.subtree(self.commercial),
+            {self.commercial.id, self.apartments.id, self.luxury.id}
+        )
+        self.assertEqual(
+            list(self.luxury.get_ancestors().values_list('id', flat=True)),
+            [self.commercial.id, self.apartments.id]
+        )
+    
+    def test_reparent_under_descendant_rejected(self):
+        """Test a branch cannot be moved below itself"""
+        self.apartments.parent = self.luxury
+        with self.assertRaises(ValueError):
+            self.apartments.save()
+    
+    def test_delete_removes_links(self):
+        """Test deleting a branch removes its closure rows"""
+        self.apartments.delete()
+        
+        self.assertEqual(self.subtree(self.residential), {self.residential.id})
+        self.assertFalse(CategoryClosure.objects.filter(descendant_id=self.luxury.id).exists())
+    
+    def test_rebuild_matches_incremental_links(self):
+        """Test a full rebuild produces the same rows as incremental maintenance"""
+        before = set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        CategoryClosure.objects.rebuild()
+        after = set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        self.assertEqual(before, after)
+    
+    def test_subtree_properties_single_query(self):
+        """Test subtree property lookup is one query regardless of depth"""
+        Property.objects.create(
+            name='Deep Villa', description='Test', location='Test', price=1000000,
+            bedrooms=3, bathrooms=2, status='active', category=self.luxury
+        )
+        with self.assertNumQueries(1):
+            names = [p.name for p in PropertyService.get_properties_by_category(self.residential.id)]
+        self.assertEqual(names, ['Deep Villa'])
+
+
+class CategoryTreeTestCase(TestCase):
+    """Test the cached single-query category tree"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        self.residential = Category.objects.create(name='Residential')
+        self.apartments = Category.objects.create(name='Apartments', parent=self.residential)
+        Category.objects.create(name='Luxury', parent=self.apartments)
+    
+    def test_tree_endpoint_single_query_then_cached(self):
+        """Test the tree is built from one query and then served from cache"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('category-tree'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['name'], 'Residential')
+        self.assertEqual(response.data[0]['children'][0]['children'][0]['name'], 'Luxury')
+        
+        with self.assertNumQueries(0):
+            self.client.get(reverse('category-tree'))
+    
+    def test_write_bumps_version(self):
+        """Test a Category write invalidates the cached tree once it commits"""
+        CategoryTreeService.get_tree()
+        version = CategoryTreeService.get_version()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Villas', parent=self.residential)
+            # Uncommitted: a reader rebuilding now would cache the old tree under a new version
+            self.assertEqual(CategoryTreeService.get_version(), version)
+        
+        self.assertNotEqual(CategoryTreeService.get_version(), version)
+        names = [child['name'] for child in CategoryTreeService.get_tree()[0]['children']]
+        self.assertEqual(names, ['Apartments', 'Villas'])
+    
+    def test_list_children_without_per_node_queries(self):
+        """Test the category list resolves children from the cached tree"""
+        CategoryTreeService.get_tree()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('category-list'))
+        residential = next(c for c in response.data['results'] if c['id'] == self.residential.id)
+        self.assertEqual(residential['children'][0]['name'], 'Apartments')
+
+
+class PropertyListQueryCountTestCase(TestCase):
+    """Test the list endpoint cost does not grow with page size"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        parent = Category.objects.create(name='Residential')
+        self.categories = [
+            Category.objects.create(name=f'Category {i}', parent=parent) for i in range(4)
+        ]
+    
+    def create_properties(self, count):
+        for i in range(count):
+            Property.objects.create(
+                name=f'Listing {Property.objects.count()}', description='Test', location='Test',
+                price=1000000, bedrooms=3, bathrooms=2, status='active',
+                category=self.categories[i % len(self.categories)]
+            )
+    
+    def test_list_constant_queries(self):
+        """Test a full page and a near-empty page cost the same number of queries"""
+        self.create_properties(1)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('property-list'))
+        self.assertEqual(len(response.data['results']), 1)
+        
+        cache.clear()
+        local_cache.clear()
+        self.create_properties(20)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('property-list'))
+        self.assertEqual(len(response.data['results']), 12)
+    
+    def test_list_category_is_flat(self):
+        """Test list rows carry a flat category reference"""
+        self.create_properties(1)
+        category = self.client.get(reverse('property-list')).data['results'][0]['category']
+        self.assertEqual(set(category), {'id', 'name', 'slug'})
+
+
+class PropertySearchTestCase(TestCase):
+    """Test ranked search on the property list"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Residential')
+        self.villa = Property.objects.create(
+            name='Ocean View Villa', description='Private beach and garden', location="Cox's Bazar",
+            price=1000000, bedrooms=4, bathrooms=3, status='active', category=category
+        )
+        self.apartment = Property.objects.create(
+            name='City Apartment', description='Balcony with an ocean view', location='Gulshan',
+            price=500000, bedrooms=2, bathrooms=1, status='active', category=category
+        )
+        Property.objects.create(
+            name='Office Floor', description='Open plan', location='Motijheel',
+            price=800000, bedrooms=0, bathrooms=2, status='active', category=category
+        )
+    
+    def search(self, term):
+        response = self.client.get(reverse('property-list'), {'search': term})
+        return [row['id'] for row in response.data['results']]
+    
+    def test_name_matches_rank_above_description(self):
+        """Test matches in the name outrank matches in the description"""
+        self.assertEqual(self.search('ocean view'), [self.villa.id, self.apartment.id])
+    
+    def test_all_terms_required(self):
+        """Test every query term must match"""
+        self.assertEqual(self.search('ocean gulshan'), [self.apartment.id])
+        self.assertEqual(self.search('ocean motijheel'), [])
+    
+    def test_index_follows_bulk_writes(self):
+        """Test rows written with bulk_create are searchable"""
+        Property.objects.bulk_create([Property(
+            name='Lake House', slug='lake-house', description='Quiet', location='Sylhet',
+            price=700000, bedrooms=3, bathrooms=2, status='active', category=self.villa.category
+        )])
+        self.assertEqual(len(self.search('lake')), 1)
+    
+    def test_filters_apply_before_result_cap(self):
+        """Test inactive matches do not use up the fallback's result cap"""
+        Property.objects.filter(pk=self.villa.pk).update(status='sold')
+        with mock.patch.object(SearchService, 'FALLBACK_MAX_RESULTS', 1):
+            self.assertEqual(self.search('ocean view'), [self.apartment.id])
+
+
+class PropertyFacetsTestCase(TestCase):
+    """Test facet counts for the filtered result set"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        self.residential = Category.objects.create(name='Residential')
+        self.villas = Category.objects.create(name='Villas', parent=self.residential)
+        self.offices = Category.objects.create(name='Offices')
+        create_property('Villa A', self.villas, price=5000000, bedrooms=3, bathrooms=2)
+        create_property('Villa B', self.villas, price=30000000, bedrooms=6, bathrooms=4)
+        create_property('Flat', self.residential, price=12000000, bedrooms=2, bathrooms=1)
+        create_property('Office', self.offices, price=20000000, bedrooms=0, bathrooms=2)
+    
+    def facets(self, **params):
+        return self.client.get(reverse('property-facets'), params).data
+    
+    def test_counts_for_filtered_set(self):
+        """Test every facet reflects the current filters"""
+        facets = self.facets(bedrooms__gte=2)
+        self.assertEqual(facets['total'], 3)
+        
+        categories = {c['name']: c['count'] for c in facets['category']}
+        self.assertEqual(categories, {'Residential': 3, 'Villas': 2, 'Offices': 0})
+        
+        bedrooms = {b['value']: b['count'] for b in facets['bedrooms']}
+        self.assertEqual((bedrooms['2'], bedrooms['3'], bedrooms['5+']), (1, 1, 1))
+        self.assertEqual([p['count'] for p in facets['price']], [1, 1, 1, 0, 0])
+    
+    def test_single_aggregate_query_and_cache(self):
+        """Test facets cost one query cold and none when cached"""
+        CategoryTreeService.get_tree()
+        with self.assertNumQueries(1):
+            self.facets(price__gte=1000000)
+        with self.assertNumQueries(0):
+            self.facets(price__gte=1000000, page=2)
+    
+    def test_property_write_invalidates(self):
+        """Test a property change drops cached facets"""
+        self.assertEqual(self.facets()['total'], 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_property('New Flat', self.residential, price=1000000, bedrooms=1, bathrooms=1)
+        self.assertEqual(self.facets()['total'], 5)
+    
+    def test_buckets_cover_every_listing(self):
+        """Test each bucketed facet adds up to the total, 0 bathrooms included"""
+        create_property('Studio Plot', self.residential, price=300000, bedrooms=0, bathrooms=0)
+        facets = self.facets()
+        self.assertEqual(facets['total'], 5)
+        for name in ('bedrooms', 'bathrooms', 'status', 'price'):
+            self.assertEqual(sum(bucket['count'] for bucket in facets[name]), facets['total'], name)
+    
+    def test_list_applies_same_filters(self):
+        """Test the list endpoint honours the facet filters"""
+        response = self.client.get(reverse('property-list'), {'category': self.residential.id})
+        self.assertEqual(response.data['count'], 3)
+
+
+class PropertyKeysetPaginationTestCase(TestCase):
+    """Test opt-in cursor pagination on (created_at, id)"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Residential')
+        self.properties = [
+            Property.objects.create(
+                name=f'Listing {i}', description='Test', location='Test', price=1000000,
+                bedrooms=3, bathrooms=2, status='active', category=category
+            )
+            for i in range(7)
+        ]
+        # Identical timestamps force the id tie-breaker
+        Property.objects.filter(pk__in=[p.pk for p in self.properties[2:5]]).update(
+            created_at=self.properties[2].created_at
+        )
+    
+    def walk(self, url, key):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data[key]
+        return ids, response
+    
+    def test_walks_every_row_once_in_both_directions(self):
+        """Test forward and backward traversal cover all rows without duplicates"""
+        expected = list(
+            Property.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        forward, last_page = self.walk(reverse('property-list') + '?pagination=cursor&page_size=3', 'next')
+        self.assertEqual(forward, expected)
+        self.assertNotIn('count', last_page.data)
+        
+        backward = []
+        url = last_page.data['previous']
+        while url:
+            response = self.client.get(url)
+            backward = [row['id'] for row in response.data['results']] + backward
+            url = response.data['previous']
+        self.assertEqual(backward, expected[:len(backward)])
+        self.assertEqual(len(backward), 6)
+    
+    def test_page_numbers_remain_default(self):
+        """Test classic pagination is used without the opt-in"""
+        response = self.client.get(reverse('property-list'), {'page': 1})
+        self.assertEqual(response.data['count'], 7)
+    
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected"""
+        response = self.client.get(reverse('property-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+    
+    def test_other_orderings_rejected(self):
+        """Test cursor mode refuses orderings it would otherwise override"""
+        for params in ({'ordering': 'price'}, {'search': 'listing'}, {'near': '23.79,90.40'}):
+            response = self.client.get(reverse('property-list'), {'pagination': 'cursor', **params})
+            self.assertEqual(response.status_code, 400, params)
+        response = self.client.get(reverse('property-list'), {'pagination': 'cursor', 'ordering': '-created_at'})
+        self.assertEqual(response.status_code, 200)
+
+
+class TaggedCacheInvalidationTestCase(TestCase):
+    """Test writes drop every dependent cached response"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Villas')
+        self.villa = create_property('Beach Villa', self.category, price=1000000)
+        self.other = create_property('Hill Villa', self.category, price=1100000)
+    
+    def test_detail_dropped_on_save(self):
+        """Test a plain save() invalidates the cached detail"""
+        url = reverse('property-detail', kwargs={'slug': self.villa.slug})
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        
+        self.villa.price = 2000000
+        with self.captureOnCommitCallbacks(execute=True):
+            self.villa.save()
+        self.assertEqual(self.client.get(url).data['price'], '2000000.00')
+    
+    def test_list_dropped_on_category_rename(self):
+        """Test list pages showing a category drop when it is renamed"""
+        url = reverse('property-list')
+        self.client.get(url)
+        self.category.name = 'Coastal Villas'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        names = {row['category']['name'] for row in self.client.get(url).data['results']}
+        self.assertEqual(names, {'Coastal Villas'})
+    
+    def test_recommendations_dropped_when_recommended_property_changes(self):
+        """Test a cached recommendation list drops when a listed property changes"""
+        url = reverse('property-recommendations', kwargs={'slug': self.villa.slug})
+        self.assertEqual([row['id'] for row in self.client.get(url).data], [self.other.id])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        
+        self.other.name = 'Renamed Villa'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.save()
+        self.assertEqual(self.client.get(url).data[0]['name'], 'Renamed Villa')
+    
+    def test_staff_bypasses_shared_cache(self):
+        """Test staff reads never populate or read the public cache"""
+        admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        self.client.get(reverse('property-detail', kwargs={'slug': self.villa.slug}))
+        self.assertIsNone(cache.get(f'property_detail_{self.villa.slug}'))
+
+
+class ConditionalGetTestCase(TestCase):
+    """Test ETag / Last-Modified validators and 304 responses"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Villas')
+        self.villa = Property.objects.create(
+            name='Beach Villa', description='Test', location='Test', price=1000000,
+            bedrooms=3, bathrooms=2, status='active', category=self.category
+        )
+    
+    def assertNotModifiedWithoutQueries(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+        return response
+    
+    def test_detail_not_modified(self):
+        """Test a matching If-None-Match returns 304 from the cache alone"""
+        self.assertNotModifiedWithoutQueries(
+            reverse('property-detail', kwargs={'slug': self.villa.slug})
+        )
+    
+    def test_list_etag_changes_on_write(self):
+        """Test a property write changes the list ETag"""
+        url = reverse('property-list')
+        etag = self.assertNotModifiedWithoutQueries(url)['ETag']
+        
+        self.villa.price = 2000000
+        with self.captureOnCommitCallbacks(execute=True):
+            self.villa.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_recommendations_not_modified(self):
+        """Test recommendations answer conditional GETs"""
+        self.assertNotModifiedWithoutQueries(
+            reverse('property-recommendations', kwargs={'slug': self.villa.slug})
+        )
+    
+    def test_if_modified_since(self):
+        """Test If-Modified-Since at or after Last-Modified returns 304"""
+        url = reverse('property-detail', kwargs={'slug': self.villa.slug})
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+    
+    def test_category_tree_etag_follows_tree_version(self):
+        """Test category responses revalidate until a category changes"""
+        url = reverse('category-tree')
+        etag = self.assertNotModifiedWithoutQueries(url)['ETag']
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Penthouses', parent=self.category)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_staff_reads_get_etag(self):
+        """Test uncached staff reads still revalidate"""
+        admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        url = reverse('property-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+    
+    def assertEtagPerFormat(self, url, media_types):
+        responses = [self.client.get(url, HTTP_ACCEPT=media_type) for media_type in media_types]
+        self.assertEqual(len({response['ETag'] for response in responses}), len(media_types))
+        for media_type, response in zip(media_types, responses):
+            self.assertIn('Accept', response['Vary'])
+            revalidated = self.client.get(url, HTTP_ACCEPT=media_type, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertIn('Accept', revalidated['Vary'])
+            other = [candidate['ETag'] for candidate in responses if candidate is not response]
+            self.assertEqual(
+                self.client.get(url, HTTP_ACCEPT=media_type, HTTP_IF_NONE_MATCH=', '.join(other)).status_code, 200
+            )
+    
+    def test_json_and_html_get_their_own_etag(self):
+        """Test a JSON ETag never validates the browsable API page and vice versa"""
+        self.assertEtagPerFormat(
+            reverse('property-detail', kwargs={'slug': self.villa.slug}), ['application/json', 'text/html']
+        )
+    
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack_gets_its_own_etag(self):
+        """Test JSON and MessagePack renderings of a page do not share an ETag"""
+        self.assertEtagPerFormat(reverse('property-list'), ['application/json', 'application/msgpack'])
+
+
+class PropertyAmenityFilterTestCase(TestCase):
+    """Test ?amenities= filtering through the amenity index"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Villas')
+        self.both = create_property('Both', self.category, amenities=['Pool', 'Gym', 'Parking'])
+        self.pool = create_property('Pool Only', self.category, amenities=['swimming  pool', ' pool '])
+        self.gym = create_property('Gym Only', self.category, amenities=['GYM'])
+        self.none = create_property('Nothing', self.category, amenities=[])
+    
+    def names(self, **params):
+        response = self.client.get(reverse('property-list'), params)
+        return sorted(row['name'] for row in response.data['results'])
+    
+    def test_all_and_any(self):
+        """Test all-of and any-of matching, case and spacing insensitive"""
+        self.assertEqual(self.names(amenities='pool,gym'), ['Both'])
+        self.assertEqual(self.names(amenities='Pool,Gym', amenities_match='any'), ['Both', 'Gym Only', 'Pool Only'])
+        self.assertEqual(self.names(amenities='Swimming Pool'), ['Pool Only'])
+        self.assertEqual(self.names(amenities='Pool,Sauna'), [])
+    
+    def test_index_follows_updates(self):
+        """Test editing the JSON list rewrites the index rows"""
+        self.gym.amenities = ['Gym', 'Pool']
+        self.gym.save()
+        self.assertEqual(self.names(amenities='pool,gym'), ['Both', 'Gym Only'])
+        
+        self.both.amenities = []
+        self.both.save()
+        self.assertFalse(PropertyAmenity.objects.filter(property=self.both).exists())
+    
+    def test_overlong_names_fit_the_columns(self):
+        """Test amenity names longer than the column are cut, at write time and in the backfill"""
+        long_name = 'Private ' + 'x' * 150
+        prop = create_property('Long', self.category, amenities=[long_name, 'Pool'])
+        amenity = Amenity.objects.get(property_links__property=prop, key__startswith='private')
+        self.assertEqual((len(amenity.name), len(amenity.key)), (100, 100))
+        self.assertEqual(self.names(amenities=long_name), ['Long'])
+        
+        backfill = import_module('properties.migrations.0008_amenity_index').build_amenity_index
+        indexed = set(PropertyAmenity.objects.values_list('amenity__key', 'property_id'))
+        PropertyAmenity.objects.all().delete()
+        Amenity.objects.all().delete()
+        backfill(django_apps, None)
+        self.assertEqual(set(PropertyAmenity.objects.values_list('amenity__key', 'property_id')), indexed)
+    
+    def test_unchanged_amenities_skip_index_write(self):
+        """Test saving other fields leaves the index alone"""
+        prop = Property.objects.get(pk=self.both.pk)
+        prop.price = 2000000
+        with CaptureQueriesContext(connection) as queries:
+            prop.save()
+        self.assertFalse(any('property_amenities' in query['sql'] for query in queries))
+        self.assertEqual(Amenity.objects.get(key='pool').name, 'Pool')
+
+
+class AsyncReadPathTestCase(TestCase):
+    """Test the async read endpoints against their DRF counterparts"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        local_view_store.clear()
+        self.addCleanup(local_view_store.clear)
+        self.category = Category.objects.create(name='Villas')
+        self.villa = Property.objects.create(
+            name='Beach Villa', description='Test', location='Test', price=1000000,
+            bedrooms=3, bathrooms=2, status='active', category=self.category
+        )
+        Property.objects.create(
+            name='Hidden Villa', description='Test', location='Test', price=1000000,
+            bedrooms=3, bathrooms=2, status='inactive', category=self.category
+        )
+        self.client = AsyncClient()
+    
+    def get(self, url, **extra):
+        """Run the request on an event loop; the test itself stays sync for assertNumQueries"""
+        async def request():
+            return await self.client.get(url, **extra)
+        return async_to_sync(request)()
+    
+    def test_hits_match_sync_responses_without_queries(self):
+        """Test a warm entry is served from the cache with the DRF body and ETag"""
+        for sync_url, async_url in [
+            (reverse('property-list'), reverse('async-property-list')),
+            (reverse('property-detail', args=[self.villa.slug]), reverse('async-property-detail', args=[self.villa.slug])),
+            (
+                reverse('property-recommendations', args=[self.villa.slug]),
+                reverse('async-property-recommendations', args=[self.villa.slug]),
+            ),
+        ]:
+            expected = self.get(sync_url)
+            with self.assertNumQueries(0):
+                response = self.get(async_url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), expected.json())
+            self.assertEqual(response['ETag'], expected['ETag'])
+            with self.assertNumQueries(0):
+                revalidated = self.get(async_url, headers={'If-None-Match': response['ETag']})
+            self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(local_view_store.pending[self.villa.pk], 3)
+    
+    def test_miss_falls_back_to_sync_view(self):
+        """Test a cold key is computed by the DRF view, then served as a hit"""
+        url = reverse('async-property-list') + '?ordering=price'
+        response = self.get(url)
+        self.assertEqual([row['name'] for row in response.json()['results']], ['Beach Villa'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(url).json(), response.json())
+    
+    def test_staff_bypass_shared_cache(self):
+        """Test staff tokens get the live, unfiltered list"""
+        self.get(reverse('async-property-list'))
+        admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        token = AccessToken.for_user(admin)
+        response = self.get(reverse('async-property-list'), headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.json()['count'], 2)
+        
+        response = self.get(reverse('async-property-list'), headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(response.status_code, 401)
+    
+    def test_lean_asgi_handler_serves_hits(self):
+        """Test the deployed ASGI app routes api/async/ through the read-path handler"""
+        from luxury_real_estate.asgi import application
+        url = reverse('async-property-list')
+        self.get(url)
+        self.assertEqual(async_to_sync(Command.call_asgi)(application, url), 200)
+    
+    def test_lean_chain_leaves_settings_alone(self):
+        """Test building the read-path chain never touches settings.MIDDLEWARE"""
+        from luxury_real_estate.asgi import ReadPathASGIHandler
+        seen = []
+        
+        class Recording:
+            def __init__(self, get_response):
+                seen.append(list(settings.MIDDLEWARE))
+        
+        with mock.patch('luxury_real_estate.asgi.import_string', return_value=Recording), \
+                self.settings(ASYNC_READ_MIDDLEWARE=['recording']):
+            ReadPathASGIHandler()
+        self.assertEqual(seen, [list(settings.MIDDLEWARE)])
+        self.assertIn('django.middleware.csrf.CsrfViewMiddleware', seen[0])
+    
+    def test_category_tree(self):
+        """Test the tree is read from the versioned tree cache"""
+        expected = self.get(reverse('async-category-tree'))
+        self.assertEqual([node['name'] for node in expected.json()], ['Villas'])
+        with self.assertNumQueries(0):
+            response = self.get(reverse('async-category-tree'))
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+
+class PropertyListRowSerializerTestCase(TestCase):
+    """Test the .values() list path against PropertyListSerializer"""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Villas')
+        self.plain = Property.objects.create(
+            name='Plain Villa', description='Test', location='Dhaka', price='1234.5',
+            bedrooms=3, bathrooms=2, category=category
+        )
+        self.photo = Property.objects.create(
+            name='Photo Villa \u2028', description='Test', location='Dhaka', price=99,
+            bedrooms=1, bathrooms=1, category=category, latitude=23.81, longitude=90.41, featured=True
+        )
+        Property.objects.filter(pk=self.photo.pk).update(
+            image='properties/photo.jpg', image_width=800, image_height=600, image_color='#aabbcc',
+            image_variants={'small': {'width': 320, 'height': 240, 'webp': 'properties/variants/photo-small.webp'}},
+        )
+        Property.objects.create(
+            name='Upload Villa', description='Test', location='Dhaka', price=5,
+            bedrooms=1, bathrooms=1, category=category, image='properties/upload.jpg'
+        )
+        self.request = APIRequestFactory().get('/api/properties/')
+    
+    def test_rows_match_model_serializer(self):
+        """Test every field, URLs and formats included, equals the DRF output"""
+        queryset = Property.objects.select_related('category').order_by('pk')
+        expected = PropertyListSerializer(queryset, many=True, context={'request': self.request}).data
+        rows = PropertyListRowSerializer(context={'request': self.request})
+        actual = rows.to_representation(rows.values(queryset))
+        self.assertEqual(actual, [dict(row) for row in expected])
+        self.assertEqual([list(row) for row in actual], [list(row) for row in expected])
+        self.assertEqual(actual[0]['price'], '1234.50')
+    
+    def test_fast_renderer_matches_drf_json(self):
+        """Test the orjson renderer writes the same bytes as DRF's JSONRenderer"""
+        data = {'results': PropertyListSerializer(
+            Property.objects.order_by('pk'), many=True, context={'request': self.request}
+        ).data, 'count': 3}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+    
+    def test_list_endpoint_uses_rows(self):
+        """Test the list endpoint serves the same page without model instances"""
+        response = APIClient().get(reverse('property-list'), {'ordering': 'price'})
+        self.assertEqual([row['name'] for row in response.data['results']][:2], ['Upload Villa', 'Photo Villa \u2028'])
+        self.assertTrue(response.data['results'][1]['image'].endswith('photo-small.webp'))
+
+
+class SparseFieldsetTestCase(TestCase):
+    """Test ?fields= and ?include= on the property list and detail endpoints"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.category = Category.objects.create(name='Villas')
+        self.villa = Property.objects.create(
+            name='Lake Villa', description='Test', location='Dhaka', price=100,
+            bedrooms=3, bathrooms=2, category=self.category
+        )
+        Property.objects.create(
+            name='Hill Villa', description='Test', location='Sylhet', price=200,
+            bedrooms=4, bathrooms=3, category=self.category
+        )
+        self.client = APIClient()
+    
+    def test_list_fields_and_include(self):
+        """Test the row path narrows the output and sideloads the shared category once"""
+        response = self.client.get(reverse('property-list'), {'fields': 'name,category', 'include': 'category'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row for row in response.data['results']],
+            [{'id': prop.pk, 'name': prop.name, 'category': self.category.pk}
+             for prop in Property.objects.order_by('-created_at')]
+        )
+        self.assertEqual(
+            response.data['included']['category'],
+            {str(self.category.pk): {'id': self.category.pk, 'name': 'Villas', 'slug': self.category.slug}}
+        )
+        # Cached separately from the full page
+        self.assertIn('price', self.client.get(reverse('property-list')).data['results'][0])
+    
+    def test_list_nested_fields(self):
+        """Test fields of the nested category go through the ModelSerializer"""
+        response = self.client.get(reverse('property-list'), {'fields': 'name,category', 'fields[category]': 'name'})
+        self.assertEqual(response.data['results'][0]['category'], {'id': self.category.pk, 'name': 'Villas'})
+    
+    def test_detail_fields(self):
+        """Test the detail endpoint caches each selection apart from the full payload"""
+        url = reverse('property-detail', kwargs={'slug': self.villa.slug})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'name,price'})
+        self.assertEqual(response.data, {'id': self.villa.pk, 'name': 'Lake Villa', 'price': '100.00'})
+        self.assertNotIn('description', queries.captured_queries[0]['sql'])
+        self.assertIn('description', self.client.get(url).data)
+        self.assertEqual(self.client.get(url, {'fields': 'nope'}).status_code, 400)
@@ -1,47 +1,108 @@
 # backend/properties/views.py - COMPLETE FIXED VERSION
 
+import hashlib
+import io
+from urllib.parse import urlencode
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
 from django.conf import settings
-from django.core.cache import cache
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
+from core.cache import (
+    PROPERTY_LIST_TAG,
+    category_tag,
+    entry_validators,
+    fill_reads,
+    get_or_compute_tagged_entry,
+    get_tag_versions,
+    get_tagged_entry,
+    property_tag,
+    recommendations_tag,
+    set_tagged,
+    write_generation,
+)
+from core.conditional import ConditionalGetMixin, make_etag
+from core.db_router import use_primary
+from core.pagination import KeysetOrPageNumberPagination
+from core.sparse import FieldSelection, SparseFieldsViewMixin
+from services.bulk_update_service import BulkUpdateService
+from services.category_tree_service import CategoryTreeService
+from services.change_feed_service import ChangeFeedService
+from services.cluster_service import ClusterService
+from services.comparables_service import ComparablesService
+from services.facet_service import FacetService
+from services.import_service import ImportService
+from services.recommendation_service import RecommendationService
+from services.view_counter_service import ViewCounterService
+from .filters import PropertyFilterSet, PropertyGeoFilter, PropertySearchFilter, parse_floats
 from .models import Property, Category
 from .serializers import (
+    PropertyBulkUpdateSerializer,
+    PropertyListRowSerializer,
     PropertyListSerializer,
     PropertyDetailSerializer,
-    CategorySerializer
+    CategorySerializer,
+    CategorySyncSerializer
 )
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Category ViewSet - Read-only access for all users
+    Every Category write moves the tree version, so it validates all actions
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
 
+    def check_not_modified(self, request):
+        version, built_at = CategoryTreeService.get_validators()
+        etag = make_etag('categories', request.get_full_path(), version)
+        return self.not_modified(request, etag, built_at)
+
+    def list(self, request, *args, **kwargs):
+        """List categories, or the whole nested tree with ?tree=true"""
+        if request.query_params.get('tree') in ('1', 'true', 'True'):
+            return self.tree(request)
+        return self.check_not_modified(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.check_not_modified(request) or super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Full category tree built from one query and cached per tree version
+        URL: /api/properties/categories/tree/
+        """
+        return self.check_not_modified(request) or Response(CategoryTreeService.get_tree())
 
-class PropertyViewSet(viewsets.ModelViewSet):
+
+class PropertyViewSet(ConditionalGetMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     Property ViewSet - Full CRUD operations with proper permissions
     - List/Retrieve: Anyone can view
     - Create/Update/Delete: Only admins
+    - List, retrieve and recommendations answer conditional GETs with 304
+    - List and retrieve take ?fields= / ?include= (see core.sparse)
     """
     lookup_field = 'slug'
     queryset = Property.objects.filter(status='active').select_related('category')
     serializer_class = PropertyListSerializer
+    filter_backends = [DjangoFilterBackend, PropertyGeoFilter, PropertySearchFilter, OrderingFilter]
+    filterset_class = PropertyFilterSet
+    pagination_class = KeysetOrPageNumberPagination
 
     def get_permissions(self):
         """
         Set permissions based on action
-        - list, retrieve, recommendations: Anyone (AllowAny)
+        - list, retrieve, recommendations, comparables, facets, clusters, trending, changes: Anyone (AllowAny)
         - create, update, partial_update, destroy: Admin only (IsAdminUser)
         """
-        if self.action in ['list', 'retrieve', 'recommendations']:
+        if self.action in ['list', 'retrieve', 'recommendations', 'comparables', 'facets', 'clusters', 'trending', 'changes']:
             return [AllowAny()]
         return [IsAdminUser()]
 
@@ -51,9 +112,10 @@ class PropertyViewSet(viewsets.ModelViewSet):
         - Admin: See all properties (active, inactive, sold)
         - Regular users: Only active properties
         """
+        queryset = Property.objects.select_related('category').defer('search_vector')
         if self.request.user.is_staff:
-            return Property.objects.all().select_related('category')
-        return Property.objects.filter(status='active').select_related('category')
+            return queryset
+        return queryset.filter(status='active')
 
     def get_serializer_class(self):
         """Use detailed serializer for single property view"""
@@ -61,29 +123,124 @@ class PropertyViewSet(viewsets.ModelViewSet):
             return PropertyDetailSerializer
         return PropertyListSerializer
 
-    # 1. List view - Full page caching (15 min)
-    @method_decorator(cache_page(settings.CACHE_TTL))
+    def use_cache(self):
+        """Shared caches hold the public view only; staff always read live data"""
+        return not self.request.user.is_staff
+
+    # Shared cache keys (the async read path in async_views.py reads the same entries)
+    @staticmethod
+    def list_cache_key(query_params):
+        query = urlencode(sorted(query_params.lists()), doseq=True)
+        return f"property_list_{hashlib.md5(query.encode()).hexdigest()}"
+
+    @staticmethod
+    def detail_cache_key(slug, query_params=None):
+        """One entry per slug, plus one per ?fields= / ?include= selection asked for"""
+        selection = FieldSelection.from_query_params(query_params) if query_params else None
+        if selection:
+            return f"property_detail_{slug}_{selection.key()}"
+        return f"property_detail_{slug}"
+
+    @staticmethod
+    def category_ids(rows):
+        """Categories shown by serialized properties, nested or sent as included ids"""
+        ids = set()
+        for row in rows:
+            category = row.get('category')
+            if isinstance(category, dict):
+                ids.add(category['id'])
+            elif category is not None:
+                ids.add(category)
+        return ids
+
+    @staticmethod
+    def recommendations_cache_key(slug):
+        return f"recommendations_{slug}"
+
+    def staff_validators(self, request):
+        """
+        ETag for uncached staff reads: every property write moves the
+        property-list generation and every category write the tree version
+        """
+        versions = get_tag_versions([PROPERTY_LIST_TAG])
+        return make_etag(
+            'staff', request.get_full_path(), versions[PROPERTY_LIST_TAG], CategoryTreeService.get_version()
+        ), None
+
+    def list_rows(self, request):
+        """
+        list() built from .values() rows by PropertyListRowSerializer
+        (no model instances, no ModelSerializer dispatch); same output.
+        Rows cover top-level ?fields= and ?include=; fields of nested
+        objects go through the ModelSerializer
+        """
+        if self.get_selection().fields.keys() - {''}:
+            return super().list(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = PropertyListRowSerializer(context=self.get_serializer_context())
+        page = self.paginate_queryset(rows.values(queryset))
+        if page is not None:
+            return self.get_paginated_response(rows.to_representation(page))
+        return Response(rows.to_representation(rows.values(queryset)))
+
+    def cached_response(self, request, cache_key, entry):
+        """304 when the client holds this entry's representation, else the cached data"""
+        return (
+            self.not_modified(request, *entry_validators(cache_key, entry))
+            or Response(entry['value'])
+        )
+
+    # 1. List view - Tagged page caching (15 min)
     def list(self, request, *args, **kwargs):
-        """Get all properties with caching"""
-        return super().list(request, *args, **kwargs)
+        """
+        Get all properties with caching
+        Pages are tagged property-list plus the categories they show, so any
+        property or category write drops them immediately
+        """
+        if not self.use_cache():
+            return (
+                self.not_modified(request, *self.staff_validators(request))
+                or self.list_rows(request)
+            )
+
+        cache_key = self.list_cache_key(request.query_params)
+        entry = get_tagged_entry(cache_key, name='property_list')
+        if entry is not None:
+            return self.cached_response(request, cache_key, entry)
+
+        since = write_generation()
+        with fill_reads():
+            response = self.list_rows(request)
+        rows = response.data.get('results', []) if isinstance(response.data, dict) else response.data
+        tags = [PROPERTY_LIST_TAG] + [category_tag(category_id) for category_id in self.category_ids(rows)]
+        entry = set_tagged(cache_key, response.data, tags, since, settings.CACHE_TTL)
+        return self.not_modified(request, *entry_validators(cache_key, entry)) or response
 
     # 2. Single property detail - Cache per property
     def retrieve(self, request, *args, **kwargs):
-        """Get single property by slug with caching"""
+        """
+        Get single property by slug with caching (tagged with the property and its category)
+        Single-flight: one worker recomputes an expired entry while others serve it stale
+        Public views (304s included) count towards view_count and trending
+        """
+        if not self.use_cache():
+            return (
+                self.not_modified(request, *self.staff_validators(request))
+                or super().retrieve(request, *args, **kwargs)
+            )
+
         slug = kwargs.get('slug')
-        cache_key = f"property_detail_{slug}"
-        
-        # Try to get from cache
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
-
-        # Not in cache → get from DB
-        response = super().retrieve(request, *args, **kwargs)
-        
-        # Save to cache for next time
-        cache.set(cache_key, response.data, settings.CACHE_TTL)
-        return response
+        cache_key = self.detail_cache_key(slug, request.query_params)
+
+        def compute():
+            data = super(PropertyViewSet, self).retrieve(request, *args, **kwargs).data
+            tags = [property_tag(data['id'])]
+            return data, tags + [category_tag(category_id) for category_id in self.category_ids([data])]
+
+        entry = get_or_compute_tagged_entry(cache_key, compute, settings.CACHE_TTL, name='property_detail')
+        # Buffered in Redis; flushed to view_count by a periodic task
+        ViewCounterService.record_view(entry['value']['id'])
+        return self.cached_response(request, cache_key, entry)
 
     # 3. CREATE - Admin only (handled by get_permissions)
     def create(self, request, *args, **kwargs):
@@ -114,11 +271,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
     def partial_update(self, request, *args, **kwargs):
         """Partial update (PATCH) - Admin only"""
         try:
-            # Clear cache when updating
-            slug = kwargs.get('slug')
-            cache_key = f"property_detail_{slug}"
-            cache.delete(cache_key)
-            
+            # Cached entries are invalidated by tag in properties.signals
             return super().partial_update(request, *args, **kwargs)
         except Exception as e:
             return Response(
@@ -130,11 +283,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         """Delete property - Admin only"""
         try:
-            # Clear cache when deleting
-            slug = kwargs.get('slug')
-            cache_key = f"property_detail_{slug}"
-            cache.delete(cache_key)
-            
+            # Cached entries are invalidated by tag in properties.signals
             return super().destroy(request, *args, **kwargs)
         except Exception as e:
             return Response(
@@ -142,68 +291,208 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-    # 7. DFS Recommendations - Public access
+    # 7. Recommendations - Public access
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def recommendations(self, request, slug=None):
         """
-        Get recommended properties using DFS algorithm
+        Get recommended properties from the precomputed recommendation table
+        Covers the category subtree and sibling subtrees, ranked by price proximity
         URL: /api/properties/{slug}/recommendations/
         """
-        try:
-            # Get the property object using slug (lookup_field)
+        cache_key = self.recommendations_cache_key(slug)
+
+        def compute():
             property_obj = self.get_object()
-        except Property.DoesNotExist:
-            return Response({'error': 'Property not found'}, status=404)
-        
-        cache_key = f"recommendations_{slug}"
+            recommendations = RecommendationService.get_recommendations(property_obj)
+            serializer = PropertyListSerializer(
+                recommendations,
+                many=True,
+                context={'request': request}
+            )
+            # Tags cover this property, its recommendation entry and every
+            # recommended property, so a hit needs no DB access to validate
+            tags = [property_tag(property_obj.pk), recommendations_tag(property_obj.pk)]
+            tags += [property_tag(prop.pk) for prop in recommendations]
+            return serializer.data, tags
+
+        if not self.use_cache():
+            return Response(compute()[0])
 
-        # Check cache first
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
+        # Cache for 15 minutes, single-flight on expiry
+        entry = get_or_compute_tagged_entry(cache_key, compute, settings.CACHE_TTL, name='recommendations')
+        return self.cached_response(request, cache_key, entry)
+
+    # 8. k-NN Comparables - Public access
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def comparables(self, request, slug=None):
+        """
+        Get comparable properties by price, bedrooms, bathrooms, size and category
+        URL: /api/properties/{slug}/comparables/?k=6
+        """
+        property_obj = self.get_object()
 
         try:
-            # DFS Algorithm
-            visited = set()
-            recommendations = []
-
-            def dfs(category, depth=0):
-                """Depth-first search through category tree"""
-                if depth > 3 or category in visited:
-                    return
-                visited.add(category)
-
-                # Get properties in this category
-                try:
-                    props = Property.objects.filter(
-                        category=category,
-                        status='active'
-                    ).exclude(id=property_obj.id)[:4]
-
-                    for prop in props:
-                        if prop not in recommendations:
-                            recommendations.append(prop)
-                except Exception as e:
-                    print(f"Error getting properties: {e}")
-
-            # Start DFS from property's category
-            if property_obj.category:
-                dfs(property_obj.category)
-
-            # Serialize the results
-            serializer = PropertyListSerializer(
-                recommendations[:8], 
-                many=True, 
-                context={'request': request}
+            k = min(max(int(request.query_params.get('k', 6)), 1), 50)
+        except ValueError:
+            return Response({'error': 'k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        comparables = ComparablesService.get_comparables(property_obj, k=k)
+        serializer = PropertyListSerializer(
+            [prop for prop, _ in comparables],
+            many=True,
+            context={'request': request}
+        )
+        result = [
+            {**row, 'distance': round(distance, 4)}
+            for row, (_, distance) in zip(serializer.data, comparables)
+        ]
+        return Response(result)
+
+    # 9. Facets - Public access
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def facets(self, request):
+        """
+        Filter sidebar counts for the current result set (same filters as the list)
+        URL: /api/properties/facets/?price__gte=...&bedrooms__gte=...
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(FacetService.get_facets(
+            queryset, request.query_params, is_staff=request.user.is_staff
+        ))
+
+    # 10. Map clusters - Public access
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def clusters(self, request):
+        """
+        Property markers aggregated into grid cells for the map viewport
+        Served from the precomputed cluster table, never from the property rows
+        URL: /api/properties/clusters/?bbox=<south>,<west>,<north>,<east>&zoom=<0-20>
+        """
+        bbox = parse_floats(request, 'bbox', 4)
+        if bbox is None:
+            return Response({'error': 'bbox is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            zoom = min(max(int(request.query_params.get('zoom', 10)), 0), 22)
+        except ValueError:
+            return Response({'error': 'zoom must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ClusterService.get_clusters(*bbox, zoom=zoom))
+
+    # 11. Trending - Public access
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def trending(self, request):
+        """
+        Most viewed active properties, recent views weighing most
+        Ranked by the trending sorted set; rows come from one batched query
+        URL: /api/properties/trending/?limit=20
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        trending = ViewCounterService.get_trending(limit)
+        serializer = PropertyListSerializer(
+            [prop for prop, _ in trending],
+            many=True,
+            context={'request': request}
+        )
+        return Response([
+            {**row, 'trending_score': round(score, 2)}
+            for row, (_, score) in zip(serializer.data, trending)
+        ])
+
+    # 12. Change feed - Public access
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def changes(self, request):
+        """
+        Properties and categories changed or deleted since a cursor, for sync clients
+        Start without `since`, then pass back `next` until has_more is false
+        URL: /api/properties/changes/?since=<token>&limit=500
+        """
+        since = request.query_params.get('since')
+        after_id = 0
+        if since:
+            after_id = ChangeFeedService.decode_cursor(since)
+            if after_id is None:
+                return Response({'error': 'since is not a valid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', settings.CHANGE_FEED_PAGE_SIZE))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), settings.CHANGE_FEED_MAX_PAGE_SIZE)
+
+        # Always the primary: a replica may be up to REPLICA_MAX_LAG_SECONDS
+        # behind, longer than the settle window, and a cursor moved past
+        # entries it had not replicated yet would skip them for good
+        with use_primary():
+            page = ChangeFeedService.get_changes(after_id, limit, include_inactive=request.user.is_staff)
+            context = {'request': request}
+            return Response({
+                'properties': PropertyListSerializer(page['properties'], many=True, context=context).data,
+                'categories': CategorySyncSerializer(page['categories'], many=True, context=context).data,
+                'deleted': {
+                    'properties': page['deleted_properties'],
+                    'categories': page['deleted_categories'],
+                },
+                'next': ChangeFeedService.encode_cursor(page['cursor']),
+                'has_more': page['has_more'],
+            })
+
+    # 13. Bulk import - Admin only (handled by get_permissions)
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Stream an uploaded CSV / JSONL listing feed into the property table
+        URL: /api/properties/import/  (multipart: file, format?, upsert?, batch_size?)
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or ImportService.detect_format(upload.name, default='')
+        if fmt not in ImportService.FORMATS:
+            return Response(
+                {'error': f"format must be one of {', '.join(ImportService.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            result = serializer.data
+        try:
+            batch_size = min(max(int(request.data.get('batch_size', 1000)), 1), 10000)
+        except ValueError:
+            return Response({'error': 'batch_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Cache for 15 minutes
-            cache.set(cache_key, result, settings.CACHE_TTL)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        summary = ImportService.run(
+            ImportService.read_rows(stream, fmt),
+            batch_size=batch_size,
+            upsert=str(request.data.get('upsert', '')).lower() in ('1', 'true', 'yes'),
+        )
+        return Response(summary)
 
-            return Response(result)
-            
-        except Exception as e:
-            print(f"Error in recommendations DFS: {e}")
-            # Return empty list on error instead of 500
-            return Response([])
\ No newline at end of file
+    # 14. Bulk update - Admin only (handled by get_permissions)
+    @action(detail=False, methods=['post'], url_path='bulk-update', parser_classes=[JSONParser])
+    def bulk_update(self, request):
+        """
+        Set status, featured or price on many properties with one UPDATE
+        URL: /api/properties/bulk-update/
+        Body: {"ids": [...]} or {"filters": {...list filters...}} plus any of
+              status, featured, price, price_percent
+        e.g. {"filters": {"category": 4}, "price_percent": 5} raises the subtree's prices 5%
+        """
+        serializer = PropertyBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = serializer.validated_data
+
+        queryset = Property.objects.all()
+        if 'ids' in changes:
+            queryset = queryset.filter(pk__in=changes['ids'])
+        else:
+            filterset = PropertyFilterSet(data=changes['filters'], queryset=queryset, request=request)
+            if not filterset.is_valid():
+                return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+            queryset = filterset.qs
+
+        try:
+            updated = BulkUpdateService.apply(queryset, changes)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'updated': updated})
@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models import Count
+from properties.models import Amenity, PropertyAmenity
+
+
+class AmenityService:
+    """
+    Amenity Service - Indexed amenity filters
+
+    Property.amenities stays the source of truth (a JSON list of names);
+    PropertyAmenity mirrors it as indexed (amenity, property) pairs so
+    "Pool AND Gym" is a grouped index scan instead of a JSON scan of every row
+    """
+
+    @staticmethod
+    def parse(raw):
+        """Distinct amenity keys from a comma-separated query value"""
+        return sorted({Amenity.make_key(name) for name in (raw or '').split(',') if name.strip()})
+
+    @staticmethod
+    def filter(queryset, keys, match_all=True):
+        """
+        Properties having all (or any) of the amenity keys
+
+        all: property ids whose links to the keys number len(keys)
+        any: property ids with at least one link
+        """
+        if not keys:
+            return queryset
+        links = PropertyAmenity.objects.filter(amenity__key__in=keys).values('property_id')
+        if match_all and len(keys) > 1:
+            links = links.annotate(matched=Count('amenity_id')).filter(matched=len(keys))
+        return queryset.filter(pk__in=links.values('property_id'))
+
+    @staticmethod
+    def names(property_obj):
+        amenities = property_obj.amenities
+        return amenities if isinstance(amenities, list) else []
+
+    @staticmethod
+    def _amenity_ids(names):
+        """Amenity ids by key, creating the missing amenities in one insert"""
+        wanted = {}
+        for name in names:
+            key = Amenity.make_key(name)
+            if key:
+                wanted.setdefault(key, Amenity.clean_name(name))
+        if not wanted:
+            return {}
+        existing = dict(Amenity.objects.filter(key__in=wanted).values_list('key', 'id'))
+        missing = [Amenity(key=key, name=name) for key, name in wanted.items() if key not in existing]
+        if missing:
+            Amenity.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = dict(Amenity.objects.filter(key__in=wanted).values_list('key', 'id'))
+        return existing
+
+    @staticmethod
+    def sync(properties):
+        """
+        Rewrite the amenity index for these properties from their JSON lists
+        One query each for amenities, old links and new links, however many
+        properties are passed (bulk import hands over whole batches)
+        """
+        properties = [prop for prop in properties if prop.pk]
+        if not properties:
+            return
+        names = [name for prop in properties for name in AmenityService.names(prop)]
+
+        with transaction.atomic():
+            ids = AmenityService._amenity_ids(names)
+            PropertyAmenity.objects.filter(property_id__in=[prop.pk for prop in properties]).delete()
+            links = {
+                (ids[key], prop.pk)
+                for prop in properties
+                for key in map(Amenity.make_key, AmenityService.names(prop))
+                if key in ids
+            }
+            PropertyAmenity.objects.bulk_create(
+                [PropertyAmenity(amenity_id=amenity_id, property_id=property_id) for amenity_id, property_id in links],
+                batch_size=1000,
+            )
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+from core.cache import PROPERTY_LIST_TAG, invalidate_tags, property_tag
+from properties.models import CatalogChange, Property
+from properties.tasks import queue_recommendation_refresh
+from services.change_feed_service import ChangeFeedService
+from services.cluster_service import ClusterService
+
+
+class BulkUpdateService:
+    """
+    Bulk Update Service - Admin edits of many listings at once
+
+    status, featured and price (absolute or by percent) are written with one
+    UPDATE per BATCH_SIZE of the locked matched rows. Like the bulk import it bypasses
+    save() and the signals, so it moves map clusters by net per-cell deltas,
+    logs the change for the sync feed, drops the cache tags of every matched
+    property in one pipelined bump and queues the recommendation refresh itself.
+    """
+
+    STATE_FIELDS = ('id', 'category_id', 'status', 'geohash', 'price', 'latitude', 'longitude')
+    # Locked rows are updated and read back in chunks of this many ids (SQLite bind limit)
+    BATCH_SIZE = 5000
+
+    @staticmethod
+    def price_factor(percent):
+        return Decimal(1) + Decimal(percent) / 100
+
+    @staticmethod
+    def max_price():
+        """Largest value the price column holds (numeric(max_digits, decimal_places))"""
+        field = Property._meta.get_field('price')
+        return Decimal(10) ** (field.max_digits - field.decimal_places) - Decimal(10) ** -field.decimal_places
+
+    @staticmethod
+    def assignments(changes):
+        """UPDATE ... SET values for validated changes"""
+        values = {field: changes[field] for field in ('status', 'featured', 'price') if field in changes}
+        if 'price_percent' in changes:
+            factor = BulkUpdateService.price_factor(changes['price_percent'])
+            values['price'] = Round(F('price') * Value(factor), 2)
+        return values
+
+    @staticmethod
+    def _lock_states(queryset):
+        """Lock the matched rows (their before-states stay true until the UPDATE) and read them"""
+        locked = queryset.select_for_update(of=('self',)).order_by()
+        return {row['id']: row for row in locked.values(*BulkUpdateService.STATE_FIELDS)}
+
+    @staticmethod
+    def _read_states(ids):
+        rows = {}
+        for start in range(0, len(ids), BulkUpdateService.BATCH_SIZE):
+            chunk = ids[start:start + BulkUpdateService.BATCH_SIZE]
+            rows.update(
+                (row['id'], row)
+                for row in Property.objects.filter(pk__in=chunk).values(*BulkUpdateService.STATE_FIELDS)
+            )
+        return rows
+
+    @staticmethod
+    def apply(queryset, changes):
+        """
+        Apply validated changes to every property in the queryset
+
+        Returns:
+            int: number of properties updated
+
+        Raises:
+            ValueError: price_percent would overflow a matched price (nothing is written)
+        """
+        values = BulkUpdateService.assignments(changes)
+        with transaction.atomic():
+            before = BulkUpdateService._lock_states(queryset)
+            if not before:
+                return 0
+            if 'price_percent' in changes:
+                # Checked on the locked prices: an overflowing UPDATE would fail the whole batch
+                highest = max(row['price'] for row in before.values())
+                scaled = (highest * BulkUpdateService.price_factor(changes['price_percent'])).quantize(Decimal('0.01'))
+                if scaled > BulkUpdateService.max_price():
+                    raise ValueError(f'price_percent would take a price of {highest} past the largest price allowed')
+            # By id, not by re-running the filter: a row that started matching
+            # after the lock would be updated without its cluster delta, log
+            # entry, cache purge and recommendation refresh
+            ids, now, updated = list(before), timezone.now(), 0
+            for start in range(0, len(ids), BulkUpdateService.BATCH_SIZE):
+                chunk = ids[start:start + BulkUpdateService.BATCH_SIZE]
+                updated += Property.objects.filter(pk__in=chunk).update(updated_at=now, **values)
+            after = BulkUpdateService._read_states(ids)
+            ClusterService.apply_changes(
+                (Property.cluster_state_of(row), Property.cluster_state_of(after[pk]))
+                for pk, row in before.items() if pk in after
+            )
+
+            property_ids = list(before)
+            ChangeFeedService.record(CatalogChange.KIND_PROPERTY, property_ids)
+            category_ids = {row['category_id'] for row in before.values()}
+            transaction.on_commit(lambda: BulkUpdateService._after_update(property_ids, category_ids))
+        return updated
+
+    @staticmethod
+    def _after_update(property_ids, category_ids):
+        invalidate_tags([PROPERTY_LIST_TAG] + [property_tag(pk) for pk in property_ids])
+        queue_recommendation_refresh(property_ids, category_ids)
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import serializers
+from core.db_router import use_primary
+from core.utils import bump_generation, get_generation
+from properties.models import Category
+
+
+class CategoryTreeService:
+    """
+    Category Tree Service - Builds the nested category tree in memory
+    The tree is loaded with a single query and cached under a version key;
+    any Category write bumps the version so stale trees are never served
+    """
+    
+    VERSION_KEY = 'category_tree_version'
+    TREE_KEY = 'category_tree_v{version}'
+    
+    @staticmethod
+    def get_version():
+        """Current tree version"""
+        return get_generation(CategoryTreeService.VERSION_KEY)
+    
+    @staticmethod
+    def bump_version():
+        """Invalidate every cached tree by moving to a new version"""
+        return bump_generation(CategoryTreeService.VERSION_KEY)
+    
+    @staticmethod
+    def _build():
+        """
+        Load every category in one query and link the nodes in memory
+        
+        Time Complexity: O(n) where n is number of categories
+        """
+        datetime_field = serializers.DateTimeField()
+        rows = Category.objects.values(
+            'id', 'name', 'slug', 'parent_id', 'description', 'created_at'
+        )
+        
+        nodes = {}
+        for row in rows:
+            nodes[row['id']] = {
+                'id': row['id'],
+                'name': row['name'],
+                'slug': row['slug'],
+                'parent': row['parent_id'],
+                'description': row['description'],
+                'children': [],
+                'created_at': datetime_field.to_representation(row['created_at']),
+            }
+        
+        roots = []
+        for node in nodes.values():
+            parent = nodes.get(node['parent'])
+            if parent is None:
+                roots.append(node)
+            else:
+                parent['children'].append(node)
+        
+        return {'roots': roots, 'nodes': nodes, 'built_at': timezone.now()}
+    
+    @staticmethod
+    def _get_cached():
+        cache_key = CategoryTreeService.TREE_KEY.format(version=CategoryTreeService.get_version())
+        tree = cache.get(cache_key)
+        if tree is None:
+            # Cached under the new version, so never built from a lagging replica
+            with use_primary():
+                tree = CategoryTreeService._build()
+            cache.set(cache_key, tree, settings.CACHE_TTL)
+        return tree
+    
+    @staticmethod
+    def get_validators():
+        """Tree version and build time, for ETag / Last-Modified headers"""
+        version = CategoryTreeService.get_version()
+        tree = CategoryTreeService._get_cached()
+        return version, tree.get('built_at')
+    
+    @staticmethod
+    def get_tree():
+        """Get the full nested tree (list of root categories)"""
+        return CategoryTreeService._get_cached()['roots']
+    
+    @staticmethod
+    def get_nodes():
+        """Get every node keyed by category id"""
+        return CategoryTreeService._get_cached()['nodes']
+    
+    @staticmethod
+    def get_node(category_id):
+        """Get a single category node (with its full subtree) from the cached tree"""
+        return CategoryTreeService._get_cached()['nodes'].get(category_id)
+    
+    @staticmethod
+    def get_children(category_id, depth=3):
+        """
+        Get a category's children limited to `depth` levels
+        Matches the shape CategorySerializer used to produce recursively
+        """
+        node = CategoryTreeService.get_node(category_id)
+        if node is None or depth <= 0:
+            return []
+        return [CategoryTreeService._trim(child, depth - 1) for child in node['children']]
+    
+    @staticmethod
+    def _trim(node, depth):
+        if depth <= 0:
+            return {**node, 'children': []}
+        return {
+            **node,
+            'children': [CategoryTreeService._trim(child, depth - 1) for child in node['children']],
+        }
@@ -0,0 +1,125 @@
+import base64
+import binascii
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from properties.models import CatalogChange, Category, Property
+
+
+class ChangeFeedService:
+    """
+    Change Feed Service - Catalog deltas for sync clients
+
+    Every write moves the object's CatalogChange row to the tail of the log
+    (signals for single writes, the bulk paths for their batches), so a page
+    of the feed is one primary-key range scan plus one batched fetch per
+    kind.
+
+    Log rows are written after the data commits, in a short transaction of
+    their own: an id is only taken once the change is visible, so a long
+    write (bulk update, import batch) never holds an id that readers'
+    cursors have moved past. Entries younger than CHANGE_FEED_SETTLE_SECONDS
+    are still held back to cover those short log transactions.
+    """
+
+    TOKEN_PREFIX = 'c1:'
+    BATCH_SIZE = 1000
+
+    # ---- writing ----
+
+    @staticmethod
+    def record(kind, object_ids, deleted=False):
+        """
+        Log a change (or a deletion) of these objects once the caller's
+        transaction commits (at once outside a transaction)
+        """
+        object_ids = sorted(set(object_ids))
+        transaction.on_commit(lambda: ChangeFeedService.write(kind, object_ids, deleted), robust=True)
+
+    @staticmethod
+    def write(kind, object_ids, deleted=False):
+        batch = ChangeFeedService.BATCH_SIZE
+        with transaction.atomic():
+            for start in range(0, len(object_ids), batch):
+                chunk = object_ids[start:start + batch]
+                CatalogChange.objects.filter(kind=kind, object_id__in=chunk).delete()
+                CatalogChange.objects.bulk_create(
+                    [CatalogChange(kind=kind, object_id=object_id, deleted=deleted) for object_id in chunk]
+                )
+
+    # ---- cursors ----
+
+    @staticmethod
+    def encode_cursor(change_id):
+        token = f'{ChangeFeedService.TOKEN_PREFIX}{change_id}'.encode()
+        return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(token):
+        """Change id in a cursor token, or None when the token is not one of ours"""
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        except (binascii.Error, ValueError):
+            return None
+        prefix = ChangeFeedService.TOKEN_PREFIX
+        if not raw.startswith(prefix) or not raw[len(prefix):].isdigit():
+            return None
+        return int(raw[len(prefix):])
+
+    # ---- reading ----
+
+    @staticmethod
+    def get_changes(after_id, limit, include_inactive=False):
+        """
+        Objects changed after a cursor, oldest change first
+
+        include_inactive: staff sync; otherwise listings that are no longer
+        active are reported as deleted, since they left the public catalog
+
+        Returns:
+            dict: properties and categories (instances), deleted_properties and
+                  deleted_categories (ids), cursor (last change id) and has_more
+        """
+        settled = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+        entries = CatalogChange.objects.filter(id__gt=after_id)
+        unsettled = entries.filter(changed_at__gt=settled).order_by('id').values_list('id', flat=True).first()
+        if unsettled is not None:
+            entries = entries.filter(id__lt=unsettled)
+        entries = list(entries.order_by('id')[:limit + 1])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        live = {CatalogChange.KIND_PROPERTY: [], CatalogChange.KIND_CATEGORY: []}
+        deleted = {CatalogChange.KIND_PROPERTY: [], CatalogChange.KIND_CATEGORY: []}
+        for entry in entries:
+            (deleted if entry.deleted else live)[entry.kind].append(entry.object_id)
+
+        properties = Property.objects.filter(
+            pk__in=live[CatalogChange.KIND_PROPERTY]
+        ).select_related('category').defer('search_vector').in_bulk()
+        categories = Category.objects.in_bulk(live[CatalogChange.KIND_CATEGORY])
+
+        changed_properties = []
+        for property_id in live[CatalogChange.KIND_PROPERTY]:
+            prop = properties.get(property_id)
+            if prop is not None and (include_inactive or prop.status == 'active'):
+                changed_properties.append(prop)
+            else:
+                deleted[CatalogChange.KIND_PROPERTY].append(property_id)
+
+        changed_categories = []
+        for category_id in live[CatalogChange.KIND_CATEGORY]:
+            if category_id in categories:
+                changed_categories.append(categories[category_id])
+            else:
+                deleted[CatalogChange.KIND_CATEGORY].append(category_id)
+
+        return {
+            'properties': changed_properties,
+            'categories': changed_categories,
+            'deleted_properties': sorted(deleted[CatalogChange.KIND_PROPERTY]),
+            'deleted_categories': sorted(deleted[CatalogChange.KIND_CATEGORY]),
+            'cursor': entries[-1].id if entries else after_id,
+            'has_more': has_more,
+        }
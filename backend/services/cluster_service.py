@@ -0,0 +1,301 @@
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Substr
+from django.utils import timezone
+from core.utils import update_rows
+from properties.models import Property, PropertyCluster
+from services.geo_service import GeoService
+
+
+class ClusterService:
+    """
+    Cluster Service - Map markers aggregated per geohash cell
+
+    PropertyCluster holds, for every cell prefix of precision 1..MAX_PRECISION,
+    the number of active properties, their coordinate sums (for the centroid)
+    and their price range. A property write touches one cell per precision,
+    and batches are folded into one net delta per cell; a viewport request
+    reads only the cells of its zoom tier.
+    """
+
+    # (max zoom, geohash precision): cells roughly 1/8 of a 256px map tile
+    ZOOM_TIERS = ((2, 2), (5, 3), (7, 4), (10, 5), (12, 6))
+    MAX_CELLS = 1024
+    # Cells per grouped price-range query: with many more OR'ed ranges
+    # planners stop using the index (SQLite scans the table past ~30)
+    RANGE_CHUNK = 25
+
+    @staticmethod
+    def precision_for_zoom(zoom):
+        for max_zoom, precision in ClusterService.ZOOM_TIERS:
+            if zoom <= max_zoom:
+                return precision
+        return PropertyCluster.MAX_PRECISION
+
+    # ---- maintenance ----
+
+    @staticmethod
+    def _deltas(changes):
+        """
+        Net change per cell for a batch of (old_state, new_state) pairs
+
+        Returns:
+            dict: cell -> {count, latitude, longitude, added_prices, removed_prices}
+        """
+        deltas = {}
+
+        def touch(state, sign):
+            geohash, price, latitude, longitude = state
+            for precision in range(1, PropertyCluster.MAX_PRECISION + 1):
+                delta = deltas.setdefault(geohash[:precision], {
+                    'count': 0, 'latitude': 0.0, 'longitude': 0.0,
+                    'added_prices': [], 'removed_prices': [],
+                })
+                delta['count'] += sign
+                delta['latitude'] += sign * latitude
+                delta['longitude'] += sign * longitude
+                delta['added_prices' if sign > 0 else 'removed_prices'].append(Decimal(price))
+
+        for old_state, new_state in changes:
+            if old_state == new_state:
+                continue
+            if old_state:
+                touch(old_state, -1)
+            if new_state:
+                touch(new_state, 1)
+        return deltas
+
+    @staticmethod
+    def _recompute_price_ranges(clusters):
+        """
+        Price range of clusters whose minimum or maximum may have left
+        Finest cells read their properties; coarser cells read their (at most 32)
+        child clusters, so levels are settled finest first, with one grouped
+        query per RANGE_CHUNK cells and one write per level
+        """
+        levels = {}
+        for cluster in clusters:
+            levels.setdefault(len(cluster.cell), []).append(cluster)
+        for precision in sorted(levels, reverse=True):
+            level = levels[precision]
+            if precision == PropertyCluster.MAX_PRECISION:
+                source, field = Property.objects.filter(status='active'), 'geohash'
+                low, high = Min('price'), Max('price')
+            else:
+                source, field = PropertyCluster.objects.filter(precision=precision + 1), 'cell'
+                low, high = Min('price_min'), Max('price_max')
+
+            bounds = {}
+            for start in range(0, len(level), ClusterService.RANGE_CHUNK):
+                condition = Q()
+                for cluster in level[start:start + ClusterService.RANGE_CHUNK]:
+                    # Prefix range; geohash and cell are C-collated (migration 0015)
+                    condition |= Q(**{f'{field}__gte': cluster.cell, f'{field}__lt': cluster.cell + '~'})
+                rows = source.filter(condition).order_by().annotate(
+                    prefix=Substr(field, 1, precision)
+                ).values('prefix').annotate(low=low, high=high)
+                bounds.update((row['prefix'], (row['low'], row['high'])) for row in rows)
+
+            for cluster in level:
+                cluster.price_min, cluster.price_max = bounds.get(cluster.cell, (cluster.price_min, cluster.price_max))
+            update_rows(level, ['price_min', 'price_max'])
+
+    @staticmethod
+    def apply_changes(changes):
+        """
+        Move many properties' contributions at once (bulk import, bulk edits)
+        One write for all touched cells, whatever the number of properties in them
+
+        changes: iterable of (old_state, new_state); either may be None (not on the map)
+        """
+        deltas = ClusterService._deltas(changes)
+        if not deltas:
+            return
+        try:
+            ClusterService._apply_deltas(deltas)
+        except IntegrityError:
+            # Another writer created one of our new cells first; its row now exists
+            ClusterService._apply_deltas(deltas)
+
+    @staticmethod
+    def _apply_deltas(deltas):
+        """
+        The touched rows are locked, so their new values are worked out here
+        and written in one statement, whatever the number of cells
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            existing = PropertyCluster.objects.select_for_update().in_bulk(list(deltas))
+            created, changed, emptied, stale = [], [], [], []
+            for cell, delta in deltas.items():
+                added = delta['added_prices']
+                cluster = existing.get(cell)
+                if cluster is None:
+                    # A cell with no row yet can only gain properties
+                    if delta['count'] > 0:
+                        created.append(PropertyCluster(
+                            cell=cell, precision=len(cell), count=delta['count'],
+                            latitude_sum=delta['latitude'], longitude_sum=delta['longitude'],
+                            price_min=min(added), price_max=max(added),
+                        ))
+                    continue
+
+                if cluster.count + delta['count'] <= 0:
+                    emptied.append(cell)
+                    continue
+
+                # The price range cannot shrink by arithmetic: recompute only
+                # when a removed price was the cell's minimum or maximum
+                removed = delta['removed_prices']
+                if removed and (min(removed) <= cluster.price_min or max(removed) >= cluster.price_max):
+                    stale.append(cluster)
+                cluster.count += delta['count']
+                cluster.latitude_sum += delta['latitude']
+                cluster.longitude_sum += delta['longitude']
+                if added:
+                    cluster.price_min = min(cluster.price_min, min(added))
+                    cluster.price_max = max(cluster.price_max, max(added))
+                cluster.updated_at = now
+                changed.append(cluster)
+
+            for start in range(0, len(emptied), 1000):
+                PropertyCluster.objects.filter(cell__in=emptied[start:start + 1000]).delete()
+            update_rows(changed, ['count', 'latitude_sum', 'longitude_sum', 'price_min', 'price_max', 'updated_at'])
+            PropertyCluster.objects.bulk_create(created, batch_size=1000)
+            ClusterService._recompute_price_ranges(stale)
+
+    @staticmethod
+    def recount(geohashes):
+        """
+        Recompute the cells containing these geohashes, at every precision,
+        from the active properties themselves
+        Unlike deltas the result does not depend on the order updates run in,
+        so queued single-property updates cannot make the counts drift
+        """
+        cells = {
+            geohash[:precision]
+            for geohash in geohashes if geohash
+            for precision in range(1, PropertyCluster.MAX_PRECISION + 1)
+        }
+        if not cells:
+            return
+        try:
+            ClusterService._recount(cells)
+        except IntegrityError:
+            # Another writer created one of our cells first; its row now exists
+            ClusterService._recount(cells)
+
+    @staticmethod
+    def _recount(cells):
+        """
+        The existing rows are locked before the properties are counted, so a
+        concurrent recount or delta batch of the same cells runs before or after
+        this one, never in between
+        """
+        now = timezone.now()
+        levels = {}
+        for cell in cells:
+            levels.setdefault(len(cell), []).append(cell)
+        located = Property.objects.filter(status='active').exclude(geohash='').order_by()
+        with transaction.atomic():
+            existing = PropertyCluster.objects.select_for_update().in_bulk(list(cells))
+            totals = {}
+            for precision, level in levels.items():
+                condition = Q()
+                for cell in level:
+                    # Prefix range; geohash is C-collated (migration 0015)
+                    condition |= Q(geohash__gte=cell, geohash__lt=cell + '~')
+                rows = located.filter(condition).annotate(cell=Substr('geohash', 1, precision)).values('cell').annotate(
+                    total=Count('id'),
+                    latitude_total=Sum('latitude'),
+                    longitude_total=Sum('longitude'),
+                    low=Min('price'),
+                    high=Max('price'),
+                )
+                totals.update((row['cell'], row) for row in rows)
+
+            created, changed, emptied = [], [], []
+            for cell in cells:
+                row, cluster = totals.get(cell), existing.get(cell)
+                if row is None:
+                    if cluster is not None:
+                        emptied.append(cell)
+                    continue
+                if cluster is None:
+                    cluster = PropertyCluster(cell=cell, precision=len(cell))
+                    created.append(cluster)
+                else:
+                    changed.append(cluster)
+                cluster.count = row['total']
+                cluster.latitude_sum, cluster.longitude_sum = row['latitude_total'], row['longitude_total']
+                cluster.price_min, cluster.price_max = row['low'], row['high']
+                cluster.updated_at = now
+
+            PropertyCluster.objects.filter(cell__in=emptied).delete()
+            update_rows(changed, ['count', 'latitude_sum', 'longitude_sum', 'price_min', 'price_max', 'updated_at'])
+            PropertyCluster.objects.bulk_create(created)
+
+    @staticmethod
+    def rebuild():
+        """
+        Recompute every cluster with one GROUP BY per precision
+
+        Returns:
+            int: number of cells written
+        """
+        located = Property.objects.filter(status='active').exclude(geohash='').order_by()
+        clusters = []
+        for precision in range(1, PropertyCluster.MAX_PRECISION + 1):
+            rows = located.annotate(cell=Substr('geohash', 1, precision)).values('cell').annotate(
+                total=Count('id'),
+                latitude_total=Sum('latitude'),
+                longitude_total=Sum('longitude'),
+                low=Min('price'),
+                high=Max('price'),
+            )
+            clusters.extend(
+                PropertyCluster(
+                    cell=row['cell'], precision=precision, count=row['total'],
+                    latitude_sum=row['latitude_total'], longitude_sum=row['longitude_total'],
+                    price_min=row['low'], price_max=row['high'],
+                )
+                for row in rows
+            )
+        with transaction.atomic():
+            PropertyCluster.objects.all().delete()
+            PropertyCluster.objects.bulk_create(clusters, batch_size=1000)
+        return len(clusters)
+
+    # ---- reading ----
+
+    @staticmethod
+    def get_clusters(south, west, north, east, zoom):
+        """
+        Clusters of the zoom tier inside a viewport
+        Falls back to a coarser precision when the viewport would need more
+        than MAX_CELLS cells at the tier's precision
+
+        Returns:
+            list: dicts with cell, count, centroid and price range
+        """
+        south, north = max(min(south, north), -90.0), min(max(south, north), 90.0)
+        west, east = max(min(west, east), -180.0), min(max(west, east), 180.0)
+
+        precision = ClusterService.precision_for_zoom(zoom)
+        while precision > 1 and GeoService.cell_count(south, west, north, east, precision) > ClusterService.MAX_CELLS:
+            precision -= 1
+        cells = GeoService.cells_in_box(south, west, north, east, precision)
+
+        clusters = PropertyCluster.objects.filter(cell__in=cells).order_by('cell')
+        return [
+            {
+                'cell': cluster.cell,
+                'count': cluster.count,
+                'latitude': round(cluster.latitude_sum / cluster.count, 6),
+                'longitude': round(cluster.longitude_sum / cluster.count, 6),
+                'price_min': cluster.price_min,
+                'price_max': cluster.price_max,
+            }
+            for cluster in clusters if cluster.count
+        ]
@@ -0,0 +1,316 @@
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from core.db_router import use_primary
+from core.utils import bump_generation, get_generation
+from properties.models import Property
+
+
+class ComparablesIndex:
+    """
+    In-memory k-nearest-neighbour index over active properties
+
+    Each row holds standardized features
+        [log(price), bedrooms, bathrooms, log(square_feet)]
+    in a NumPy matrix. Distance is weighted squared euclidean plus a flat
+    penalty when the category differs. Scaling parameters are fixed at full
+    build time so incremental upserts never touch the existing rows.
+    """
+
+    DELETE_VERSION_KEY = 'comparables_delete_version'
+    FEATURE_COUNT = 4
+    # Working memory of one nearest_batch chunk: float32 distances, the
+    # category mask and argpartition's int64 indices, each (chunk x rows)
+    BATCH_CHUNK_BYTES = 32 * 2 ** 20
+
+    def __init__(self, weights=(1.0, 0.5, 0.5, 1.0), category_penalty=1.0):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.category_penalty = np.float32(category_penalty)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.size = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.categories = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, self.FEATURE_COUNT), dtype=np.float32)
+        self.positions = {}
+        self.mean = np.zeros(self.FEATURE_COUNT)
+        self.scale = np.ones(self.FEATURE_COUNT)
+        self.sqft_fill = 0.0
+        self.synced_at = None
+        self.checked_at = 0.0
+        self.delete_version = None
+
+    # ---- building ----
+
+    def _raw_features(self, raw):
+        """raw columns: price, bedrooms, bathrooms, square_feet (NaN when unknown)"""
+        features = np.array(raw, dtype=np.float64, copy=True).reshape(-1, self.FEATURE_COUNT)
+        features[:, 0] = np.log1p(np.maximum(features[:, 0], 0))
+        features[:, 3] = np.log1p(np.maximum(features[:, 3], 0))
+        return features
+
+    def _transform(self, raw):
+        features = self._raw_features(raw)
+        features[:, 3] = np.where(np.isnan(features[:, 3]), self.sqft_fill, features[:, 3])
+        return ((features - self.mean) / self.scale).astype(np.float32)
+
+    def build(self, ids, categories, raw):
+        """Full rebuild from arrays (recomputes the scaling parameters)"""
+        with self._lock:
+            self._reset()
+            ids = np.asarray(ids, dtype=np.int64)
+            features = self._raw_features(raw)
+
+            if len(ids):
+                known_sqft = features[:, 3][~np.isnan(features[:, 3])]
+                self.sqft_fill = float(np.median(known_sqft)) if len(known_sqft) else 0.0
+                features[:, 3] = np.where(np.isnan(features[:, 3]), self.sqft_fill, features[:, 3])
+                self.mean = features.mean(axis=0)
+                std = features.std(axis=0)
+                self.scale = np.where(std > 0, std, 1.0)
+
+            self.ids = ids.copy()
+            self.categories = np.asarray(categories, dtype=np.int64).copy()
+            self.matrix = ((features - self.mean) / self.scale).astype(np.float32)
+            self.size = len(ids)
+            self.positions = {int(pk): row for row, pk in enumerate(self.ids)}
+
+    def _ensure_capacity(self, extra):
+        needed = self.size + extra
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+
+        ids = np.empty(capacity, dtype=np.int64)
+        categories = np.empty(capacity, dtype=np.int64)
+        matrix = np.empty((capacity, self.FEATURE_COUNT), dtype=np.float32)
+        ids[:self.size] = self.ids[:self.size]
+        categories[:self.size] = self.categories[:self.size]
+        matrix[:self.size] = self.matrix[:self.size]
+        self.ids, self.categories, self.matrix = ids, categories, matrix
+
+    def upsert(self, ids, categories, raw):
+        """Insert or replace rows in place (amortized O(1) per row)"""
+        if not len(ids):
+            return
+        with self._lock:
+            features = self._transform(raw)
+            self._ensure_capacity(len(ids))
+            for pk, category_id, row in zip(ids, categories, features):
+                position = self.positions.get(int(pk))
+                if position is None:
+                    position = self.size
+                    self.positions[int(pk)] = position
+                    self.size += 1
+                self.ids[position] = pk
+                self.categories[position] = category_id
+                self.matrix[position] = row
+
+    def remove(self, ids):
+        """Remove rows by swapping the last row into the hole"""
+        with self._lock:
+            for pk in ids:
+                position = self.positions.pop(int(pk), None)
+                if position is None:
+                    continue
+                last = self.size - 1
+                if position != last:
+                    moved = int(self.ids[last])
+                    self.ids[position] = self.ids[last]
+                    self.categories[position] = self.categories[last]
+                    self.matrix[position] = self.matrix[last]
+                    self.positions[moved] = position
+                self.size -= 1
+
+    # ---- syncing with the database ----
+
+    @staticmethod
+    def mark_deleted():
+        """Called when a property row is deleted; forces a full rebuild on next sync"""
+        bump_generation(ComparablesIndex.DELETE_VERSION_KEY)
+
+    @staticmethod
+    def _rows_to_arrays(rows):
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        categories = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+        raw = np.array(
+            [
+                (float(row[3]), row[4], row[5], np.nan if row[6] is None else row[6])
+                for row in rows
+            ],
+            dtype=np.float64,
+        ).reshape(-1, ComparablesIndex.FEATURE_COUNT)
+        return ids, categories, raw
+
+    def sync(self, force=False):
+        """
+        Bring the index up to date with the database
+        Only rows touched since the last sync (less an overlap for late
+        commits; upserts are idempotent) are read; a delete anywhere triggers
+        a full rebuild because deleted rows leave no updated_at trace
+        """
+        now = time.monotonic()
+        if not force and now - self.checked_at < settings.COMPARABLES_SYNC_INTERVAL:
+            return
+
+        # Primary: a replica that has not replayed a delete yet would put the
+        # deleted row back under the new delete version
+        with self._lock, use_primary():
+            self.checked_at = now
+            delete_version = get_generation(self.DELETE_VERSION_KEY)
+            full = self.synced_at is None or delete_version != self.delete_version
+
+            queryset = Property.objects.order_by()
+            if not full:
+                overlap = timedelta(seconds=settings.COMPARABLES_SYNC_OVERLAP_SECONDS)
+                queryset = queryset.filter(updated_at__gte=self.synced_at - overlap)
+            rows = list(queryset.values_list(
+                'id', 'status', 'category_id', 'price',
+                'bedrooms', 'bathrooms', 'square_feet', 'updated_at'
+            ))
+
+            active = [row for row in rows if row[1] == 'active']
+            if full:
+                self.build(*self._rows_to_arrays(active))
+                self.delete_version = delete_version
+            else:
+                self.remove([row[0] for row in rows if row[1] != 'active'])
+                self.upsert(*self._rows_to_arrays(active))
+
+            if rows:
+                latest = max(row[7] for row in rows)
+                self.synced_at = latest if self.synced_at is None else max(self.synced_at, latest)
+            self.checked_at = now
+
+    # ---- querying ----
+
+    def _top_k(self, distances, k):
+        k = min(k, len(distances))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if k < len(distances):
+            candidates = np.argpartition(distances, k - 1)[:k]
+        else:
+            candidates = np.arange(len(distances))
+        return candidates[np.argsort(distances[candidates], kind='stable')]
+
+    def nearest(self, raw, category_id, k=6, exclude_id=None):
+        """
+        k nearest active properties to one feature vector
+
+        Returns:
+            list: (property_id, distance) pairs, closest first
+        """
+        with self._lock:
+            if self.size == 0:
+                return []
+            query = self._transform(raw)[0]
+            matrix = self.matrix[:self.size]
+            diff = matrix - query
+            distances = (diff * diff) @ self.weights
+            distances += self.category_penalty * (self.categories[:self.size] != category_id)
+            if exclude_id is not None and int(exclude_id) in self.positions:
+                distances[self.positions[int(exclude_id)]] = np.inf
+
+            order = self._top_k(distances, k)
+            return [
+                (int(self.ids[row]), float(np.sqrt(distances[row])))
+                for row in order if np.isfinite(distances[row])
+            ]
+
+    def nearest_batch(self, property_ids, k=6, chunk_size=None):
+        """
+        k nearest neighbours for many indexed properties at once
+        Uses ||a||² + ||b||² - 2a·b with one matrix product per chunk, worked
+        out in place in buffers allocated once; chunks default to as many
+        queries as fit in BATCH_CHUNK_BYTES against the whole index
+
+        Returns:
+            dict: property_id -> list of (property_id, distance)
+        """
+        with self._lock:
+            rows = [self.positions[int(pk)] for pk in property_ids if int(pk) in self.positions]
+            if not rows:
+                return {}
+
+            root_weights = np.sqrt(self.weights)
+            matrix = self.matrix[:self.size] * root_weights
+            norms = np.einsum('ij,ij->i', matrix, matrix)
+            categories = self.categories[:self.size]
+            results = {}
+
+            if chunk_size is None:
+                row_bytes = self.size * (np.dtype(np.float32).itemsize + 1 + np.dtype(np.int64).itemsize)
+                chunk_size = max(1, self.BATCH_CHUNK_BYTES // row_bytes)
+            chunk_size = min(chunk_size, len(rows))
+            distance_buffer = np.empty((chunk_size, self.size), dtype=np.float32)
+            mask_buffer = np.empty((chunk_size, self.size), dtype=bool)
+
+            for start in range(0, len(rows), chunk_size):
+                chunk = np.asarray(rows[start:start + chunk_size])
+                distances, mismatch = distance_buffer[:len(chunk)], mask_buffer[:len(chunk)]
+                np.matmul(matrix[chunk], matrix.T, out=distances)
+                distances *= -2.0
+                distances += norms[chunk, None]
+                distances += norms[None, :]
+                np.not_equal(categories[chunk, None], categories[None, :], out=mismatch)
+                np.add(distances, self.category_penalty, out=distances, where=mismatch)
+                np.maximum(distances, 0, out=distances)
+                distances[np.arange(len(chunk)), chunk] = np.inf
+
+                kk = min(k, self.size - 1)
+                if kk <= 0:
+                    continue
+                top = np.argpartition(distances, kk - 1, axis=1)[:, :kk]
+                top_distances = np.take_along_axis(distances, top, axis=1)
+                order = np.argsort(top_distances, axis=1, kind='stable')
+                top = np.take_along_axis(top, order, axis=1)
+                top_distances = np.sqrt(np.take_along_axis(top_distances, order, axis=1))
+
+                for row, neighbours, neighbour_distances in zip(chunk, top, top_distances):
+                    results[int(self.ids[row])] = [
+                        (int(self.ids[n]), float(d))
+                        for n, d in zip(neighbours, neighbour_distances) if np.isfinite(d)
+                    ]
+            return results
+
+
+comparables_index = ComparablesIndex()
+
+
+class ComparablesService:
+    """
+    Comparables Service - "similar homes" for pricing
+    Backed by the per-process ComparablesIndex
+    """
+
+    @staticmethod
+    def get_comparables(property_obj, k=6):
+        """
+        Nearest active properties to the given one
+
+        Returns:
+            list: (Property, distance) pairs, closest first
+        """
+        comparables_index.sync()
+        neighbours = comparables_index.nearest(
+            [(
+                float(property_obj.price),
+                property_obj.bedrooms,
+                property_obj.bathrooms,
+                np.nan if property_obj.square_feet is None else property_obj.square_feet,
+            )],
+            property_obj.category_id,
+            k=k,
+            exclude_id=property_obj.pk,
+        )
+
+        properties = Property.objects.filter(
+            pk__in=[pk for pk, _ in neighbours]
+        ).select_related('category').in_bulk()
+        return [(properties[pk], distance) for pk, distance in neighbours if pk in properties]
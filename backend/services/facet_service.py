@@ -0,0 +1,120 @@
+import hashlib
+from django.conf import settings
+from django.db.models import Count, Q
+from core.cache import PROPERTY_LIST_TAG, fill_reads, get_tagged, set_tagged, write_generation
+from properties.models import Property
+from services.category_tree_service import CategoryTreeService
+
+
+class FacetService:
+    """
+    Facet Service - Sidebar counts for a filtered property set
+    Every facet is a conditional COUNT in one aggregate query; category
+    counts are rolled up to parents in memory using the cached tree
+    """
+    
+    # Query parameters that do not change the result set
+    IGNORED_PARAMS = {'page', 'page_size', 'ordering', 'cursor', 'pagination', 'format'}
+    BEDROOM_VALUES = range(0, 6)     # last value is "5+"
+    BATHROOM_VALUES = range(0, 5)    # last value is "4+"
+    
+    @staticmethod
+    def cache_key(query_params, is_staff=False):
+        """Normalized key: sorted params with repeated values sorted too"""
+        normalized = '&'.join(
+            f"{name}={','.join(sorted(query_params.getlist(name)))}"
+            for name in sorted(query_params)
+            if name not in FacetService.IGNORED_PARAMS and any(query_params.getlist(name))
+        )
+        digest = hashlib.md5(f"{is_staff}|{normalized}".encode()).hexdigest()
+        return 'facets_{tree}_{digest}'.format(
+            tree=CategoryTreeService.get_version(),
+            digest=digest,
+        )
+    
+    @staticmethod
+    def _bucket_filters(field, values):
+        *exact, last = values
+        filters = {f'{field}_{value}': Q(**{field: value}) for value in exact}
+        filters[f'{field}_{last}_plus'] = Q(**{f'{field}__gte': last})
+        return filters
+    
+    @staticmethod
+    def compute(queryset):
+        """
+        All facet counts for the queryset in a single aggregate query
+        
+        Returns:
+            dict: total plus category, bedrooms, bathrooms, status and price facets
+        """
+        nodes = CategoryTreeService.get_nodes()
+        price_edges = settings.FACET_PRICE_BUCKETS
+        
+        filters = {f'category_{category_id}': Q(category_id=category_id) for category_id in nodes}
+        filters.update(FacetService._bucket_filters('bedrooms', FacetService.BEDROOM_VALUES))
+        filters.update(FacetService._bucket_filters('bathrooms', FacetService.BATHROOM_VALUES))
+        filters.update({
+            f'status_{value}': Q(status=value) for value, _ in Property.STATUS_CHOICES
+        })
+        for index, low in enumerate(price_edges):
+            condition = Q(price__gte=low)
+            if index + 1 < len(price_edges):
+                condition &= Q(price__lt=price_edges[index + 1])
+            filters[f'price_{index}'] = condition
+        
+        aggregates = {name: Count('pk', filter=condition) for name, condition in filters.items()}
+        counts = queryset.order_by().aggregate(total=Count('pk'), **aggregates)
+        
+        def subtree_count(node):
+            return counts[f"category_{node['id']}"] + sum(
+                subtree_count(child) for child in node['children']
+            )
+        
+        def bucket_facet(field, values):
+            *exact, last = values
+            facet = [{'value': str(value), 'count': counts[f'{field}_{value}']} for value in exact]
+            facet.append({'value': f'{last}+', 'count': counts[f'{field}_{last}_plus']})
+            return facet
+        
+        return {
+            'total': counts['total'],
+            'category': [
+                {
+                    'id': node['id'],
+                    'name': node['name'],
+                    'slug': node['slug'],
+                    'parent': node['parent'],
+                    'count': subtree_count(node),
+                }
+                for node in nodes.values()
+            ],
+            'bedrooms': bucket_facet('bedrooms', FacetService.BEDROOM_VALUES),
+            'bathrooms': bucket_facet('bathrooms', FacetService.BATHROOM_VALUES),
+            'status': [
+                {'value': value, 'count': counts[f'status_{value}']}
+                for value, _ in Property.STATUS_CHOICES
+            ],
+            'price': [
+                {
+                    'min': low,
+                    'max': price_edges[index + 1] if index + 1 < len(price_edges) else None,
+                    'count': counts[f'price_{index}'],
+                }
+                for index, low in enumerate(price_edges)
+            ],
+        }
+    
+    @staticmethod
+    def get_facets(queryset, query_params, is_staff=False):
+        """
+        Facets for a filtered queryset, cached per normalized filter key
+        Entries carry the property-list tag, so any property write drops them
+        """
+        cache_key = FacetService.cache_key(query_params, is_staff)
+        facets = get_tagged(cache_key, name='facets')
+        if facets is None:
+            since = write_generation()
+            with fill_reads():
+                facets = FacetService.compute(queryset)
+            set_tagged(cache_key, facets, [PROPERTY_LIST_TAG], since, settings.CACHE_TTL)
+        return facets
@@ -0,0 +1,136 @@
+import math
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import Sqrt
+from core.geo import BASE32, GEOHASH_PRECISION, KM_PER_DEGREE, cell_size, encode_geohash
+
+
+class GeoService:
+    """
+    Geo Service - Radius and bounding-box search without PostGIS
+
+    Every property stores a geohash of its coordinates in an indexed column.
+    A box is covered by at most MAX_CELLS geohash cells of the finest
+    precision that fits, each run of adjacent cells becomes one index range
+    scan, and the exact
+    latitude/longitude (and distance) conditions run only on those rows.
+    Works on plain PostgreSQL and SQLite.
+    """
+
+    MAX_CELLS = 16
+    # Coarser covers match so many rows that walking the list ordering index
+    # and stopping at the page is cheaper, so they fall back to the range filter
+    MIN_PRECISION = 5
+    MAX_RADIUS_KM = 500
+
+    @staticmethod
+    def covering_cells(south, west, north, east):
+        """
+        Geohash prefixes whose cells together cover the box
+
+        Returns:
+            list: sorted prefixes; empty when no cover of MIN_PRECISION fits
+        """
+        for precision in range(GEOHASH_PRECISION, GeoService.MIN_PRECISION - 1, -1):
+            if GeoService.cell_count(south, west, north, east, precision) <= GeoService.MAX_CELLS:
+                return GeoService.cells_in_box(south, west, north, east, precision)
+        return []
+
+    @staticmethod
+    def cell_count(south, west, north, east, precision):
+        """Number of cells of this precision that intersect the box"""
+        height, width = cell_size(precision)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        columns = math.floor(east / width) - math.floor(west / width) + 1
+        return rows * columns
+
+    @staticmethod
+    def cells_in_box(south, west, north, east, precision):
+        """Sorted geohash cells of one precision that intersect the box"""
+        height, width = cell_size(precision)
+        cells = set()
+        lat = math.floor(south / height) * height
+        while lat <= north:
+            lng = math.floor(west / width) * width
+            while lng <= east:
+                cells.add(encode_geohash(
+                    min(max(lat + height / 2, -90.0), 90.0),
+                    min(max(lng + width / 2, -180.0), 180.0),
+                    precision,
+                ))
+                lng += width
+            lat += height
+        return sorted(cells)
+
+    @staticmethod
+    def covering_ranges(south, west, north, east):
+        """
+        Half-open geohash ranges [start, stop) covering the box
+        Cells that are consecutive in geohash order share one range
+        """
+        ranges = []
+        for cell in GeoService.covering_cells(south, west, north, east):
+            if ranges and ranges[-1][2] == cell:
+                start, _, _ = ranges.pop()
+            else:
+                start = cell
+            ranges.append((start, cell, GeoService._next_cell(cell)))
+        # Prefix match as a plain range: '~' sorts after every base32 character
+        # under the column's bytewise (C) collation, see migration 0015
+        return [(start, last + '~') for start, last, _ in ranges]
+
+    @staticmethod
+    def _next_cell(cell):
+        position = BASE32.index(cell[-1])
+        if position + 1 == len(BASE32):
+            return None
+        return cell[:-1] + BASE32[position + 1]
+
+    @staticmethod
+    def _cell_filter(south, west, north, east):
+        condition = Q()
+        for start, stop in GeoService.covering_ranges(south, west, north, east):
+            condition |= Q(geohash__gte=start, geohash__lt=stop)
+        return condition
+
+    @staticmethod
+    def within_bbox(queryset, south, west, north, east):
+        """Properties inside a latitude/longitude box (no antimeridian wrap)"""
+        south, north = max(min(south, north), -90.0), min(max(south, north), 90.0)
+        west, east = max(min(west, east), -180.0), min(max(west, east), 180.0)
+        return queryset.filter(
+            GeoService._cell_filter(south, west, north, east),
+            latitude__range=(south, north),
+            longitude__range=(west, east),
+        )
+
+    @staticmethod
+    def distance_expression(latitude, longitude):
+        """
+        Distance in km from a point, as a SQL expression
+        Equirectangular approximation (within 0.5% below MAX_RADIUS_KM); the
+        cosine is a constant, so only arithmetic and SQRT run per row
+        """
+        lng_scale = math.cos(math.radians(latitude))
+        dy = F('latitude') - Value(latitude)
+        dx = (F('longitude') - Value(longitude)) * Value(lng_scale)
+        return ExpressionWrapper(
+            Sqrt(dx * dx + dy * dy) * Value(KM_PER_DEGREE), output_field=FloatField()
+        )
+
+    @staticmethod
+    def within_radius(queryset, latitude, longitude, radius_km):
+        """
+        Properties within radius_km of a point, annotated with `distance` (km)
+        and ordered nearest first
+        """
+        radius_km = min(radius_km, GeoService.MAX_RADIUS_KM)
+        lat_delta = radius_km / KM_PER_DEGREE
+        lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+        queryset = GeoService.within_bbox(
+            queryset,
+            latitude - lat_delta, longitude - lng_delta,
+            latitude + lat_delta, longitude + lng_delta,
+        )
+        return queryset.annotate(
+            distance=GeoService.distance_expression(latitude, longitude)
+        ).filter(distance__lte=radius_km).order_by('distance', '-created_at')
@@ -0,0 +1,178 @@
+import io
+import os
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+import numpy as np
+from PIL import Image, ImageOps
+from core.blurhash import encode_blurhash
+from core.cache import PROPERTY_LIST_TAG, invalidate_tags, property_tag
+from properties.models import CatalogChange, Property
+from services.change_feed_service import ChangeFeedService
+
+
+class ImageService:
+    """
+    Image Service - Resized, metadata-free variants of property photos
+
+    The uploaded original is stored untouched and never served; a
+    background task decodes it once and writes a WebP and a JPEG per entry of VARIANT_WIDTHS (never
+    upscaled, EXIF/GPS and ICC data dropped). Property.image_variants records
+    their paths and dimensions, so serializers pick a URL without touching storage.
+    The same decode also yields the original's dimensions, a dominant colour
+    and a BlurHash placeholder that list payloads carry inline.
+    """
+
+    # name -> target width in pixels, smallest first
+    VARIANT_WIDTHS = {'small': 320, 'medium': 640, 'large': 1280}
+    ENCODERS = {
+        'webp': ('WEBP', {'quality': 80, 'method': 4}),
+        'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    }
+    # Placeholders are computed on a thumbnail this size; 4x3 BlurHash components
+    PLACEHOLDER_SIZE = 32
+    PLACEHOLDER_COMPONENTS = (4, 3)
+    # EXIF orientations that turn the photo a quarter: width and height swap
+    ORIENTATION_TAG = 0x0112
+    QUARTER_TURNS = {5, 6, 7, 8}
+
+    @staticmethod
+    def decode(stream):
+        """
+        Open an image upright (EXIF orientation applied) in RGB or RGBA
+
+        Returns:
+            tuple: (image, (width, height)); a large JPEG is decoded at a
+            reduced scale, the size is always the upright original's
+        """
+        with Image.open(stream) as source:
+            width, height = source.size
+            if source.getexif().get(ImageService.ORIENTATION_TAG) in ImageService.QUARTER_TURNS:
+                width, height = height, width
+            largest = max(ImageService.VARIANT_WIDTHS.values())
+            # JPEG can decode at 1/2, 1/4 or 1/8 scale: far cheaper for camera originals
+            source.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(source)
+            image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.mode else 'RGB')
+        return image, (width, height)
+
+    @staticmethod
+    def build_variants(image):
+        """
+        Encode every variant of a decoded image
+
+        Returns:
+            dict: {name: {'width', 'height', 'files': {extension: bytes}}}
+        """
+        variants, encoded = {}, {}
+        for name, width in ImageService.VARIANT_WIDTHS.items():
+            width = min(width, image.width)
+            if width not in encoded:
+                height = max(1, round(image.height * width / image.width))
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                files = {}
+                for extension, (fmt, options) in ImageService.ENCODERS.items():
+                    frame = resized.convert('RGB') if fmt == 'JPEG' and resized.mode != 'RGB' else resized
+                    buffer = io.BytesIO()
+                    # No exif / icc_profile arguments: the metadata is not carried over
+                    frame.save(buffer, fmt, **options)
+                    files[extension] = buffer.getvalue()
+                encoded[width] = {'width': width, 'height': height, 'files': files}
+            variants[name] = encoded[width]
+        return variants
+
+    @staticmethod
+    def placeholder(image):
+        """
+        Dominant colour ('#rrggbb') and BlurHash of a decoded image,
+        both computed on a PLACEHOLDER_SIZE thumbnail
+
+        Returns:
+            tuple: (color, blurhash)
+        """
+        thumbnail = image.convert('RGB')
+        thumbnail.thumbnail((ImageService.PLACEHOLDER_SIZE, ImageService.PLACEHOLDER_SIZE), Image.BILINEAR)
+        # Most frequent colour of a small median-cut palette: the average of a
+        # photo is usually a muddy colour that appears nowhere in it
+        palette = thumbnail.quantize(colors=8, method=Image.Quantize.MEDIANCUT)
+        _, index = max(palette.getcolors())
+        red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+        x_components, y_components = ImageService.PLACEHOLDER_COMPONENTS
+        blurhash = encode_blurhash(np.asarray(thumbnail), x_components, y_components)
+        return f'#{red:02x}{green:02x}{blue:02x}', blurhash
+
+    @staticmethod
+    def process(property_id, image_name=None):
+        """
+        Derive and record the variants of a property's current image
+        Does nothing when the image was replaced after the task was queued
+        (the newer upload has its own task); clears them when it was removed
+
+        Returns:
+            dict or None: the recorded variants
+        """
+        prop = Property.objects.filter(pk=property_id).only('id', 'image', 'image_variants').first()
+        if prop is None or (image_name is not None and (prop.image.name or '') != image_name):
+            return None
+
+        variants = {}
+        fields = {'image_width': None, 'image_height': None, 'image_color': '', 'image_placeholder': ''}
+        if prop.image:
+            with prop.image.open('rb') as handle:
+                image, (fields['image_width'], fields['image_height']) = ImageService.decode(handle)
+            fields['image_color'], fields['image_placeholder'] = ImageService.placeholder(image)
+            built = ImageService.build_variants(image)
+            stem = os.path.splitext(os.path.basename(prop.image.name))[0]
+            saved = {}
+            for name, variant in built.items():
+                entry = {'width': variant['width'], 'height': variant['height']}
+                for extension, data in variant['files'].items():
+                    # Narrow originals map several names onto one width
+                    key = (variant['width'], extension)
+                    if key not in saved:
+                        saved[key] = default_storage.save(
+                            f'properties/variants/{prop.pk}/{stem}-{name}.{extension}', ContentFile(data)
+                        )
+                    entry[extension] = saved[key]
+                variants[name] = entry
+
+        # Conditional on the image, so a concurrent re-upload is never overwritten
+        current = Property.objects.filter(pk=prop.pk)
+        if prop.image:
+            current = current.filter(image=prop.image.name)
+        else:
+            current = current.filter(Q(image='') | Q(image__isnull=True))
+        updated = current.update(image_variants=variants, updated_at=timezone.now(), **fields)
+        ImageService.delete_files(prop.image_variants if updated else variants)
+        if not updated:
+            return None
+        ChangeFeedService.record(CatalogChange.KIND_PROPERTY, [prop.pk])
+        invalidate_tags([property_tag(prop.pk), PROPERTY_LIST_TAG])
+        return variants
+
+    @staticmethod
+    def delete_files(variants):
+        for path in {path for variant in (variants or {}).values() for path in ImageService.paths(variant)}:
+            default_storage.delete(path)
+
+    @staticmethod
+    def paths(variant):
+        return [variant[extension] for extension in ImageService.ENCODERS if variant.get(extension)]
+
+    @staticmethod
+    def pick(variants, width, extension='webp'):
+        """
+        Path of the smallest variant at least `width` pixels wide
+        (the largest one when none is), or None when there are no variants
+        """
+        candidates = sorted(
+            (variant for variant in (variants or {}).values() if variant.get(extension)),
+            key=lambda variant: variant['width'],
+        )
+        for variant in candidates:
+            if variant['width'] >= width:
+                return variant[extension]
+        return candidates[-1][extension] if candidates else None
@@ -0,0 +1,241 @@
+import csv
+import json
+import time
+from itertools import islice
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework import serializers
+from core.cache import PROPERTY_LIST_TAG, invalidate_tags, property_tag
+from core.utils import allocate_unique_slugs, update_rows
+from properties.models import CatalogChange, Property
+from properties.serializers import PropertyImportRowSerializer
+from properties.tasks import queue_recommendation_refresh
+from services.amenity_service import AmenityService
+from services.category_tree_service import CategoryTreeService
+from services.change_feed_service import ChangeFeedService
+from services.cluster_service import ClusterService
+
+
+class ImportService:
+    """
+    Import Service - Streaming bulk import of listing feeds
+
+    Rows are read lazily from CSV or JSONL, validated a chunk at a time,
+    and written with bulk_create / bulk_update in one transaction per chunk.
+    bulk writes skip save() and signals, so everything those maintain
+    (slug, geohash, amenity index, map clusters, caches, recommendations)
+    is done here per chunk or once at the end.
+    """
+
+    FORMATS = ('csv', 'jsonl')
+    # Columns written on update (the slug of an existing listing never changes)
+    UPDATE_FIELDS = [
+        'name', 'description', 'location', 'price', 'bedrooms', 'bathrooms', 'square_feet',
+        'amenities', 'status', 'category', 'featured', 'latitude', 'longitude', 'geohash', 'updated_at',
+    ]
+    MAX_REPORTED_ERRORS = 100
+
+    # ---- reading ----
+
+    @staticmethod
+    def detect_format(filename, default='csv'):
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if extension in ('jsonl', 'ndjson'):
+            return 'jsonl'
+        return 'csv' if extension == 'csv' else default
+
+    @staticmethod
+    def read_rows(stream, fmt):
+        """
+        Yield (row_number, dict) from a text stream without loading it whole
+        Blank CSV cells count as missing values
+        """
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(stream), start=1):
+                yield number, {key: value for key, value in row.items() if key and value not in ('', None)}
+        elif fmt == 'jsonl':
+            for number, line in enumerate(stream, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = {'__error__': f'Invalid JSON: {e}'}
+                yield number, row if isinstance(row, dict) else {'__error__': 'Expected a JSON object'}
+        else:
+            raise ValueError(f'Unknown import format: {fmt}')
+
+    # ---- validating ----
+
+    @staticmethod
+    def category_map():
+        """Category id, slug and lower-cased name -> id, from the cached tree"""
+        mapping = {}
+        for category_id, node in CategoryTreeService.get_nodes().items():
+            mapping[str(category_id)] = category_id
+            mapping[node['slug']] = category_id
+            mapping[node['name'].casefold()] = category_id
+        return mapping
+
+    @staticmethod
+    def validate(chunk, validator, categories):
+        """
+        Returns:
+            tuple: ([(row_number, cleaned)], [(row_number, errors)])
+        """
+        valid, invalid = [], []
+        for number, row in chunk:
+            if '__error__' in row:
+                invalid.append((number, {'row': [row['__error__']]}))
+                continue
+            try:
+                # One serializer instance for the whole import: run_validation()
+                # skips re-copying the declared fields for every row
+                cleaned = validator.run_validation(row)
+            except serializers.ValidationError as e:
+                invalid.append((number, e.detail))
+                continue
+            category = cleaned['category']
+            category_id = categories.get(category) or categories.get(category.casefold())
+            if category_id is None:
+                invalid.append((number, {'category': [f'Unknown category: {category}']}))
+                continue
+            cleaned['category_id'] = category_id
+            del cleaned['category']
+            valid.append((number, cleaned))
+        return valid, invalid
+
+    # ---- writing ----
+
+    @staticmethod
+    def _fill(instance, cleaned, now):
+        for field, value in cleaned.items():
+            if field != 'external_id':
+                setattr(instance, field, value)
+        instance.geohash = instance.compute_geohash()
+        instance.updated_at = now
+
+    @staticmethod
+    def write_chunk(rows, upsert, batch_size):
+        """
+        Insert (and with upsert, update by external_id) one validated chunk
+
+        Returns:
+            dict: created / updated instances and rows rejected as duplicates
+        """
+        # Within one chunk the last row for an external id wins
+        by_external_id = {}
+        plain = []
+        for number, cleaned in rows:
+            if cleaned.get('external_id'):
+                by_external_id[cleaned['external_id']] = (number, cleaned)
+            else:
+                plain.append((number, cleaned))
+
+        existing = Property.objects.filter(
+            external_id__in=list(by_external_id)
+        ).defer('search_vector').in_bulk(field_name='external_id') if by_external_id else {}
+
+        now = timezone.now()
+        to_create, to_update, rejected, cluster_changes = [], [], [], []
+        for number, cleaned in list(by_external_id.values()) + plain:
+            instance = existing.get(cleaned.get('external_id'))
+            if instance is not None:
+                if not upsert:
+                    rejected.append((number, {'external_id': ['A property with this external_id already exists']}))
+                    continue
+                old_state, old_amenities = instance.cluster_state(), instance.amenities
+                ImportService._fill(instance, cleaned, now)
+                instance._amenities_changed = old_amenities != instance.amenities
+                cluster_changes.append((old_state, instance.cluster_state()))
+                to_update.append(instance)
+            else:
+                instance = Property(external_id=cleaned.get('external_id'))
+                ImportService._fill(instance, cleaned, now)
+                cluster_changes.append((None, instance.cluster_state()))
+                to_create.append(instance)
+
+        slugs = allocate_unique_slugs(
+            Property.objects.all(), [slugify(instance.name) for instance in to_create], max_length=280
+        )
+        for instance, slug in zip(to_create, slugs):
+            instance.slug = slug
+
+        Property.objects.bulk_create(to_create, batch_size=batch_size)
+        update_rows(to_update, ImportService.UPDATE_FIELDS)
+        AmenityService.sync(
+            [instance for instance in to_create if instance.amenities]
+            + [instance for instance in to_update if instance._amenities_changed]
+        )
+        ClusterService.apply_changes(cluster_changes)
+        ChangeFeedService.record(CatalogChange.KIND_PROPERTY, [instance.pk for instance in to_create + to_update])
+        return {'created': to_create, 'updated': to_update, 'rejected': rejected}
+
+    @staticmethod
+    def _after_import(property_ids, updated_ids, category_ids):
+        """What post_save would have done: drop caches, refresh recommendations"""
+        invalidate_tags([PROPERTY_LIST_TAG] + [property_tag(pk) for pk in updated_ids])
+        queue_recommendation_refresh(property_ids, category_ids)
+
+    @staticmethod
+    def run(rows, batch_size=1000, upsert=False, progress=None):
+        """
+        Import an iterable of (row_number, dict) rows
+
+        Args:
+            batch_size: rows validated and written per transaction
+            upsert: update listings whose external_id already exists instead of rejecting them
+            progress: optional callable receiving the running summary after each chunk
+
+        Returns:
+            dict: processed, created, updated, failed, errors (first MAX_REPORTED_ERRORS),
+                  elapsed seconds and rows per second
+        """
+        started = time.perf_counter()
+        summary = {'processed': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+        validator = PropertyImportRowSerializer()
+        categories = ImportService.category_map()
+        property_ids, updated_ids, category_ids = [], [], set()
+
+        def fail(failures):
+            summary['failed'] += len(failures)
+            room = ImportService.MAX_REPORTED_ERRORS - len(summary['errors'])
+            summary['errors'].extend({'row': number, 'errors': errors} for number, errors in failures[:max(room, 0)])
+
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            valid, invalid = ImportService.validate(chunk, validator, categories)
+            fail(invalid)
+            try:
+                with transaction.atomic():
+                    written = ImportService.write_chunk(valid, upsert, batch_size)
+            except IntegrityError as e:
+                # e.g. a concurrent writer took an external_id or slug: the chunk is rolled back
+                fail([(number, {'row': [f'Chunk rolled back: {e}']}) for number, _ in valid])
+            else:
+                fail(written['rejected'])
+                summary['created'] += len(written['created'])
+                summary['updated'] += len(written['updated'])
+                for instance in written['created'] + written['updated']:
+                    property_ids.append(instance.pk)
+                    category_ids.add(instance.category_id)
+                    # A moved listing also leaves the scope of its old category
+                    category_ids.add(getattr(instance, '_loaded_category_id', None) or instance.category_id)
+                updated_ids.extend(instance.pk for instance in written['updated'])
+
+            summary['processed'] += len(chunk)
+            summary['elapsed'] = round(time.perf_counter() - started, 3)
+            summary['rows_per_second'] = round(summary['processed'] / max(summary['elapsed'], 1e-9))
+            if progress:
+                progress(summary)
+
+        if property_ids:
+            transaction.on_commit(lambda: ImportService._after_import(property_ids, updated_ids, category_ids))
+        summary.setdefault('elapsed', round(time.perf_counter() - started, 3))
+        summary.setdefault('rows_per_second', 0)
+        return summary
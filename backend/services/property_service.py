@@ -1,91 +1,52 @@
-from django.core.cache import cache
-from properties.models import Category, Property
+from properties.models import CategoryClosure, Property
 
 
 class PropertyService:
     """
     Property Service - Business logic for properties
-    Implements DFS algorithm for category recommendations
+    Resolves category subtrees through the materialized closure table
     """
     
     @staticmethod
     def get_properties_by_category(category_id):
         """
         Get all properties in a category including subcategories
-        Uses DFS to traverse category tree
+        Joins through the category closure table, so the whole subtree
+        is resolved inside a single indexed query
         """
-        # Get category tree using DFS
-        category_ids = PropertyService._dfs_get_all_category_ids(category_id)
-        
-        # Get all properties in these categories
-        properties = Property.objects.filter(
-            category_id__in=category_ids,
+        return Property.objects.filter(
+            category__ancestor_links__ancestor_id=category_id,
             status='active'
         )
-        
-        return properties
     
     @staticmethod
     def get_recommended_properties(category_id):
         """
         Get recommended properties based on category
-        Uses cached category tree for performance
+        Featured and newest listings from the whole subtree come first
         """
-        # Check cache first
-        cache_key = f'category_tree_{category_id}'
-        cached_ids = cache.get(cache_key)
-        
-        if cached_ids:
-            print(f"✅ Cache HIT for category {category_id}")
-            category_ids = cached_ids
-        else:
-            print(f"❌ Cache MISS for category {category_id}")
-            # DFS traversal
-            category_ids = PropertyService._dfs_get_all_category_ids(category_id)
-            # Cache for 1 hour
-            cache.set(cache_key, category_ids, 3600)
-        
-        # Get properties
-        properties = Property.objects.filter(
-            category_id__in=category_ids,
-            status='active'
+        return PropertyService.get_properties_by_category(
+            category_id
         ).order_by('-featured', '-created_at')
-        
-        return properties
     
     @staticmethod
-    def _dfs_get_all_category_ids(category_id, visited=None):
+    def get_subtree_category_ids(category_id):
         """
-        Depth-First Search to get all descendant categories
-        Algorithm: DFS traversal of category tree
+        Get the category and all of its descendants
+        Reads the materialized closure rows instead of walking the tree
         
-        Time Complexity: O(n) where n is number of categories
-        Space Complexity: O(h) where h is height of tree
+        Time Complexity: O(k) where k is the size of the subtree (one query)
         """
-        if visited is None:
-            visited = set()
-        
-        # Avoid infinite loops
-        if category_id in visited:
-            return []
-        
-        visited.add(category_id)
-        result = [category_id]
-        
-        # Get all children
-        try:
-            category = Category.objects.get(id=category_id)
-            children = category.children.all()
-            
-            # Recursively traverse children
-            for child in children:
-                result.extend(
-                    PropertyService._dfs_get_all_category_ids(child.id, visited)
-                )
-        except Category.DoesNotExist:
-            pass
-        
-        return result
+        return list(
+            CategoryClosure.objects.filter(
+                ancestor_id=category_id
+            ).order_by('depth').values_list('descendant_id', flat=True)
+        )
+    
+    @staticmethod
+    def _dfs_get_all_category_ids(category_id, visited=None):
+        """Backwards-compatible alias for get_subtree_category_ids"""
+        return PropertyService.get_subtree_category_ids(category_id)
     
     @staticmethod
     def check_availability(property_id, booking_date):
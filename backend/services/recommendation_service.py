@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Q, Value, When
+from django.db.models.functions import Abs
+from core.cache import invalidate_tags, recommendations_tag
+from properties.models import CategoryClosure, Property, PropertyRecommendation
+
+
+class RecommendationService:
+    """
+    Recommendation Service - Precomputed "similar properties" lists
+    
+    Ranking for a property P in category C:
+        1. same category as P
+        2. anywhere else in C's subtree
+        3. sibling subtrees (the rest of C's parent subtree)
+    ties broken by price proximity to P, then featured first
+    """
+    
+    @staticmethod
+    def compute(property_obj, limit=None):
+        """
+        Rank candidates for one property in a single query
+        
+        Returns:
+            list: ranked property ids
+        """
+        limit = limit or settings.RECOMMENDATION_LIMIT
+        category = property_obj.category
+        scope_root_id = category.parent_id or category.id
+        own_subtree = CategoryClosure.objects.filter(
+            ancestor_id=category.id
+        ).values('descendant_id')
+        
+        return list(
+            Property.objects.filter(
+                status='active',
+                category__ancestor_links__ancestor_id=scope_root_id,
+            ).exclude(
+                pk=property_obj.pk
+            ).annotate(
+                tier=Case(
+                    When(category_id=category.id, then=0),
+                    When(category_id__in=own_subtree, then=1),
+                    default=2,
+                    output_field=IntegerField(),
+                ),
+                price_gap=Abs(
+                    F('price') - Value(property_obj.price, output_field=DecimalField(max_digits=12, decimal_places=2))
+                ),
+            ).order_by(
+                'tier', 'price_gap', '-featured', 'id'
+            ).values_list('id', flat=True)[:limit]
+        )
+    
+    @staticmethod
+    def refresh(property_ids, invalidate=True):
+        """
+        Recompute and store entries for the given properties
+        Inactive or missing properties have their entries removed
+        invalidate=False for entries built on first access: no cached
+        response was computed from them, and a bump would keep the response
+        being computed from reaching the cache
+        """
+        properties = Property.objects.filter(
+            pk__in=property_ids, status='active'
+        ).select_related('category')
+        
+        rows = [
+            PropertyRecommendation(
+                property_id=property_obj.pk,
+                recommended_ids=RecommendationService.compute(property_obj),
+            )
+            for property_obj in properties
+        ]
+        active_ids = [row.property_id for row in rows]
+        
+        with transaction.atomic():
+            PropertyRecommendation.objects.filter(
+                property_id__in=property_ids
+            ).exclude(property_id__in=active_ids).delete()
+            PropertyRecommendation.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['property'],
+                update_fields=['recommended_ids', 'computed_at'],
+            )
+        
+        # Cached recommendation responses for these properties are now stale
+        if invalidate:
+            invalidate_tags([recommendations_tag(property_id) for property_id in property_ids])
+        return len(rows)
+    
+    @staticmethod
+    def rebuild_all(batch_size=500):
+        """Recompute every entry (initial build or periodic full refresh)"""
+        ids = list(Property.objects.filter(status='active').values_list('id', flat=True))
+        for start in range(0, len(ids), batch_size):
+            RecommendationService.refresh(ids[start:start + batch_size])
+        PropertyRecommendation.objects.exclude(property__status='active').delete()
+        return len(ids)
+    
+    @staticmethod
+    def affected_property_ids(category_ids):
+        """
+        Properties whose candidate scope contains any of the given categories
+        
+        The scope of a property in category Q is the subtree of Q's parent
+        (or of Q itself for a root), so it covers C exactly when Q's parent,
+        or a root Q, is an ancestor-or-self of C
+        """
+        ancestors = CategoryClosure.objects.filter(
+            descendant_id__in=[c for c in category_ids if c]
+        ).values('ancestor_id')
+        
+        return list(
+            Property.objects.filter(status='active').filter(
+                Q(category__parent_id__in=ancestors) |
+                Q(category_id__in=ancestors, category__parent__isnull=True)
+            ).values_list('id', flat=True)
+        )
+    
+    @staticmethod
+    def get_recommendations(property_obj):
+        """
+        Recommended properties for the endpoint
+        One primary-key lookup plus one batched fetch; entries that have not
+        been built yet are computed and stored on first access
+        """
+        entry = PropertyRecommendation.objects.filter(pk=property_obj.pk).first()
+        if entry is None:
+            RecommendationService.refresh([property_obj.pk], invalidate=False)
+            entry = PropertyRecommendation.objects.filter(pk=property_obj.pk).first()
+        ranked_ids = entry.recommended_ids if entry else []
+        
+        properties = Property.objects.filter(
+            pk__in=ranked_ids, status='active'
+        ).select_related('category').in_bulk()
+        return [properties[pk] for pk in ranked_ids if pk in properties]
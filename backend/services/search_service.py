@@ -0,0 +1,155 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Max, Count, When
+from properties.models import Property
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'to', 'with',
+})
+
+
+def tokenize(text):
+    """Lowercase word tokens without stop words"""
+    return [token for token in TOKEN_RE.findall((text or '').lower()) if token not in STOP_WORDS]
+
+
+class InvertedIndex:
+    """
+    In-process inverted index over property name, location and description
+    Fallback for databases without tsvector support (SQLite test runs)
+
+    Field weights mirror the PostgreSQL setweight() labels: name A, location B, description C
+    """
+
+    FIELD_WEIGHTS = (('name', 1.0), ('location', 0.4), ('description', 0.2))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = defaultdict(dict)   # token -> {property_id: weighted term frequency}
+        self.fingerprint = None
+
+    def build(self, rows):
+        postings = defaultdict(dict)
+        for row in rows:
+            scores = Counter()
+            for field, weight in self.FIELD_WEIGHTS:
+                for token in tokenize(row[field]):
+                    scores[token] += weight
+            for token, score in scores.items():
+                postings[token][row['id']] = score
+        self.postings = postings
+
+    def sync(self):
+        """Rebuild when the table fingerprint (row count, latest update) moved"""
+        fingerprint = Property.objects.order_by().aggregate(
+            total=Count('id'), latest=Max('updated_at')
+        )
+        fingerprint = (fingerprint['total'], fingerprint['latest'])
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                self.build(
+                    Property.objects.order_by().values('id', 'name', 'location', 'description').iterator()
+                )
+                self.fingerprint = fingerprint
+
+    def search(self, term, limit=None):
+        """
+        Ranked ids of properties containing every query token
+
+        Returns:
+            list: property ids, best match first
+        """
+        tokens = tokenize(term)
+        if not tokens:
+            return []
+        self.sync()
+
+        postings = [self.postings.get(token, {}) for token in tokens]
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches &= posting.keys()
+
+        total = max(self.fingerprint[0], 1)
+        scores = {}
+        for pk in matches:
+            scores[pk] = sum(
+                posting[pk] * math.log(1 + total / len(posting)) for posting in postings
+            )
+        if limit is not None:
+            return heapq.nsmallest(limit, scores, key=lambda pk: (-scores[pk], pk))
+        return sorted(scores, key=lambda pk: (-scores[pk], pk))
+
+
+inverted_index = InvertedIndex()
+
+
+class SearchService:
+    """
+    Search Service - Ranked full-text search over properties
+    PostgreSQL: websearch query against the GIN-indexed search_vector column
+    Other databases: the in-process InvertedIndex
+    """
+
+    CONFIG = 'english'
+    # The fallback pushes ranked ids into SQL, so only the best matches are kept
+    FALLBACK_MAX_RESULTS = 200
+    # Ranked ids checked against the queryset's filters per query
+    FALLBACK_CHUNK_SIZE = 500
+
+    @staticmethod
+    def search(queryset, term, rank=True):
+        """
+        Filter a property queryset to matches of `term`, best match first
+        rank=False keeps the queryset's own ordering (e.g. nearest first)
+        """
+        term = (term or '').strip()
+        if not term:
+            return queryset
+
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(term, search_type='websearch', config=SearchService.CONFIG)
+            queryset = queryset.filter(search_vector=query)
+            if not rank:
+                return queryset
+            return queryset.annotate(
+                search_rank=SearchRank(F('search_vector'), query)
+            ).order_by('-search_rank', '-created_at')
+
+        ranked_ids = SearchService.best_matches(queryset, inverted_index.search(term))
+        if not ranked_ids:
+            return queryset.none()
+        queryset = queryset.filter(pk__in=ranked_ids)
+        if not rank:
+            return queryset
+        return queryset.annotate(
+            search_position=Case(
+                *[When(pk=pk, then=position) for position, pk in enumerate(ranked_ids)],
+                output_field=IntegerField(),
+            )
+        ).order_by('search_position')
+
+    @staticmethod
+    def best_matches(queryset, ranked_ids):
+        """
+        The first FALLBACK_MAX_RESULTS ranked ids that pass the queryset's
+        filters, checked a chunk at a time, so inactive or filtered-out
+        matches never take the place of valid ones
+        """
+        kept = []
+        size = SearchService.FALLBACK_CHUNK_SIZE
+        for start in range(0, len(ranked_ids), size):
+            chunk = ranked_ids[start:start + size]
+            allowed = set(queryset.filter(pk__in=chunk).order_by().values_list('pk', flat=True))
+            kept += [pk for pk in chunk if pk in allowed]
+            if len(kept) >= SearchService.FALLBACK_MAX_RESULTS:
+                break
+        return kept[:SearchService.FALLBACK_MAX_RESULTS]
@@ -1,11 +1,38 @@
 # backend/services/tests.py (তোমার existing file এ add করো)
 
+from unittest import mock, skipUnless
 from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
-from properties.models import Property, Category
+from properties.testing import create_property
+from properties.models import CatalogChange, Property, Category, PropertyAmenity, PropertyCluster, PropertyRecommendation
 from services.property_service import PropertyService
+from services.recommendation_service import RecommendationService
+from services.comparables_service import ComparablesIndex, comparables_index
+from services.cluster_service import ClusterService
+from services.geo_service import GeoService
+from services.import_service import ImportService
+from services.image_service import ImageService
+from services.bulk_update_service import BulkUpdateService
+from services.change_feed_service import ChangeFeedService
+from services.view_counter_service import ViewCounterService, local_view_store
+from core.geo import cell_size, encode_geohash
+from core.utils import allocate_unique_slugs
+from django.urls import reverse
+from rest_framework.test import APIClient
 from datetime import date, timedelta
+from decimal import Decimal
+import io
 import threading
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.cache import local_cache
+from PIL import Image
+import shutil
+import tempfile
 
 User = get_user_model()
 
@@ -52,4 +79,701 @@ class AvailabilityTestCase(TransactionTestCase):
             self.property.id,
             self.visit_date
         )
-        self.assertFalse(is_available)
\ No newline at end of file
+        self.assertFalse(is_available)
+
+
+class RecommendationServiceTestCase(TestCase):
+    """Test the precomputed recommendation table"""
+    
+    def setUp(self):
+        self.residential = Category.objects.create(name='Residential')
+        self.apartments = Category.objects.create(name='Apartments', parent=self.residential)
+        self.penthouses = Category.objects.create(name='Penthouses', parent=self.apartments)
+        self.villas = Category.objects.create(name='Villas', parent=self.residential)
+        self.commercial = Category.objects.create(name='Commercial')
+        
+        self.target = create_property('Target', self.apartments, price=1000000)
+        self.same_far = create_property('Same Far', self.apartments, price=5000000)
+        self.same_near = create_property('Same Near', self.apartments, price=1100000)
+        self.subtree = create_property('Subtree', self.penthouses, price=1000000)
+        self.sibling = create_property('Sibling', self.villas, price=1000000)
+        self.unrelated = create_property('Unrelated', self.commercial, price=1000000)
+    
+    def test_ranking_covers_subtree_and_siblings(self):
+        """Test same category first, then subtree, then siblings by price gap"""
+        ranked = RecommendationService.compute(self.target)
+        self.assertEqual(
+            ranked,
+            [self.same_near.id, self.same_far.id, self.subtree.id, self.sibling.id]
+        )
+    
+    def test_lookup_reads_precomputed_entry(self):
+        """Test the endpoint path is one lookup plus one batched fetch"""
+        RecommendationService.refresh([self.target.id])
+        with self.assertNumQueries(2):
+            names = [p.name for p in RecommendationService.get_recommendations(self.target)]
+        self.assertEqual(names, ['Same Near', 'Same Far', 'Subtree', 'Sibling'])
+    
+    def test_sold_property_refreshes_affected_entries(self):
+        """Test selling a property removes it from the entries that listed it"""
+        RecommendationService.rebuild_all()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sibling.status = 'sold'
+            self.sibling.save()
+        
+        entry = PropertyRecommendation.objects.get(pk=self.target.pk)
+        self.assertNotIn(self.sibling.id, entry.recommended_ids)
+        self.assertFalse(PropertyRecommendation.objects.filter(pk=self.sibling.pk).exists())
+    
+    def test_affected_ids_limited_to_scope(self):
+        """Test a change in Villas does not touch unrelated trees"""
+        affected = RecommendationService.affected_property_ids([self.villas.id])
+        self.assertIn(self.target.id, affected)
+        self.assertNotIn(self.unrelated.id, affected)
+
+
+class ComparablesServiceTestCase(TestCase):
+    """Test the k-NN comparables index"""
+    
+    def setUp(self):
+        self.villas = Category.objects.create(name='Villas')
+        self.offices = Category.objects.create(name='Offices')
+        self.target = create_property('Target', self.villas, price=1000000, bedrooms=4, bathrooms=3, square_feet=3000)
+        self.twin = create_property('Twin', self.villas, price=1050000, bedrooms=4, bathrooms=3, square_feet=3100)
+        self.office_twin = create_property('Office Twin', self.offices, price=1000000, bedrooms=4, bathrooms=3, square_feet=3000)
+        self.mansion = create_property('Mansion', self.villas, price=9000000, bedrooms=9, bathrooms=8, square_feet=12000)
+        self.index = ComparablesIndex()
+        self.index.sync(force=True)
+    
+    def features(self, prop):
+        return [(float(prop.price), prop.bedrooms, prop.bathrooms, prop.square_feet)]
+    
+    def test_nearest_prefers_same_category_and_features(self):
+        """Test neighbours rank by features with a category penalty"""
+        ranked = [pk for pk, _ in self.index.nearest(
+            self.features(self.target), self.villas.id, k=3, exclude_id=self.target.id
+        )]
+        self.assertEqual(ranked, [self.twin.id, self.office_twin.id, self.mansion.id])
+    
+    def test_batch_matches_single_queries(self):
+        """Test the batched matrix path agrees with single queries"""
+        batch = self.index.nearest_batch([self.target.id, self.twin.id], k=2)
+        for prop in (self.target, self.twin):
+            single = self.index.nearest(self.features(prop), prop.category_id, k=2, exclude_id=prop.id)
+            self.assertEqual([pk for pk, _ in batch[prop.id]], [pk for pk, _ in single])
+        # Chunks sized from the memory budget (here one query each) give the same answer
+        with mock.patch.object(self.index, 'BATCH_CHUNK_BYTES', 1):
+            self.assertEqual(self.index.nearest_batch([self.target.id, self.twin.id], k=2), batch)
+    
+    def test_incremental_sync_tracks_status_changes(self):
+        """Test sold listings drop out and new ones appear without a rebuild"""
+        self.twin.status = 'sold'
+        self.twin.save()
+        closer = create_property('Closer', self.villas, price=1000000, bedrooms=4, bathrooms=3, square_feet=3000)
+        self.index.sync(force=True)
+        
+        self.assertNotIn(self.twin.id, self.index.positions)
+        ranked = self.index.nearest(self.features(self.target), self.villas.id, k=1, exclude_id=self.target.id)
+        self.assertEqual(ranked[0][0], closer.id)
+    
+    def test_incremental_sync_sees_late_commits(self):
+        """Test a row stamped before the last sync but committed after it is still picked up"""
+        late = create_property('Late', self.villas, price=1000000, bedrooms=4, bathrooms=3, square_feet=3000)
+        Property.objects.filter(pk=late.pk).update(updated_at=self.index.synced_at - timedelta(seconds=30))
+        self.index.sync(force=True)
+        self.assertIn(late.id, self.index.positions)
+    
+    def test_comparables_endpoint(self):
+        """Test the endpoint returns neighbours with distances"""
+        comparables_index.sync(force=True)
+        response = APIClient().get(reverse('property-comparables', kwargs={'slug': self.target.slug}), {'k': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['id'], self.twin.id)
+        self.assertIn('distance', response.data[0])
+
+
+class GeoServiceTestCase(TestCase):
+    """Test geohash cells and radius / bounding-box search"""
+    
+    def setUp(self):
+        self.category = Category.objects.create(name='Geo')
+        # Gulshan, Banani (~2.2 km away), Dhanmondi (~6 km away), Chittagong (~215 km away)
+        self.gulshan = create_property('Gulshan Villa', self.category, latitude=23.7925, longitude=90.4078)
+        self.banani = create_property('Banani Flat', self.category, latitude=23.7937, longitude=90.4066 - 0.02)
+        self.dhanmondi = create_property('Dhanmondi House', self.category, latitude=23.7461, longitude=90.3742)
+        self.chittagong = create_property('Chittagong Villa', self.category, latitude=22.3569, longitude=91.7832)
+        create_property('No Coordinates', self.category)
+    
+    def test_geohash_encoding(self):
+        """Test the encoder matches the reference geohash"""
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(self.gulshan.geohash[:5], encode_geohash(23.7925, 90.4078, 5))
+    
+    def test_geohash_follows_coordinate_update(self):
+        """Test saving new coordinates with update_fields refreshes the geohash"""
+        self.gulshan.latitude, self.gulshan.longitude = 22.3569, 91.7832
+        self.gulshan.save(update_fields=['latitude', 'longitude'])
+        self.gulshan.refresh_from_db()
+        self.assertEqual(self.gulshan.geohash, self.chittagong.geohash)
+    
+    def test_covering_cells_bounded_and_cover_box(self):
+        """Test a box is covered by few cells that contain its corners"""
+        cells = GeoService.covering_cells(23.70, 90.35, 23.85, 90.45)
+        self.assertLessEqual(len(cells), GeoService.MAX_CELLS)
+        for lat, lng in [(23.70, 90.35), (23.85, 90.45), (23.70, 90.45), (23.85, 90.35)]:
+            self.assertTrue(any(encode_geohash(lat, lng).startswith(cell) for cell in cells))
+        height, width = cell_size(len(cells[0]))
+        self.assertLess(height, 1)
+    
+    def test_radius_search_sorted_by_distance(self):
+        """Test radius search keeps only nearby properties, nearest first"""
+        results = list(GeoService.within_radius(Property.objects.all(), 23.7925, 90.4078, 5))
+        self.assertEqual([prop.id for prop in results], [self.gulshan.id, self.banani.id])
+        self.assertAlmostEqual(results[1].distance, 2.16, delta=0.02)
+        
+        wider = GeoService.within_radius(Property.objects.all(), 23.7925, 90.4078, 10)
+        self.assertEqual(wider.count(), 3)
+    
+    def test_bbox_search(self):
+        """Test a viewport returns only properties inside it"""
+        results = GeoService.within_bbox(Property.objects.all(), 22.0, 91.5, 22.5, 92.0)
+        self.assertEqual([prop.id for prop in results], [self.chittagong.id])
+    
+    def test_list_endpoint_geo_params(self):
+        """Test ?near= / ?radius= and ?bbox= on the property list"""
+        client = APIClient()
+        url = reverse('property-list')
+        response = client.get(url, {'near': '23.7925,90.4078', 'radius': '5'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.gulshan.id, self.banani.id])
+        
+        response = client.get(url, {'bbox': '23.7,90.3,23.8,90.5'})
+        self.assertEqual(response.data['count'], 3)
+        
+        self.assertEqual(client.get(url, {'near': 'nowhere'}).status_code, 400)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL collations')
+class GeohashCollationTestCase(TestCase):
+    """Test geohash prefix ranges hold under the database's default collation"""
+    
+    def setUp(self):
+        self.category = Category.objects.create(name='Residential')
+        self.gulshan = create_property('Gulshan Villa', self.category, latitude=23.7925, longitude=90.4078)
+    
+    def test_prefix_columns_compare_bytewise(self):
+        """Test geohash and cluster cells use the C collation whatever the database locale is"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT table_name, column_name, collation_name FROM information_schema.columns "
+                "WHERE (table_name, column_name) IN (('properties', 'geohash'), ('property_clusters', 'cell'))"
+            )
+            self.assertEqual({row[2] for row in cursor.fetchall()}, {'C'})
+    
+    def test_cell_range_finds_rows_inside(self):
+        """Test a bbox and a radius around a listing find it"""
+        self.assertIn(self.gulshan, GeoService.within_bbox(Property.objects.all(), 23.79, 90.40, 23.80, 90.41))
+        self.assertIn(self.gulshan, GeoService.within_radius(Property.objects.all(), 23.7925, 90.4078, 1))
+
+
+class ClusterServiceTestCase(TestCase):
+    """Test precomputed map clusters and their incremental maintenance"""
+    
+    def setUp(self):
+        self.category = Category.objects.create(name='Map')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gulshan = create_property('Gulshan Villa', self.category, latitude=23.7925, longitude=90.4078, price=1000000)
+            self.banani = create_property('Banani Flat', self.category, latitude=23.7937, longitude=90.4012, price=3000000)
+            self.chittagong = create_property('Chittagong Villa', self.category, latitude=22.3569, longitude=91.7832, price=2000000)
+    
+    def snapshot(self):
+        return {
+            cluster.cell: (cluster.count, round(cluster.latitude_sum, 6), cluster.price_min, cluster.price_max)
+            for cluster in PropertyCluster.objects.all()
+        }
+    
+    def test_incremental_matches_rebuild(self):
+        """Test signal-driven updates leave the same table as a full rebuild"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.banani.price = 500000
+            self.banani.save()
+            self.gulshan.latitude, self.gulshan.longitude = 22.3600, 91.7800
+            self.gulshan.save()
+            self.chittagong.status = 'sold'
+            self.chittagong.save()
+        incremental = self.snapshot()
+        
+        ClusterService.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+    
+    def test_concurrent_edits_and_reordered_updates_do_not_drift(self):
+        """Test a stale instance and queued updates run in reverse order still match a rebuild"""
+        stale = Property.objects.get(pk=self.gulshan.pk)
+        with self.captureOnCommitCallbacks() as queued:
+            self.gulshan.latitude, self.gulshan.longitude = 22.3600, 91.7800
+            self.gulshan.save()
+            stale.latitude, stale.longitude = 24.3636, 88.6241
+            stale.save()
+            self.banani.delete()
+        for callback in reversed(queued):
+            callback()
+        incremental = self.snapshot()
+        
+        ClusterService.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+    
+    def test_delete_shrinks_price_range(self):
+        """Test removing the most expensive marker recomputes the range"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.banani.delete()
+        cluster = PropertyCluster.objects.get(cell=self.gulshan.geohash[:4])
+        self.assertEqual((cluster.count, cluster.price_max), (1, 1000000))
+    
+    def test_clusters_endpoint(self):
+        """Test a viewport returns one cluster per occupied cell of its zoom tier"""
+        response = APIClient().get(
+            reverse('property-clusters'), {'bbox': '20.6,88.0,26.6,92.7', 'zoom': 6}
+        )
+        self.assertEqual(response.status_code, 200)
+        counts = sorted(cluster['count'] for cluster in response.data)
+        self.assertEqual(counts, [1, 2])
+        dhaka = next(cluster for cluster in response.data if cluster['count'] == 2)
+        self.assertAlmostEqual(dhaka['latitude'], 23.7931, places=4)
+        self.assertEqual((dhaka['price_min'], dhaka['price_max']), (1000000, 3000000))
+    
+    def test_clusters_endpoint_requires_bbox(self):
+        """Test a missing viewport is rejected"""
+        self.assertEqual(APIClient().get(reverse('property-clusters')).status_code, 400)
+
+
+class ImportServiceTestCase(TestCase):
+    """Test the streaming bulk import"""
+    
+    CSV = (
+        'external_id,name,location,price,bedrooms,bathrooms,category,amenities,latitude,longitude\n'
+        'A1,Sea View,Cox\'s Bazar,5000000,3,2,Villas,Pool;Gym,21.4272,92.0058\n'
+        'A2,Sea View,Cox\'s Bazar,6000000,4,3,villas,,,\n'
+        'A3,Bad Price,Dhaka,abc,3,2,Villas,,,\n'
+        'A4,Lost,Dhaka,1000000,3,2,Castles,,,\n'
+    )
+    
+    def setUp(self):
+        self.villas = Category.objects.create(name='Villas')
+        Property.objects.create(
+            name='Sea View', description='Existing', location='Test', price=1000000,
+            bedrooms=3, bathrooms=2, category=self.villas
+        )
+    
+    def run_csv(self, text, **options):
+        return ImportService.run(ImportService.read_rows(io.StringIO(text), 'csv'), batch_size=2, **options)
+    
+    def test_csv_import_with_unique_slugs_and_errors(self):
+        """Test valid rows land with unique slugs while bad rows are reported"""
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = self.run_csv(self.CSV)
+        
+        self.assertEqual((summary['created'], summary['failed']), (2, 2))
+        self.assertEqual({error['row'] for error in summary['errors']}, {3, 4})
+        self.assertIn('price', summary['errors'][0]['errors'])
+        slugs = set(Property.objects.filter(name='Sea View').values_list('slug', flat=True))
+        self.assertEqual(slugs, {'sea-view', 'sea-view-2', 'sea-view-3'})
+        
+        imported = Property.objects.get(external_id='A1')
+        self.assertTrue(imported.geohash.startswith('w'))
+        self.assertEqual(PropertyAmenity.objects.filter(property=imported).count(), 2)
+    
+    def test_upsert_by_external_id(self):
+        """Test a second run updates by external_id only when upserting"""
+        self.run_csv(self.CSV)
+        changed = self.CSV.replace('5000000', '5500000')
+        
+        rejected = self.run_csv(changed)
+        self.assertEqual(rejected['created'], 0)
+        self.assertEqual(rejected['updated'], 0)
+        
+        summary = self.run_csv(changed, upsert=True)
+        self.assertEqual((summary['created'], summary['updated']), (0, 2))
+        imported = Property.objects.get(external_id='A1')
+        self.assertEqual(imported.price, 5500000)
+        self.assertEqual(imported.slug, 'sea-view-2')
+    
+    def test_jsonl_rows(self):
+        """Test JSONL rows, including a malformed line"""
+        text = (
+            '{"name": "Loft", "location": "Dhaka", "price": 900000, "bedrooms": 1, '
+            '"bathrooms": 1, "category": "villas", "amenities": ["Lift"]}\n'
+            '{not json}\n'
+        )
+        summary = ImportService.run(ImportService.read_rows(io.StringIO(text), 'jsonl'))
+        self.assertEqual((summary['created'], summary['failed']), (1, 1))
+        self.assertEqual(Property.objects.get(name='Loft').amenities, ['Lift'])
+    
+    def test_admin_upload_endpoint(self):
+        """Test the import API is admin only and reports a summary"""
+        client = APIClient()
+        url = reverse('property-bulk-import')
+        
+        def upload():
+            return SimpleUploadedFile('feed.csv', self.CSV.encode(), content_type='text/csv')
+        
+        self.assertIn(client.post(url, {'file': upload()}).status_code, (401, 403))
+        admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        client.force_authenticate(admin)
+        response = client.post(url, {'file': upload()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+    
+    def test_duplicate_name_gets_suffixed_slug(self):
+        """Test a plain create no longer collides on the slug"""
+        duplicate = Property.objects.create(
+            name='Sea View', description='Test', location='Test', price=1000000,
+            bedrooms=3, bathrooms=2, category=self.villas
+        )
+        self.assertEqual(duplicate.slug, 'sea-view-2')
+    
+    def test_suffixes_after_existing_ones(self):
+        """Test existing base-N slugs are all seen, so no suffix is handed out twice"""
+        for slug in ('villa', 'villa-2', 'villa-3', 'villa-10', 'villa_x', 'villas'):
+            create_property('Villa', self.villas, slug=slug)
+        self.assertEqual(allocate_unique_slugs(Property.objects.all(), ['villa', 'villa']), ['villa-4', 'villa-5'])
+    
+    def test_chunk_of_many_distinct_names(self):
+        """Test a full default-size chunk of distinct names imports (slugs are looked up in batches)"""
+        rows = ''.join(f'Listing {number},Dhaka,1000000,3,2,Villas\n' for number in range(1000))
+        rows += 'Sea View,Dhaka,1000000,3,2,Villas\n'
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = ImportService.run(ImportService.read_rows(
+                io.StringIO('name,location,price,bedrooms,bathrooms,category\n' + rows), 'csv'
+            ))
+        self.assertEqual((summary['created'], summary['failed']), (1001, 0))
+        self.assertTrue(Property.objects.filter(slug='sea-view-2').exists())
+
+
+class ImageServiceTestCase(TestCase):
+    """Test the background photo variant pipeline"""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.category = Category.objects.create(name='Villas')
+    
+    def upload(self, size=(2000, 1000)):
+        """A JPEG carrying EXIF (orientation: rotated 90 degrees)"""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 120, 40)).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+    
+    def create(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_property('Photo', self.category, **fields)
+    
+    def test_upload_builds_stripped_variants(self):
+        """Test an upload gets upright, metadata-free WebP/JPEG variants and its dimensions"""
+        prop = self.create(image=self.upload())
+        prop.refresh_from_db()
+        
+        self.assertEqual((prop.image_width, prop.image_height), (1000, 2000))
+        # The flat test photo: (200, 120, 40) give or take JPEG rounding
+        red, green, blue = (int(prop.image_color[i:i + 2], 16) for i in (1, 3, 5))
+        self.assertLessEqual(max(abs(red - 200), abs(green - 120), abs(blue - 40)), 3)
+        self.assertEqual(len(prop.image_placeholder), 28)
+        self.assertEqual(set(prop.image_variants), set(ImageService.VARIANT_WIDTHS))
+        small = prop.image_variants['small']
+        self.assertEqual((small['width'], small['height']), (320, 640))
+        with prop.image.storage.open(small['jpeg']) as handle, Image.open(handle) as image:
+            self.assertEqual(image.size, (320, 640))
+            self.assertEqual(len(image.getexif()), 0)
+        with prop.image.storage.open(small['webp']) as handle, Image.open(handle) as image:
+            self.assertEqual(image.format, 'WEBP')
+    
+    def test_large_jpeg_records_original_size(self):
+        """Test a JPEG decoded at draft scale still records the full upright size"""
+        prop = self.create(image=self.upload(size=(4000, 3000)))
+        prop.refresh_from_db()
+        
+        self.assertEqual((prop.image_width, prop.image_height), (3000, 4000))
+        self.assertEqual(prop.image_variants['large']['width'], 1280)
+    
+    def test_raw_upload_never_served(self):
+        """Test list and detail serve variants only, nothing before they exist"""
+        prop = self.create(image=self.upload())
+        prop.refresh_from_db()
+        detail = APIClient().get(reverse('property-detail', kwargs={'slug': prop.slug})).data
+        self.assertTrue(detail['image'].endswith(prop.image_variants['large']['webp']))
+        
+        Property.objects.filter(pk=prop.pk).update(image_variants={})
+        cache.clear()
+        local_cache.clear()
+        detail = APIClient().get(reverse('property-detail', kwargs={'slug': prop.slug})).data
+        self.assertIsNone(detail['image'])
+        self.assertIsNone(APIClient().get(reverse('property-list')).data['results'][0]['image'])
+    
+    def test_narrow_image_is_not_upscaled(self):
+        """Test variants never exceed the original width"""
+        prop = self.create(image=self.upload(size=(400, 300)))
+        prop.refresh_from_db()
+        
+        self.assertEqual(prop.image_variants['large']['width'], 300)
+        self.assertEqual(prop.image_variants['large']['webp'], prop.image_variants['medium']['webp'])
+    
+    def test_list_serves_card_variant(self):
+        """Test list cards point at the smallest variant wide enough for a card"""
+        prop = self.create(image=self.upload())
+        prop.refresh_from_db()
+        
+        response = APIClient().get(reverse('property-list'))
+        card = response.data['results'][0]
+        self.assertTrue(card['image'].endswith(prop.image_variants['medium']['webp']))
+        self.assertEqual(
+            (card['image_width'], card['image_height'], card['image_placeholder']),
+            (1000, 2000, prop.image_placeholder),
+        )
+    
+    def test_removed_image_clears_variants(self):
+        """Test clearing the image drops the variants and their files"""
+        prop = self.create(image=self.upload())
+        prop.refresh_from_db()
+        paths = ImageService.paths(prop.image_variants['small'])
+        
+        prop.image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            prop.save()
+        prop.refresh_from_db()
+        
+        self.assertEqual(prop.image_variants, {})
+        self.assertFalse(any(prop.image.storage.exists(path) for path in paths))
+    
+    def test_stale_task_is_ignored(self):
+        """Test a task queued for a replaced upload leaves the row alone"""
+        prop = self.create()
+        self.assertIsNone(ImageService.process(prop.pk, 'properties/old.jpg'))
+    
+    def test_backfill_command(self):
+        """Test the backfill processes images that have no placeholder yet"""
+        prop = self.create(image=self.upload())
+        Property.objects.filter(pk=prop.pk).update(image_placeholder='', image_variants={})
+        
+        call_command('backfill_images', workers=1, stdout=io.StringIO())
+        prop.refresh_from_db()
+        self.assertTrue(prop.image_placeholder)
+        self.assertIn('small', prop.image_variants)
+
+
+class BulkUpdateServiceTestCase(TestCase):
+    """Test the single-statement bulk admin edit"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.villas = Category.objects.create(name='Villas')
+        self.beach = Category.objects.create(name='Beach Villas', parent=self.villas)
+        self.flats = Category.objects.create(name='Flats')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.villa = create_property('Villa', self.villas, price=1000000, latitude=23.79, longitude=90.40)
+            self.beach_villa = create_property('Beach Villa', self.beach, price=2000000, latitude=23.79, longitude=90.40)
+            self.flat = create_property('Flat', self.flats, price=500000, latitude=23.79, longitude=90.40)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='x', is_staff=True))
+        self.url = reverse('property-bulk-update')
+    
+    def post(self, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, body, format='json')
+    
+    def test_raise_prices_in_subtree_with_one_update(self):
+        """Test a percent change over a category subtree is one UPDATE statement"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post({'filters': {'category': self.villas.pk}, 'price_percent': 5})
+        
+        self.assertEqual(response.data, {'updated': 2})
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "properties"')]
+        self.assertEqual(len(updates), 1)
+        prices = dict(Property.objects.values_list('name', 'price'))
+        self.assertEqual((prices['Villa'], prices['Beach Villa'], prices['Flat']), (1050000, 2100000, 500000))
+    
+    def test_caches_and_clusters_follow(self):
+        """Test cached details are purged and map clusters updated"""
+        detail = reverse('property-detail', args=[self.flat.slug])
+        self.assertEqual(APIClient().get(detail).data['featured'], False)
+        
+        self.post({'ids': [self.flat.pk, self.villa.pk], 'featured': True, 'status': 'sold'})
+        self.assertEqual(self.client.get(detail).data['status'], 'sold')
+        
+        cluster = PropertyCluster.objects.get(cell=self.flat.geohash[:7])
+        self.assertEqual((cluster.count, cluster.price_min, cluster.price_max), (1, 2000000, 2000000))
+        incremental = set(PropertyCluster.objects.values_list('cell', 'count', 'price_min', 'price_max'))
+        ClusterService.rebuild()
+        self.assertEqual(incremental, set(PropertyCluster.objects.values_list('cell', 'count', 'price_min', 'price_max')))
+    
+    def test_rows_matching_after_the_lock_are_left_alone(self):
+        """Test the UPDATE only touches the locked rows, not the filter re-run"""
+        lock_states = BulkUpdateService._lock_states
+        
+        def lock_then_concurrent_write(queryset):
+            before = lock_states(queryset)
+            Property.objects.filter(pk=self.flat.pk).update(category=self.villas)
+            return before
+        
+        with mock.patch.object(BulkUpdateService, '_lock_states', side_effect=lock_then_concurrent_write):
+            response = self.post({'filters': {'category': self.villas.pk}, 'price_percent': 5})
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(Property.objects.get(pk=self.flat.pk).price, 500000)
+    
+    def test_price_overflow_is_a_400(self):
+        """Test a percent that would overflow the price column leaves every price untouched"""
+        Property.objects.filter(pk=self.villa.pk).update(price=Decimal('6000000000.00'))
+        response = self.post({'filters': {'category': self.villas.pk}, 'price_percent': 100})
+        self.assertEqual(response.status_code, 400)
+        prices = dict(Property.objects.values_list('name', 'price'))
+        self.assertEqual((prices['Villa'], prices['Beach Villa']), (Decimal('6000000000.00'), 2000000))
+    
+    def test_rejects_bad_requests(self):
+        """Test unknown filters, empty changes and non-admins are rejected"""
+        self.assertEqual(self.post({'filters': {'categroy': 1}, 'featured': True}).status_code, 400)
+        self.assertEqual(self.post({'ids': [self.flat.pk]}).status_code, 400)
+        self.assertEqual(self.post({'ids': [self.flat.pk], 'price': 1, 'price_percent': 1}).status_code, 400)
+        self.assertEqual(self.post({'ids': [self.flat.pk], 'price_percent': 1000}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertIn(self.post({'ids': [self.flat.pk], 'featured': True}).status_code, (401, 403))
+        self.assertFalse(Property.objects.filter(featured=True).exists())
+
+
+class ViewCounterServiceTestCase(TestCase):
+    """Test buffered view counts and the trending ranking"""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        local_view_store.clear()
+        self.addCleanup(local_view_store.clear)
+        category = Category.objects.create(name='Villas')
+        self.first, self.second, self.sold = [
+            Property.objects.create(
+                name=name, description='Test', location='Test', price=1000000,
+                bedrooms=3, bathrooms=2, category=category
+            )
+            for name in ('First', 'Second', 'Sold')
+        ]
+        Property.objects.filter(pk=self.sold.pk).update(status='sold')
+    
+    def test_views_are_buffered_then_flushed(self):
+        """Test detail views write nothing until the flush adds them up"""
+        client = APIClient()
+        for _ in range(3):
+            client.get(reverse('property-detail', args=[self.first.slug]))
+        client.get(reverse('property-detail', args=[self.second.slug]))
+        self.assertEqual(Property.objects.get(pk=self.first.pk).view_count, 0)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ViewCounterService.flush(), 2)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE')]), 2)
+        counts = dict(Property.objects.values_list('name', 'view_count'))
+        self.assertEqual((counts['First'], counts['Second']), (3, 1))
+        self.assertEqual(ViewCounterService.flush(), 0)
+    
+    def test_trending_favours_recent_views(self):
+        """Test older views decay and inactive listings are skipped"""
+        store = ViewCounterService.store()
+        current = ViewCounterService.current_bucket()
+        for _ in range(10):
+            store.record(self.first.pk, current - 12, 0)
+            store.record(self.sold.pk, current, 0)
+        for _ in range(4):
+            store.record(self.second.pk, current, 0)
+        ViewCounterService.flush()
+        
+        with self.assertNumQueries(1):
+            response = APIClient().get(reverse('property-trending'))
+        self.assertEqual([row['name'] for row in response.data], ['Second', 'First'])
+        self.assertGreater(response.data[0]['trending_score'], response.data[1]['trending_score'])
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedServiceTestCase(TestCase):
+    """Test the incremental catalog feed"""
+    
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Villas')
+            self.first, self.second = [create_property(name, self.category) for name in ('First', 'Second')]
+        self.client = APIClient()
+        self.url = reverse('property-changes')
+    
+    def test_resumes_from_cursor(self):
+        """Test a client only receives what changed after its cursor"""
+        response = self.client.get(self.url)
+        self.assertEqual([row['name'] for row in response.data['properties']], ['First', 'Second'])
+        self.assertEqual([row['name'] for row in response.data['categories']], ['Villas'])
+        self.assertFalse(response.data['has_more'])
+        
+        self.first.price = 1200000
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.save()
+        response = self.client.get(self.url, {'since': response.data['next']})
+        self.assertEqual([row['id'] for row in response.data['properties']], [self.first.pk])
+        self.assertEqual(response.data['categories'], [])
+        
+        response = self.client.get(self.url, {'since': response.data['next']})
+        self.assertEqual(response.data['properties'], [])
+    
+    def test_pages_through_the_log(self):
+        """Test limit splits the log and has_more tells the client to continue"""
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertTrue(response.data['has_more'])
+        response = self.client.get(self.url, {'since': response.data['next'], 'limit': 2})
+        self.assertEqual([row['name'] for row in response.data['properties']], ['Second'])
+        self.assertFalse(response.data['has_more'])
+    
+    def test_deletions_are_tombstoned(self):
+        """Test deleted and deactivated listings come back as deleted ids"""
+        cursor = self.client.get(self.url).data['next']
+        deleted_pk = self.second.pk
+        self.first.status = 'inactive'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+            self.first.save()
+        
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual(response.data['properties'], [])
+        self.assertEqual(response.data['deleted']['properties'], sorted([self.first.pk, deleted_pk]))
+        
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='x', is_staff=True))
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual([row['id'] for row in response.data['properties']], [self.first.pk])
+        self.assertEqual(response.data['deleted']['properties'], [deleted_pk])
+    
+    def test_bulk_update_is_logged(self):
+        """Test writes that bypass save() still reach the feed"""
+        cursor = self.client.get(self.url).data['next']
+        with self.captureOnCommitCallbacks(execute=True):
+            BulkUpdateService.apply(Property.objects.filter(pk=self.second.pk), {'featured': True})
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual([row['id'] for row in response.data['properties']], [self.second.pk])
+        self.assertEqual(CatalogChange.objects.filter(object_id=self.second.pk, kind='property').count(), 1)
+    
+    def test_long_transaction_committing_last_is_not_skipped(self):
+        """Test a write that started first but commits after a later one still reaches a moved cursor"""
+        cursor = self.client.get(self.url).data['next']
+        with self.captureOnCommitCallbacks() as long_write:
+            BulkUpdateService.apply(Property.objects.filter(pk=self.first.pk), {'featured': True})
+        
+        self.second.price = 1200000
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.save()
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual([row['id'] for row in response.data['properties']], [self.second.pk])
+        
+        for callback in long_write:
+            callback()
+        response = self.client.get(self.url, {'since': response.data['next']})
+        self.assertEqual([row['id'] for row in response.data['properties']], [self.first.pk])
+    
+    def test_rejects_foreign_cursor(self):
+        """Test a malformed since token is a 400"""
+        self.assertEqual(self.client.get(self.url, {'since': 'not-a-cursor'}).status_code, 400)
+        self.assertIsNone(ChangeFeedService.decode_cursor(ChangeFeedService.encode_cursor(5)[:-1] + '!'))
@@ -0,0 +1,240 @@
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from redis.exceptions import RedisError, ResponseError
+from core.cache import async_cache
+from properties.models import Property
+
+
+class RedisViewStore:
+    """
+    View buffers in Redis: a hash of pending increments per property and one
+    sorted set of views per time bucket, folded into a decayed ranking
+    """
+    PENDING_KEY = 'views:pending'
+    FLUSHING_KEY = 'views:flushing'
+    BUCKET_KEY = 'views:bucket:{bucket}'
+    TRENDING_KEY = 'views:trending'
+
+    def __init__(self, client):
+        self.client = client
+
+    def _redis(self):
+        return self.client.get_client(write=True)
+
+    def _key(self, key):
+        return self.client.make_key(key)
+
+    def record(self, property_id, bucket, ttl):
+        """HINCRBY + ZINCRBY in one pipelined round trip"""
+        bucket_key = self._key(self.BUCKET_KEY.format(bucket=bucket))
+        pipeline = self._redis().pipeline(transaction=False)
+        pipeline.hincrby(self._key(self.PENDING_KEY), property_id, 1)
+        pipeline.zincrby(bucket_key, 1, property_id)
+        pipeline.expire(bucket_key, ttl)
+        pipeline.execute()
+
+    async def arecord(self, property_id, bucket, ttl):
+        """record() over the event loop's redis.asyncio client"""
+        bucket_key = self._key(self.BUCKET_KEY.format(bucket=bucket))
+        async with async_cache.redis().pipeline(transaction=False) as pipeline:
+            pipeline.hincrby(self._key(self.PENDING_KEY), property_id, 1)
+            pipeline.zincrby(bucket_key, 1, property_id)
+            pipeline.expire(bucket_key, ttl)
+            await pipeline.execute()
+
+    def take_pending(self):
+        """
+        Move the pending hash aside and return it; views recorded meanwhile
+        start a new hash. A batch left over by a failed flush is returned again
+        """
+        redis, flushing = self._redis(), self._key(self.FLUSHING_KEY)
+        if not redis.exists(flushing):
+            try:
+                redis.rename(self._key(self.PENDING_KEY), flushing)
+            except ResponseError:
+                # No such key: nothing was viewed since the last flush
+                return {}
+        return {int(pk): int(count) for pk, count in redis.hgetall(flushing).items()}
+
+    def done_pending(self):
+        self._redis().delete(self._key(self.FLUSHING_KEY))
+
+    def rebuild_trending(self, weights, size):
+        """ZUNIONSTORE the weighted buckets, keeping the top `size` members"""
+        trending = self._key(self.TRENDING_KEY)
+        keys = {self._key(self.BUCKET_KEY.format(bucket=bucket)): weight for bucket, weight in weights.items()}
+        pipeline = self._redis().pipeline(transaction=True)
+        pipeline.zunionstore(trending, keys)
+        pipeline.zremrangebyrank(trending, 0, -(size + 1))
+        pipeline.execute()
+
+    def top(self, count):
+        members = self._redis().zrevrange(self._key(self.TRENDING_KEY), 0, count - 1, withscores=True)
+        return [(int(member), score) for member, score in members]
+
+
+class LocalViewStore:
+    """Same interface in process memory, for caches without Redis (development, tests)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.pending, self.flushing = Counter(), None
+        self.buckets = defaultdict(Counter)
+        self.trending = []
+
+    def record(self, property_id, bucket, ttl):
+        with self._lock:
+            self.pending[property_id] += 1
+            self.buckets[bucket][property_id] += 1
+
+    async def arecord(self, property_id, bucket, ttl):
+        self.record(property_id, bucket, ttl)
+
+    def take_pending(self):
+        with self._lock:
+            if self.flushing is None:
+                self.flushing, self.pending = self.pending, Counter()
+            return dict(self.flushing)
+
+    def done_pending(self):
+        with self._lock:
+            self.flushing = None
+
+    def rebuild_trending(self, weights, size):
+        with self._lock:
+            for bucket in [bucket for bucket in self.buckets if bucket not in weights]:
+                del self.buckets[bucket]
+            scores = Counter()
+            for bucket, weight in weights.items():
+                for property_id, count in self.buckets.get(bucket, {}).items():
+                    scores[property_id] += count * weight
+            self.trending = scores.most_common(size)
+
+    def top(self, count):
+        return self.trending[:count]
+
+
+local_view_store = LocalViewStore()
+
+
+class ViewCounterService:
+    """
+    View Counter Service - Buffered view counts and the trending ranking
+
+    A detail view costs one pipelined Redis round trip and no database write.
+    A periodic task adds the buffered counts to Property.view_count with one
+    UPDATE per distinct increment, and rebuilds the trending set from hourly
+    buckets weighted by their age (half-life TRENDING_HALF_LIFE), so old
+    spikes fade without rewriting any score.
+    """
+
+    FLUSH_LOCK_KEY = 'views:flush_lock'
+    FLUSH_LOCK_TTL = 300
+    UPDATE_BATCH_SIZE = 1000
+
+    @staticmethod
+    def store():
+        client = getattr(cache, 'client', None)
+        if client is not None and hasattr(client, 'get_client'):
+            return RedisViewStore(client)
+        return local_view_store
+
+    @staticmethod
+    def current_bucket(now=None):
+        return int((now or time.time()) // settings.TRENDING_BUCKET_SECONDS)
+
+    @staticmethod
+    def bucket_ttl():
+        return settings.TRENDING_BUCKET_SECONDS * (settings.TRENDING_WINDOW_BUCKETS + 1)
+
+    @staticmethod
+    def record_view(property_id):
+        try:
+            ViewCounterService.store().record(
+                property_id, ViewCounterService.current_bucket(), ViewCounterService.bucket_ttl()
+            )
+        except RedisError:
+            # A lost view is better than a failed page
+            pass
+
+    @staticmethod
+    async def arecord_view(property_id):
+        try:
+            await ViewCounterService.store().arecord(
+                property_id, ViewCounterService.current_bucket(), ViewCounterService.bucket_ttl()
+            )
+        except RedisError:
+            pass
+
+    @staticmethod
+    def bucket_weights(now=None):
+        """Decay weight of each bucket in the trending window, by the age of its midpoint"""
+        now = now or time.time()
+        bucket_seconds = settings.TRENDING_BUCKET_SECONDS
+        current = ViewCounterService.current_bucket(now)
+        weights = {}
+        for bucket in range(current - settings.TRENDING_WINDOW_BUCKETS + 1, current + 1):
+            age = max(now - (bucket + 0.5) * bucket_seconds, 0)
+            weights[bucket] = 0.5 ** (age / settings.TRENDING_HALF_LIFE)
+        return weights
+
+    @staticmethod
+    def flush():
+        """
+        Write buffered views to the database and refresh the trending set
+        Only one flush runs at a time across workers
+
+        Returns:
+            int: number of properties whose count moved (None when another flush ran)
+        """
+        token = uuid.uuid4().hex
+        if not cache.add(ViewCounterService.FLUSH_LOCK_KEY, token, ViewCounterService.FLUSH_LOCK_TTL):
+            return None
+        try:
+            store = ViewCounterService.store()
+            pending = store.take_pending()
+
+            # Listings viewed equally often share one UPDATE
+            by_count = defaultdict(list)
+            for property_id, count in pending.items():
+                by_count[count].append(property_id)
+            batch = ViewCounterService.UPDATE_BATCH_SIZE
+            with transaction.atomic():
+                for count, ids in by_count.items():
+                    for start in range(0, len(ids), batch):
+                        Property.objects.filter(pk__in=ids[start:start + batch]).update(
+                            view_count=F('view_count') + count
+                        )
+            store.done_pending()
+
+            store.rebuild_trending(ViewCounterService.bucket_weights(), settings.TRENDING_SIZE)
+            return len(pending)
+        finally:
+            if cache.get(ViewCounterService.FLUSH_LOCK_KEY) == token:
+                cache.delete(ViewCounterService.FLUSH_LOCK_KEY)
+
+    @staticmethod
+    def get_trending(limit):
+        """
+        Active properties by decayed recent views, hydrated with one query
+
+        Returns:
+            list: (property, score) pairs, best first
+        """
+        # Ask for a few extra ids: some may have been deactivated since they were viewed
+        ranked = ViewCounterService.store().top(limit + 10)
+        properties = Property.objects.filter(
+            pk__in=[property_id for property_id, _ in ranked], status='active'
+        ).select_related('category').defer('search_vector').in_bulk()
+        return [
+            (properties[property_id], score) for property_id, score in ranked if property_id in properties
+        ][:limit]
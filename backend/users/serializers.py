@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from core.sparse import SparseFieldsMixin
 
 User = get_user_model()
 
@@ -32,7 +33,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """User Profile Serializer - FIXED to include is_admin"""
     class Meta:
         model = User